@@ -1,16 +1,41 @@
-from fastapi import FastAPI
-from pydantic import BaseModel, HttpUrl
+from contextlib import asynccontextmanager
+from datetime import datetime
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel, Field, HttpUrl
+from typing import Literal
 from urllib.parse import urlparse
+import os
 import uuid
 import json
 
 from db.postgres_store import PostgresStore
+from db.job_listener import JOBS_CHANNEL, NOTIFY_JOB_SQL
 
-app = FastAPI(title="Crawler API")
-store = PostgresStore()
+# POST /jobs/bulk'ta tek istekte kabul edilen en fazla job
+MAX_BULK_JOBS = int(os.getenv("API_MAX_BULK_JOBS", "5000"))
+
+# Her uvicorn worker'ı kendi pool'unu açar; launcher boyutu bağlantı bütçesine göre verir
+store = PostgresStore(pool_size=int(os.getenv("API_DB_POOL_SIZE", "10")))
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # Pool process başında bir kez açılır; istekler sadece bağlantı ödünç alır
+    await store.connect()
+    try:
+        yield
+    finally:
+        await store.close()
+
+
+app = FastAPI(title="Crawler API", lifespan=lifespan)
 
 
 class CreateJobRequest(BaseModel):
+    """
+    Mod alanları (frontier, seen_set, scorer, js_render, near_dup) ve oranlar
+    burada doğrulanır: geçersiz değer job koşarken değil, gönderimde 422 döner.
+    """
     url: HttpUrl
 
     single_page: bool = False
@@ -19,17 +44,32 @@ class CreateJobRequest(BaseModel):
     project_id: int
 
     exclusive_depth: int | None = None
-    max_depth_root: int = 10
-    max_pages_total: int = 20000
-    concurrency: int = 8
+    max_depth_root: int = Field(10, ge=0)
+    max_pages_total: int = Field(20000, ge=0)
+    concurrency: int = Field(8, gt=0)
 
     download_files: bool = True
     download_only_same_domain: bool = True
     incremental: bool = True
     documents_only: bool = False
+    frontier: Literal["memory", "postgres"] = "memory"
+    seen_set: Literal["set", "exact", "exact16", "bloom"] = "exact"
+    seen_set_fp_rate: float = Field(0.001, gt=0, lt=1)
+    url_rules: dict[str, dict] | None = None
+    parse_workers: int | None = Field(None, ge=0)
+    scorer: Literal["default", "fifo"] | None = None
+    score_weights: dict[str, float] | None = None
+    priority_paths: list[str] | None = None
+    path_budgets: dict[str, int] | None = None
+    js_render: Literal["off", "auto", "always"] | None = None
+    render_budget_s: float | None = Field(None, ge=0)
+    render_contexts: int | None = Field(None, gt=0)
+    near_dup: Literal["off", "skip", "reference"] | None = None
+    # Tahmini Jaccard benzerliği; 1.0 -> sadece birebir aynı imzalar
+    near_dup_threshold: float | None = Field(None, gt=0, le=1)
 
     allowed_file_extensions: list[str] | None = None
-    max_file_bytes: int | None = None
+    max_file_bytes: int | None = Field(None, gt=0)
 
 
 class CreateJobResponse(BaseModel):
@@ -37,18 +77,57 @@ class CreateJobResponse(BaseModel):
     status: str
 
 
-def extract_root_domain(url: str) -> str:
-    return urlparse(url).netloc.replace("www.", "")
+class BulkCreateJobsRequest(BaseModel):
+    jobs: list[CreateJobRequest]
 
 
-@app.post("/jobs", response_model=CreateJobResponse)
-async def create_job(req: CreateJobRequest):
-    await store.connect()
+class BulkJobResult(BaseModel):
+    url: str
+    job_id: str
+    status: str
+    # Aynı start_url için PENDING bekleyen job vardı (ya da batch'te tekrar etti)
+    duplicate: bool
 
-    job_id = str(uuid.uuid4())
-    start_url = str(req.url)
-    root_domain = extract_root_domain(start_url)
 
+class BulkCreateJobsResponse(BaseModel):
+    created: int
+    duplicates: int
+    jobs: list[BulkJobResult]
+
+
+class JobResponse(BaseModel):
+    job_id: str
+    status: str
+    start_url: str
+    root_domain: str
+    agent_id: str | None = None
+    project_id: int | None = None
+    error: str | None = None
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    updated_at: datetime
+
+
+class JobProgressResponse(BaseModel):
+    job_id: str
+    status: str
+    error: str | None = None
+    started_at: datetime | None = None
+    pages_fetched: int = 0
+    files_extracted: int = 0
+    bytes_fetched: int = 0
+    queue_depth: int = 0
+    stats: dict[str, int] = {}
+    # Sayaçların son yazıldığı an (crawler henüz yazmadıysa None)
+    updated_at: datetime | None = None
+
+
+def extract_root_domain(url: str) -> str:
+    return urlparse(url).netloc.replace("www.", "")
+
+
+def job_config(req: CreateJobRequest) -> dict:
     config = {
         "single_page": req.single_page,
         "path_mode": req.path_mode,
@@ -60,19 +139,111 @@ async def create_job(req: CreateJobRequest):
         "documents_only": req.documents_only,
         "download_only_same_domain": req.download_only_same_domain,
         "incremental": req.incremental,
+        "frontier": req.frontier,
+        "seen_set": req.seen_set,
+        "seen_set_fp_rate": req.seen_set_fp_rate,
+        "url_rules": req.url_rules,
+        "parse_workers": req.parse_workers,
+        "scorer": req.scorer,
+        "score_weights": req.score_weights,
+        "priority_paths": req.priority_paths,
+        "path_budgets": req.path_budgets,
+        "js_render": req.js_render,
+        "render_budget_s": req.render_budget_s,
+        "render_contexts": req.render_contexts,
+        "near_dup": req.near_dup,
+        "near_dup_threshold": req.near_dup_threshold,
         "allowed_file_extensions": req.allowed_file_extensions,
         "max_file_bytes": req.max_file_bytes,
         "agent_id": req.agent_id,
         "project_id": req.project_id
     }
 
-    config = {k: v for k, v in config.items() if v is not None}
+    return {k: v for k, v in config.items() if v is not None}
+
+
+def job_row(req: CreateJobRequest, job_id: str) -> tuple:
+    """jobs satırı (PostgresStore.create_jobs kolon sırası)."""
+    start_url = str(req.url)
+    return (
+        job_id, start_url, extract_root_domain(start_url), json.dumps(job_config(req)),
+        req.agent_id, req.project_id, req.documents_only, req.path_mode,
+        req.single_page, req.incremental, req.download_files,
+    )
+
+
+@app.post("/jobs", response_model=CreateJobResponse)
+async def create_job(req: CreateJobRequest):
+    job_id = str(uuid.uuid4())
+    start_url = str(req.url)
+    root_domain = extract_root_domain(start_url)
+    config = job_config(req)
 
     q = """
         INSERT INTO jobs (job_id, start_url, root_domain, config, status, agent_id, project_id,documents_only,path_mode,single_page,incremental,download_files)
         VALUES ($1, $2, $3, $4, $5, $6, $7,$8,$9,$10,$11,$12) \
         """
     async with store.pool.acquire() as con:
-        await con.execute(q, job_id, start_url, root_domain, json.dumps(config),'PENDING',req.agent_id, req.project_id, req.documents_only, req.path_mode, req.single_page, req.incremental, req.download_files)
+        # NOTIFY commit'te gönderilir; worker uyandığında job görünür olur
+        async with con.transaction():
+            await con.execute(q, job_id, start_url, root_domain, json.dumps(config),'PENDING',req.agent_id, req.project_id, req.documents_only, req.path_mode, req.single_page, req.incremental, req.download_files)
+            await con.execute(NOTIFY_JOB_SQL, JOBS_CHANNEL, job_id)
 
     return {"job_id": job_id, "status": "PENDING"}
+
+
+@app.post("/jobs/bulk", response_model=BulkCreateJobsResponse)
+async def create_jobs_bulk(req: BulkCreateJobsRequest):
+    """
+    Çok sayıda job'u tek round trip'te açar. Aynı tenant için aynı start_url'le
+    PENDING bekleyen bir job varsa yenisi açılmaz, mevcut job_id döner.
+    """
+    if len(req.jobs) > MAX_BULK_JOBS:
+        raise HTTPException(status_code=413, detail=f"en fazla {MAX_BULK_JOBS} job gönderilebilir")
+
+    rows = [job_row(j, str(uuid.uuid4())) for j in req.jobs]
+    out = await store.create_jobs(rows)
+    by_key = {(r["start_url"], r["agent_id"], r["project_id"]): r for r in out}
+
+    jobs = []
+    for row in rows:
+        hit = by_key[(row[1], row[4], row[5])]
+        jobs.append({
+            "url": row[1],
+            "job_id": hit["job_id"],
+            "status": "PENDING",
+            "duplicate": hit["job_id"] != row[0],
+        })
+    created = sum(1 for r in out if r["created"])
+    return {"created": created, "duplicates": len(jobs) - created, "jobs": jobs}
+
+
+@app.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    row = await store.get_job(job_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail="job bulunamadı")
+    return dict(row)
+
+
+@app.get("/jobs/{job_id}/progress", response_model=JobProgressResponse)
+async def get_job_progress(job_id: str):
+    """Crawler'ın periyodik yazdığı job_progress sayaçları (raw_documents taranmaz)."""
+    row = await store.get_job_progress(job_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail="job bulunamadı")
+    stats = row["stats"]
+    if isinstance(stats, str):
+        stats = json.loads(stats or "{}")
+    return {
+        "job_id": row["job_id"],
+        "status": row["status"],
+        "error": row["error"],
+        "started_at": row["started_at"],
+        "pages_fetched": row["pages_fetched"] or 0,
+        "files_extracted": row["files_extracted"] or 0,
+        "bytes_fetched": row["bytes_fetched"] or 0,
+        "queue_depth": row["queue_depth"] or 0,
+        "stats": stats or {},
+        "updated_at": row["updated_at"],
+    }
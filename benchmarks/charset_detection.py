@@ -0,0 +1,149 @@
+"""
+decode_html karakter seti tespiti: doğruluk fixture'ları + benchmark.
+
+Fixture'lar sitelerde gördüğümüz kodlama / bildirim kombinasyonlarıdır. Her biri
+için yeni decode (crawler.charset) beklenen metni vermeli; eski decode_html'in
+(aşağıda _legacy_decode) sonucu ve süresi karşılaştırma için yazdırılır.
+
+    python -m benchmarks.charset_detection [--size-kb 512] [--repeat 20]
+
+Yanlış decode edilen fixture varsa çıkış kodu 1.
+"""
+import argparse
+import codecs
+import sys
+import time
+from typing import List, NamedTuple, Optional
+
+from crawler.charset import decode_body
+
+TR_TEXT = "Işık ğüşöç İĞÜŞÖÇ ıi — Türkiye'nin çevrimiçi başvuru sayfası. "
+ASCII_TEXT = "Plain ASCII page with links and text. "
+
+
+class Fixture(NamedTuple):
+    name: str
+    body: bytes
+    content_type: Optional[str]
+    expected: str
+
+
+def _page(text: str, head: str = "") -> str:
+    return f"<html><head>{head}<title>t</title></head><body><p>{text}</p></body></html>"
+
+
+def fixtures() -> List[Fixture]:
+    tr = _page(TR_TEXT)
+    meta_1254 = _page(TR_TEXT, '<meta charset="windows-1254">')
+    meta_8859_9 = _page(TR_TEXT, '<meta http-equiv="Content-Type" content="text/html; charset=ISO-8859-9">')
+    meta_utf8 = _page(TR_TEXT, "<meta charset=utf-8>")
+    meta_latin1 = _page(TR_TEXT, '<meta http-equiv="content-type" content="text/html; charset=iso-8859-1">')
+    meta_utf16 = _page(TR_TEXT, '<meta charset="utf-16">')
+    ascii_page = _page(ASCII_TEXT)
+
+    return [
+        Fixture("utf8-no-decl", tr.encode("utf-8"), "text/html", tr),
+        Fixture("utf8-header", tr.encode("utf-8"), "text/html; charset=UTF-8", tr),
+        Fixture("utf8-header-quoted", tr.encode("utf-8"), 'text/html; charset="utf-8"', tr),
+        Fixture("utf8-meta", meta_utf8.encode("utf-8"), "text/html", meta_utf8),
+        Fixture("utf8-bom", codecs.BOM_UTF8 + tr.encode("utf-8"), "text/html", tr),
+        Fixture("utf8-bom-wrong-header", codecs.BOM_UTF8 + tr.encode("utf-8"), "text/html; charset=iso-8859-9", tr),
+        Fixture("utf16le-bom", tr.encode("utf-16"), "text/html", tr),
+        Fixture("1254-header", tr.encode("cp1254"), "text/html; charset=windows-1254", tr),
+        Fixture("8859-9-header", tr.encode("iso-8859-9", "replace"), "text/html; charset=iso-8859-9",
+                tr.encode("iso-8859-9", "replace").decode("iso-8859-9")),
+        Fixture("1254-meta", meta_1254.encode("cp1254"), "text/html", meta_1254),
+        Fixture("8859-9-meta-http-equiv", meta_8859_9.encode("cp1254"), "text/html", meta_8859_9),
+        Fixture("1254-no-decl", tr.encode("cp1254"), "text/html", tr),
+        Fixture("1254-mislabelled-latin1-header", tr.encode("cp1254"), "text/html; charset=ISO-8859-1", tr),
+        Fixture("1254-mislabelled-latin1-meta", meta_latin1.encode("cp1254"), None, meta_latin1),
+        Fixture("1254-mislabelled-utf8-header", tr.encode("cp1254"), "text/html; charset=utf-8", tr),
+        Fixture("utf8-meta-says-utf16", meta_utf16.encode("utf-8"), "text/html", meta_utf16),
+        Fixture("unknown-label", tr.encode("utf-8"), "text/html; charset=x-unknown-enc", tr),
+        Fixture("ascii", ascii_page.encode("ascii"), "text/html", ascii_page),
+    ]
+
+
+def _legacy_decode(data: bytes, content_type: Optional[str]) -> str:
+    """Eski crawler_core.decode_html (karşılaştırma için birebir kopya)."""
+    if content_type and "charset=" in content_type.lower():
+        charset = content_type.lower().split("charset=")[-1].split(";")[0].strip()
+        try:
+            return data.decode(charset)
+        except Exception:
+            pass
+
+    try:
+        txt = data.decode("utf-8")
+        if "ý" not in txt and "þ" not in txt:
+            return txt
+    except Exception:
+        pass
+
+    for enc in ("windows-1254", "iso-8859-9"):
+        try:
+            return data.decode(enc)
+        except Exception:
+            pass
+
+    return data.decode("utf-8", errors="replace")
+
+
+def check() -> int:
+    failed = 0
+    print(f"{'fixture':>32} | {'new':>10} | legacy")
+    for fx in fixtures():
+        text, enc = decode_body(fx.body, fx.content_type)
+        ok = text == fx.expected
+        try:
+            legacy_ok = _legacy_decode(fx.body, fx.content_type) == fx.expected
+        except Exception:
+            legacy_ok = False
+        failed += not ok
+        print(f"{fx.name:>32} | {('ok ' if ok else 'FAIL ') + enc:>10} | {'ok' if legacy_ok else 'wrong'}")
+    return failed
+
+
+def bench(size_kb: int, repeat: int):
+    # Gerçek sayfalardaki gibi: büyük, saf ASCII bir <head> (script/css) + Türkçe gövde
+    head_asset = "<script>var cfg = {a: 1, b: [1, 2, 3]};</script><style>.x{color:red}</style>\n"
+    n = max(1, size_kb * 1024 // 2 // len(TR_TEXT.encode("utf-8")))
+    head = head_asset * max(1, size_kb * 1024 // 2 // len(head_asset))
+    big = _page(TR_TEXT * n, head)
+    cases = [
+        ("utf8 header", big.encode("utf-8"), "text/html; charset=utf-8"),
+        ("utf8 no decl", big.encode("utf-8"), "text/html"),
+        ("1254 no decl", big.encode("cp1254"), "text/html"),
+        ("1254 bad hdr", big.encode("cp1254"), "text/html; charset=utf-8"),
+        ("utf8 with ý", (big + "Reykjavík ýmis þýðing").encode("utf-8"), "text/html"),
+        ("1254 meta", _page(TR_TEXT * n, '<meta charset="windows-1254">' + head).encode("cp1254"), "text/html"),
+    ]
+    print(f"\n{size_kb} KB sayfa, {repeat} tekrar")
+    print(f"{'case':>14} | {'legacy ms':>9} | {'new ms':>7} | speedup")
+    for name, body, ctype in cases:
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            _legacy_decode(body, ctype)
+        legacy = (time.perf_counter() - t0) / repeat * 1000
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            decode_body(body, ctype)
+        new = (time.perf_counter() - t0) / repeat * 1000
+        print(f"{name:>14} | {legacy:9.2f} | {new:7.2f} | {legacy / new:5.1f}x")
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--size-kb", type=int, default=512)
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args(argv)
+
+    failed = check()
+    bench(args.size_kb, args.repeat)
+    if failed:
+        print(f"\n{failed} fixture yanlış decode edildi")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
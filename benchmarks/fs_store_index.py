@@ -0,0 +1,66 @@
+"""
+FilesystemStore.save_page mikro benchmark'ı.
+
+Index'te N kayıt varken aynı içerikli sayfayı tekrar kaydetmenin (incremental
+crawl'daki SKIP_SAME yolu) ortalama süresini ölçer. Kayıt araması O(1) olduğu
+için süre N ile birlikte büyümemeli.
+
+    python -m benchmarks.fs_store_index
+"""
+import asyncio
+import contextlib
+import io
+import tempfile
+import time
+
+from models import CrawlJob, PageRecord
+from storage.filesystem_store import FilesystemStore
+from utils import hash_url, hash_text
+
+SIZES = (1_000, 10_000, 100_000, 200_000)
+SAMPLES = 2_000
+
+
+def _prefill(store: FilesystemStore, job: CrawlJob, n: int, text: str):
+    h = hash_text(text)
+    for i in range(n):
+        url = f"https://example.com/p/{i}"
+        store._index_page(PageRecord(
+            page_id=hash_url(url), job_id=job.job_id, url=url, domain="example.com",
+            depth=1, text_path="", content_type="text/html",
+            discovered_links=[], discovered_files=[], content_hash=h, text_len=len(text),
+        ))
+
+
+async def _bench_size(n: int) -> float:
+    text = "lorem ipsum " * 50
+    with tempfile.TemporaryDirectory() as tmp:
+        store = FilesystemStore(base_dir=tmp)
+        job = CrawlJob(job_id="bench", start_urls=["https://example.com/"])
+        store.ensure_dirs(job)
+        _prefill(store, job, n, text)
+
+        step = max(1, n // SAMPLES)
+        urls = [f"https://example.com/p/{i}" for i in range(0, n, step)][:SAMPLES]
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            t0 = time.perf_counter()
+            for url in urls:
+                await store.save_page(
+                    job=job, url=url, depth=1, text=text, content_type="text/html",
+                    links=[], discovered_files=[], agent_id=job.agent_id, project_id=job.project_id,
+                )
+            elapsed = time.perf_counter() - t0
+
+    return elapsed / len(urls) * 1e6
+
+
+async def main():
+    print(f"{'index size':>12} {'save_page (us)':>16}")
+    for n in SIZES:
+        us = await _bench_size(n)
+        print(f"{n:>12} {us:>16.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,135 @@
+"""
+HTML parse backend'leri için parity kontrolü + benchmark.
+
+Kayıtlı sayfa korpusu (klasördeki *.html / *.htm dosyaları) ya da korpus
+verilmezse üretilen sentetik sayfalar üzerinde, kurulu her backend'in çıktısı
+referans bs4 çıktısıyla karşılaştırılır ve sayfa başına parse süresi ölçülür.
+
+    python -m benchmarks.html_parsers [korpus_klasörü] [--repeat N]
+
+Parity: linkler ve canonical birebir aynı olmalı; metin kelime dizisi olarak
+karşılaştırılır (parser'ların metin düğümlerini farklı bölmesi, yani satır
+kırılımı farkları yok sayılır). Uyuşmazlık varsa çıkış kodu 1.
+"""
+import argparse
+import difflib
+import os
+import sys
+import time
+from typing import List, Tuple
+
+from crawler.html_backends import BACKENDS, available_backends
+from crawler.link_extractor import LinkExtractor
+
+BASE_URL = "https://example.com/dir/page.html"
+
+
+def _synthetic_corpus(n: int = 50) -> List[Tuple[str, str]]:
+    pages = []
+    for i in range(n):
+        items = "".join(
+            f'<li><a href="/p/{i}/{j}?utm_source=x#frag">Bağlantı {j} &amp; ürün</a> '
+            f"açıklama {j}<!-- yorum --> kuyruk</li>"
+            for j in range(60)
+        )
+        pages.append((f"synthetic_{i}.html", f"""<!DOCTYPE html>
+<html><head><title>Sayfa {i}</title>
+<link rel="canonical" href="https://example.com/canon/{i}">
+<style>body {{ color: red }}</style>
+<script>var x = "<a href='/not-a-link'>";</script>
+</head><body>
+<nav><a href="/">Ana sayfa</a> | <a href="../up.html">Üst</a></nav>
+<h1>Başlık {i}</h1>
+<p>Paragraf <b>kalın</b> metin<br>yeni satır &nbsp; boşluk</p>
+<noscript><p>JS kapalı</p></noscript>
+<ul>{items}</ul>
+<table><tr><td>Hücre 1</td><td><a href="files/rapor_{i}.pdf">Rapor</a></td></tr></table>
+<footer>© 2024 <a href="mailto:info@example.com">info</a></footer>
+</body></html>"""))
+    return pages
+
+
+def _load_corpus(path: str) -> List[Tuple[str, str]]:
+    pages = []
+    for name in sorted(os.listdir(path)):
+        if not name.lower().endswith((".html", ".htm")):
+            continue
+        with open(os.path.join(path, name), "rb") as f:
+            pages.append((name, f.read().decode("utf-8", errors="replace")))
+    return pages
+
+
+def _words(text: str) -> List[str]:
+    return text.split()
+
+
+def check_parity(ref: LinkExtractor, other: LinkExtractor, pages) -> int:
+    mismatches = 0
+    for name, html in pages:
+        r_text, r_links, r_canon = ref.extract(BASE_URL, html)
+        o_text, o_links, o_canon = other.extract(BASE_URL, html)
+
+        problems = []
+        if r_links != o_links:
+            missing = [u for u in r_links if u not in set(o_links)]
+            extra = [u for u in o_links if u not in set(r_links)]
+            problems.append(f"links differ (missing={missing[:3]} extra={extra[:3]})")
+        if r_canon != o_canon:
+            problems.append(f"canonical {r_canon!r} != {o_canon!r}")
+        r_words, o_words = _words(r_text), _words(o_text)
+        if r_words != o_words:
+            ratio = difflib.SequenceMatcher(None, r_words, o_words, autojunk=False).ratio()
+            problems.append(f"text differs (word similarity {ratio:.3f})")
+
+        if problems:
+            mismatches += 1
+            print(f"  [MISMATCH] {name}: " + "; ".join(problems))
+    return mismatches
+
+
+def bench(ext: LinkExtractor, pages, repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for _name, html in pages:
+            ext.extract(BASE_URL, html)
+    return (time.perf_counter() - t0) / (repeat * len(pages))
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("corpus", nargs="?", help="*.html dosyalarının olduğu klasör")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args(argv)
+
+    pages = _load_corpus(args.corpus) if args.corpus else _synthetic_corpus()
+    if not pages:
+        print("korpus boş")
+        return 1
+    total_kb = sum(len(h) for _, h in pages) / 1024
+    print(f"{len(pages)} sayfa, {total_kb:.0f} KB")
+
+    names = available_backends()
+    print(f"kurulu backend'ler: {names} (desteklenen: {list(BACKENDS)})")
+    if "bs4" not in names:
+        print("parity için referans bs4 kurulu olmalı")
+        return 1
+
+    ref = LinkExtractor("bs4")
+    failed = False
+    base_ms = None
+    print(f"{'backend':>12} | {'ms/page':>8} | {'speedup':>7} | parity")
+    for name in names:
+        ext = LinkExtractor(name)
+        mism = 0 if name == "bs4" else check_parity(ref, ext, pages)
+        failed = failed or mism > 0
+        ms = bench(ext, pages, args.repeat) * 1000
+        if base_ms is None:
+            base_ms = ms
+        parity = "ref" if name == "bs4" else ("ok" if mism == 0 else f"{mism} mismatch")
+        print(f"{name:>12} | {ms:8.3f} | {base_ms / ms:6.1f}x | {parity}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""
+JS kabuğu tespiti ve render süresi, yerel statik fixture'larla.
+
+benchmarks/fixtures/js_pages altındaki shell_*.html sayfaları içeriğini JS ile
+oluşturur, static_*.html sayfaları oluşturmaz. Tespit (is_js_shell) her
+fixture için kontrol edilir; --render verilirse fixture'lar yerel bir HTTP
+sunucusundan servis edilip JSRenderer ile render edilir ve render sonrası metnin
+arttığı, görsel/font isteklerinin engellendiği doğrulanır (playwright gerekir).
+
+    python -m benchmarks.js_render [--render] [--repeat 3]
+
+Yanlış sınıflanan ya da render'da boş kalan fixture varsa çıkış kodu 1.
+"""
+import argparse
+import asyncio
+import functools
+import http.server
+import os
+import sys
+import threading
+import time
+
+from crawler.js_renderer import JSRenderer, is_js_shell
+from crawler.page_parser import parse_page
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "js_pages")
+
+
+def _fixtures():
+    for name in sorted(os.listdir(FIXTURES)):
+        if name.endswith(".html"):
+            with open(os.path.join(FIXTURES, name), "rb") as f:
+                yield name, f.read()
+
+
+def check() -> int:
+    failed = 0
+    print(f"{'fixture':>24} | {'text':>5} | shell")
+    for name, data in _fixtures():
+        text = parse_page("http://fixture/" + name, data, "text/html; charset=utf-8")[0]
+        shell = is_js_shell(data, text)
+        ok = shell == name.startswith("shell_")
+        failed += not ok
+        print(f"{name:>24} | {len(text):5d} | {shell}{'' if ok else '  <-- YANLIŞ'}")
+    return failed
+
+
+def _serve():
+    handler = functools.partial(_QuietHandler, directory=FIXTURES)
+    srv = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+class _QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+async def render(repeat: int) -> int:
+    srv = _serve()
+    base = f"http://127.0.0.1:{srv.server_address[1]}/"
+    renderer = JSRenderer(contexts=2, pages_per_context=4, settle_s=2.0)
+    failed = 0
+    try:
+        print(f"\n{'fixture':>24} | {'static':>6} | {'rendered':>8} | ms/render")
+        for name, data in _fixtures():
+            if not name.startswith("shell_"):
+                continue
+            before = len(parse_page(base + name, data, "text/html; charset=utf-8")[0])
+            t0 = time.perf_counter()
+            html = None
+            for _ in range(repeat):
+                html = await renderer.render(base + name)
+            ms = (time.perf_counter() - t0) / repeat * 1000
+            after = len(parse_page(base + name, (html or "").encode(), "text/html; charset=utf-8")[0])
+            ok = html is not None and after > before
+            failed += not ok
+            print(f"{name:>24} | {before:6d} | {after:8d} | {ms:8.1f}{'' if ok else '  <-- RENDER YOK'}")
+        print(f"\n[RENDER] {renderer.snapshot()}")
+    finally:
+        await renderer.stop()
+        srv.shutdown()
+    return failed
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--render", action="store_true", help="fixture'ları headless Chromium ile render et")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args(argv)
+
+    failed = check()
+    if args.render:
+        failed += asyncio.run(render(args.repeat))
+    if failed:
+        print(f"\n{failed} fixture başarısız")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
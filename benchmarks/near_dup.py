@@ -0,0 +1,104 @@
+"""
+Yakın-kopya tespiti (MinHash + LSH): doğruluk + hız.
+
+Sentetik bir site üretilir: özgün makaleler ve her birinin sadece tarih,
+sayaç ya da "ilgili haberler" bloğu değişmiş varyantları. Varyantların
+orijinaline eşlenmesi (gerçek Jaccard benzerliği eşiğin belirgin üstündeyse),
+özgün makalelerin birbirine eşlenmemesi beklenir.
+Sayfa başına imza süresi ve index sorgu süresi yazdırılır.
+
+    python -m benchmarks.near_dup [--articles 300] [--words 800] [--threshold 0.9]
+
+Eşik sınırında olmayan varyantların %1'inden fazlası kaçarsa (64 kovalı imzanın
+tahmin hatası tek tük kaçırmaya yol açabilir) ya da yanlış eşleşme varsa çıkış kodu 1.
+"""
+import argparse
+import random
+import sys
+import time
+
+from crawler.near_dup import NearDupIndex, _shingles, minhash
+
+VOCAB_SIZE = 5000
+# Gerçek benzerliği eşiğe bu kadar yakın varyantların kaçması hata sayılmaz
+# (64 kovalı imzada tahminin standart sapması ~0.04)
+MARGIN = 0.05
+MAX_MISS_RATE = 0.01
+
+
+def _vocab(rng: random.Random):
+    letters = "abcçdefgğhıijklmnoöprsştuüvyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(2, 10))) for _ in range(VOCAB_SIZE)]
+
+
+def _article(rng: random.Random, vocab, words: int) -> str:
+    return " ".join(rng.choice(vocab) for _ in range(words))
+
+
+def _variants(rng: random.Random, vocab, base: str):
+    related = " ".join(rng.choice(vocab) for _ in range(25))
+    return [
+        ("tarih", f"Yayın tarihi {rng.randint(1, 28)}.{rng.randint(1, 12)}.2025 " + base),
+        ("sayaç", base + f" Bu sayfa {rng.randint(100, 99999)} kez görüntülendi."),
+        ("ilgili", base + " İlgili haberler: " + related),
+    ]
+
+
+def _jaccard(a: str, b: str) -> float:
+    sa, sb = _shingles(a), _shingles(b)
+    return len(sa & sb) / len(sa | sb)
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--articles", type=int, default=300)
+    ap.add_argument("--words", type=int, default=800)
+    ap.add_argument("--threshold", type=float, default=0.9)
+    args = ap.parse_args(argv)
+
+    rng = random.Random(42)
+    vocab = _vocab(rng)
+    originals = [_article(rng, vocab, args.words) for _ in range(args.articles)]
+
+    t0 = time.perf_counter()
+    sigs = [minhash(t) for t in originals]
+    per_page = (time.perf_counter() - t0) / len(originals) * 1000
+
+    index = NearDupIndex(args.threshold)
+    false_pos = 0
+    t0 = time.perf_counter()
+    for i, sig in enumerate(sigs):
+        if index.find(sig) is not None:
+            false_pos += 1
+        index.add(f"orig-{i}", sig)
+    query_ms = (time.perf_counter() - t0) / len(sigs) * 1000
+
+    missed = {}
+    sims = []
+    borderline = 0
+    for i, base in enumerate(originals):
+        for kind, text in _variants(rng, vocab, base):
+            hit = index.find(minhash(text))
+            if hit is None or hit[0] != f"orig-{i}":
+                if _jaccard(base, text) >= args.threshold + MARGIN:
+                    missed[kind] = missed.get(kind, 0) + 1
+                else:
+                    borderline += 1
+            else:
+                sims.append(hit[1])
+
+    total = args.articles * 3
+    print(f"{args.articles} makale x {args.words} kelime, benzerlik eşiği {args.threshold}")
+    print(f"minhash: {per_page:.2f} ms/sayfa, index sorgu+ekleme: {query_ms:.3f} ms")
+    print(f"varyant eşleşen: {len(sims)}/{total}, eşik sınırında kaçan: {borderline}, kaçan: {missed or 0}")
+    if sims:
+        print(f"eşleşen benzerlik ort.: {sum(sims) / len(sims):.3f}, en düşük: {min(sims):.3f}")
+    print(f"özgün makaleler arası yanlış eşleşme: {false_pos}")
+    print(f"index: {index.stats}")
+    clear = total - borderline
+    miss_rate = sum(missed.values()) / clear if clear else 0.0
+    return 1 if miss_rate > MAX_MISS_RATE or false_pos else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+HTML gövdesi için tek geçişli karakter seti tespiti.
+
+Sıra (WHATWG'ye yakın): BOM -> Content-Type charset -> ilk birkaç KB'daki
+<meta charset> / <meta http-equiv> -> bildirim yoksa UTF-8, geçersizse
+windows-1254. Karar baytlar üzerinden verilir, gövde tek kez decode edilir.
+Tek istisna UTF-8'in geçersiz çıkmasıdır: strict decode ilk hatalı baytta
+durur ve gövde bir kez de 1254 ile decode edilir.
+
+Türkçe sezgisi: latin-1 / windows-1252 bildirilen ya da bildirimsiz 8-bit
+sayfalarda 1254'teki ı ş ğ İ Ş Ğ baytları (1252'de ý þ ð Ý Þ Ð) görülürse
+windows-1254 seçilir.
+"""
+import codecs
+import re
+from typing import Optional, Tuple
+
+BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+META_SCAN_BYTES = 4096
+# Türkçe sezgisi için bakılan örnek boyutu
+SAMPLE_BYTES = 64 * 1024
+
+_header_charset = re.compile(r"charset\s*=\s*[\"']?\s*([\w.:\-]+)", re.I)
+_meta_charset = re.compile(rb"<meta[^>]+?charset\s*=\s*[\"']?\s*([\w.:\-]+)", re.I)
+
+# windows-1254'te ı ş ğ İ Ş Ğ olan baytlar
+_TR_BYTES = (b"\xfd", b"\xfe", b"\xf0", b"\xdd", b"\xde", b"\xd0")
+
+# Tarayıcıların da yaptığı gibi latin-1 etiketleri windows-125x olarak okunur
+_ALIASES = {
+    "latin-1": "cp1252",
+    "iso8859-1": "cp1252",
+    "ascii": "cp1252",
+    "iso8859-9": "cp1254",
+}
+_WESTERN = ("cp1252",)
+
+
+def normalize_charset(label: Optional[str]) -> Optional[str]:
+    """Etiketi Python codec adına çevirir; bilinmiyorsa None."""
+    if not label:
+        return None
+    try:
+        name = codecs.lookup(label.strip().strip("\"'")).name
+    except LookupError:
+        return None
+    return _ALIASES.get(name, name)
+
+
+def _looks_turkish(data: bytes) -> bool:
+    sample = data[:SAMPLE_BYTES]
+    return any(b in sample for b in _TR_BYTES)
+
+
+def sniff_charset(data: bytes, content_type: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Returns (encoding, source). source: "bom" | "header" | "meta" | "default".
+    "default" ve bildirilen UTF-8'de geçersiz gövde decode_body'de 1254'e düşer.
+    """
+    for bom, enc in BOMS:
+        if data.startswith(bom):
+            return enc, "bom"
+
+    if content_type:
+        m = _header_charset.search(content_type)
+        enc = normalize_charset(m.group(1)) if m else None
+        if enc:
+            if enc in _WESTERN and _looks_turkish(data):
+                return "cp1254", "header"
+            return enc, "header"
+
+    m = _meta_charset.search(data, 0, META_SCAN_BYTES)
+    if m:
+        enc = normalize_charset(m.group(1).decode("ascii", "ignore"))
+        if enc:
+            # BOM'suz bir belge kendini UTF-16 ilan edemez (meta ASCII olarak okundu)
+            if enc.startswith("utf-16") or enc.startswith("utf-32"):
+                enc = "utf-8"
+            if enc in _WESTERN and _looks_turkish(data):
+                enc = "cp1254"
+            return enc, "meta"
+
+    return "utf-8", "default"
+
+
+def decode_body(data: bytes, content_type: Optional[str] = None) -> Tuple[str, str]:
+    """Returns (text, encoding). Gövde normalde tek kez decode edilir."""
+    enc, source = sniff_charset(data, content_type)
+
+    if enc == "utf-8":
+        try:
+            return data.decode("utf-8"), "utf-8"
+        except UnicodeDecodeError:
+            pass
+        # Bildirimsiz ya da yanlış bildirilmiş 8-bit sayfa: Türkçe siteler için 1254.
+        # (except bloğunun dışında: hata nesnesi gövdenin kopyasını tutuyor)
+        enc = "cp1254"
+
+    return data.decode(enc, errors="replace"), enc
@@ -1,15 +1,33 @@
 import asyncio
+import json
 import os
-from typing import Set, List, Optional
-from urllib.parse import urlparse, urljoin
+from collections import defaultdict
+from typing import Dict, Set, List, Optional
+from urllib.parse import urlparse, urljoin, urlsplit
 
 from models import CrawlJob, UrlContext
 from utils import get_domain, hash_url, hash_text
 from .http_fetcher import HttpFetcher
+from .js_renderer import JSRenderer, is_js_shell
+from .near_dup import NearDupIndex
+from .politeness import THROTTLE_STATUSES, Throttled
 from .link_extractor import LinkExtractor
+from .page_parser import decode_html, parse_page  # noqa: F401 (decode_html geriye uyumluluk için)
 from storage.filesystem_store import FilesystemStore
 from .file_ingestion import download_extract_delete
+from .extraction_executor import ExtractionExecutor
+from .frontier import PageBudget, make_frontier
+from .url_scorer import make_scorer
+from .seen_set import make_seen_set, seen_set_stats
+from .url_canonicalizer import UrlCanonicalizer
 from db.postgres_store import PostgresStore
+from db.raw_document_writer import RawDocumentWriter
+
+# 429/503 alan sayfa host duraklaması bitince en fazla bu kadar tekrar kuyruğa döner
+MAX_THROTTLE_RETRIES = int(os.getenv("CRAWLER_MAX_THROTTLE_RETRIES", "3"))
+
+# job_progress tablosuna sayaç yazma aralığı (GET /jobs/{id}/progress buradan okur)
+PROGRESS_INTERVAL_S = float(os.getenv("CRAWLER_PROGRESS_INTERVAL_S", "5"))
 
 # Statik dosya uzantıları (içerik aranmayacaklar)
 STATIC_EXTENSIONS = (
@@ -30,46 +48,99 @@ def get_ext(url: str) -> str:
     return ext.lower()
 
 
-def decode_html(data: bytes, content_type: Optional[str]) -> str:
-    """HTML içeriğini doğru karakter setiyle decode eder."""
-    if content_type and "charset=" in content_type.lower():
-        charset = content_type.lower().split("charset=")[-1].split(";")[0].strip()
-        try:
-            return data.decode(charset)
-        except Exception:
-            pass
-
-    try:
-        txt = data.decode("utf-8")
-        if "ý" not in txt and "þ" not in txt:
-            return txt
-    except Exception:
-        pass
-
-    for enc in ("windows-1254", "iso-8859-9"):
-        try:
-            return data.decode(enc)
-        except Exception:
-            pass
-
-    return data.decode("utf-8", errors="replace")
-
-
 class Crawler:
-    def __init__(self, job: CrawlJob):
+    def __init__(
+        self,
+        job: CrawlJob,
+        extraction: Optional[ExtractionExecutor] = None,
+        fetcher: Optional[HttpFetcher] = None,
+        parser: Optional[ExtractionExecutor] = None,
+        pg: Optional[PostgresStore] = None,
+    ):
         self.job = job
-        self.fetcher = HttpFetcher()
+        # Paylaşılan fetch bütçesinde adil paylaşım bu anahtar üzerinden yapılır
+        self.tenant = f"{job.agent_id}:{job.project_id}"
+        # Dışarıdan verilen fetcher (bağlantı havuzu + DNS cache) paylaşılır, kapatılmaz
+        self._owns_fetcher = fetcher is None
+        self.fetcher = fetcher or HttpFetcher()
         self.extractor = LinkExtractor()
-        self.store = FilesystemStore()
-        self.pg = PostgresStore()
 
-        self.visited_pages: Set[str] = set()
-        self.enqueued_pages: Set[str] = set()
-        self.processed_files: Set[str] = set()
+        # Dışarıdan verilen executor paylaşılır, kapatılmaz
+        self._owns_extraction = extraction is None
+        self.extraction = extraction or ExtractionExecutor()
+
+        # HTML decode + parse process pool'da (parse_workers=0 -> event loop'ta).
+        # Doküman çıkarımıyla ayrı pool: uzun PDF'ler sayfa parse'ını bekletmez.
+        parse_workers = job.parse_workers
+        if parse_workers is None:
+            # Tek çekirdekte process'e taşımak sadece IPC maliyeti ekler
+            cpus = os.cpu_count() or 1
+            parse_workers = cpus - 1 if cpus > 1 else 0
+        self._owns_parser = parser is None and parse_workers > 0
+        if parser is not None:
+            self.parser: Optional[ExtractionExecutor] = parser
+        elif parse_workers > 0:
+            self.parser = ExtractionExecutor(
+                max_workers=parse_workers,
+                task_timeout_s=30.0,
+                max_tasks_per_child=500,
+            )
+        else:
+            self.parser = None
+
+        # JS kabuğu sayfalar headless browser'da render edilir (browser ilk render'da açılır)
+        self.renderer: Optional[JSRenderer] = None
+        if job.js_render in ("auto", "always"):
+            self.renderer = JSRenderer(
+                contexts=job.render_contexts,
+                budget_s=job.render_budget_s,
+                user_agent=self.fetcher.user_agent,
+            )
+
+        # Yakın-kopya sayfalar (MinHash + LSH); index ilk kullanımda site kayıtlarından kurulur
+        self.near_dup: Optional[NearDupIndex] = None
+        self._near_dup_loaded = False
+        if job.near_dup in ("skip", "reference"):
+            self.near_dup = NearDupIndex(job.near_dup_threshold)
+
+        # 429/503 alan URL'lerin tekrar sayısı ve host duraklaması bitince kuyruğa geri koyan görevler
+        self._throttle_retries: Dict[str, int] = {}
+        self._release_tasks: Set[asyncio.Task] = set()
+
+        # Dosya indirme/çıkarım görevleri worker'ları bloklamadan arka planda koşar
+        self._file_tasks: Set[asyncio.Task] = set()
+        self._file_slots = asyncio.Semaphore(max(1, job.concurrency))
+        self.store = FilesystemStore()
+        # Dışarıdan verilen PG pool'u (daemon'da job'lar arası ortak) kapatılmaz
+        self._owns_pg = pg is None
+        self.pg = pg or PostgresStore()
+        self.writer = RawDocumentWriter(self.pg)
+
+        # "page_inserted", "file_skipped" vb. sayaçlar
+        self.stats: Dict[str, int] = defaultdict(int)
+        # Resume: önceki çalıştırmaların job_progress sayaçları; bunların üstüne eklenir
+        self._progress_base: Dict[str, int] = {}
+
+        # Sayfa tekrarları frontier'da elenir (bellek içi küme ya da url_frontier UNIQUE)
+        self.frontier = make_frontier(job, self.pg)
+        # Frontier önceliği; incremental taramada zaten kayıtlı sayfalar geriye düşer
+        self.scorer = make_scorer(
+            job,
+            known=(lambda u: self.store.get_page(hash_url(u)) is not None) if job.incremental else None,
+        )
+        # max_pages_total + path_budgets; bitince worker'lar durur
+        self.budget = PageBudget(job.max_pages_total, job.path_budgets)
+        self.processed_files = make_seen_set(job.seen_set, job.seen_set_fp_rate)
 
         if not self.job.root_domain and self.job.start_urls:
             self.job.root_domain = get_domain(self.job.start_urls[0])
 
+        # Seen-set kontrolü ve hash_url'den önce tüm URL'ler kanonik forma getirilir
+        self.canonicalizer = UrlCanonicalizer(
+            self.job.start_urls[0] if self.job.start_urls else "",
+            self.job.url_rules,
+        )
+
         self.base_path: Optional[str] = None
         if self.job.path_mode and self.job.start_urls:
             p = urlparse(self.job.start_urls[0]).path
@@ -78,11 +149,21 @@ class Crawler:
             else:
                 self.base_path = p.rstrip("/") + "/"
 
+    def memory_stats(self) -> Dict[str, Dict[str, int]]:
+        """Job'un URL kümelerinin eleman sayısı ve yaklaşık bellek kullanımı."""
+        out = {"processed_files": seen_set_stats(self.processed_files)}
+        seen = getattr(self.frontier, "seen", None)
+        if seen is not None:
+            out["enqueued_pages"] = seen_set_stats(seen)
+        return out
+
     def _in_scope(self, url: str) -> bool:
         if get_domain(url) != self.job.root_domain:
             return False
         if self.job.path_mode and self.base_path:
-            if not urlparse(url).path.startswith(self.base_path):
+            path = urlparse(url).path or "/"
+            # Kanonikleştirme sondaki "/"'ı atmış olabilir: /docs, /docs/ kapsamındadır
+            if not (path.startswith(self.base_path) or path == self.base_path.rstrip("/")):
                 return False
         return True
 
@@ -92,7 +173,25 @@ class Crawler:
     def _can_go_deeper(self, depth: int) -> bool:
         return (depth + 1) <= self._depth_cap()
 
-    async def _handle_file_url(self, url: str, depth: int):
+    async def _queue_raw_document(self, **doc):
+        """Dokümanı toplu yazıcıya verir; sonuç geldiğinde sayaçları günceller."""
+        source_type = doc["source_type"]
+        source_id = doc["source_id"]
+        fut = await self.writer.add(**doc)
+
+        def _count(f: "asyncio.Future"):
+            if f.cancelled():
+                return
+            outcome = f.result()
+            self.stats[f"{source_type}_{outcome.lower()}"] += 1
+            if outcome == "FAILED":
+                # Kayıt diskte kaldı ama DB'ye gitmedi: sonraki tarama 304'le atlamasın
+                self.store.forget_validators(self.job, source_type, source_id)
+
+        fut.add_done_callback(_count)
+
+    def _schedule_file_url(self, url: str, depth: int):
+        """Dosyayı arka planda işlenmek üzere planlar; worker bir sonraki sayfaya geçer."""
         if not self.job.download_files:
             return
         if url in self.processed_files:
@@ -108,16 +207,45 @@ class Crawler:
             if get_domain(url) != self.job.root_domain:
                 return
 
+        self.processed_files.add(url)
+        task = asyncio.create_task(self._handle_file_url(url, depth))
+        self._file_tasks.add(task)
+        task.add_done_callback(self._file_tasks.discard)
+
+    async def _drain_file_tasks(self):
+        while self._file_tasks:
+            await asyncio.gather(*list(self._file_tasks), return_exceptions=True)
+
+    async def _handle_file_url(self, url: str, depth: int):
+        async with self._file_slots:
+            try:
+                await self._process_file_url(url, depth)
+            except Exception as e:
+                print(f"[ERROR][FILE] {url}: {e}")
+
+    async def _process_file_url(self, url: str, depth: int):
         fid = hash_url(url)
+        known = self.store.get_file(fid) if self.job.incremental else None
 
         text, meta, ctype = await download_extract_delete(
             fetcher=self.fetcher,
             url=url,
-            max_bytes=getattr(self.job, "max_file_bytes", None)
+            max_bytes=getattr(self.job, "max_file_bytes", None),
+            executor=self.extraction,
+            spill_threshold=self.job.extract_spill_bytes,
+            etag=known.etag if known else "",
+            last_modified=known.last_modified if known else "",
+            tenant=self.tenant,
         )
 
+        if meta.get("not_modified"):
+            self.stats["file_not_modified"] += 1
+            return
+        self.stats["file_bytes"] += meta.get("size", 0)
+
         if not text or meta.get("skipped_too_large"):
-            self.processed_files.add(url)
+            if meta.get("error"):
+                print(f"[FILE][SKIP] {url}: {meta['error']}")
             return
 
         await self.store.save_file_text(
@@ -128,10 +256,13 @@ class Crawler:
             content_type=ctype or "",
             size_bytes=len(text.encode("utf-8", errors="ignore")),
             agent_id=self.job.agent_id,
-            project_id=self.job.project_id
+            project_id=self.job.project_id,
+            etag=meta.get("etag", ""),
+            last_modified=meta.get("last_modified", "")
         )
+        self.stats["file_extracted"] += 1
 
-        await self.pg.upsert_raw_document(
+        await self._queue_raw_document(
             source_type="file",
             source_id=fid,
             site=get_domain(url),
@@ -144,115 +275,312 @@ class Crawler:
             project_id=self.job.project_id
         )
 
-        self.processed_files.add(url)
+    def _retry_throttled(self, ctx: UrlContext) -> bool:
+        """
+        429/503 alan URL'i host'un duraklaması (Retry-After) bitince frontier'a
+        geri bırakır. URL bu sürede in-flight sayılır, worker'lar işi bitmiş sanmaz.
+        MAX_THROTTLE_RETRIES aşıldıysa False döner (URL hata olarak ack'lenir).
+        """
+        n = self._throttle_retries.get(ctx.url, 0)
+        if n >= MAX_THROTTLE_RETRIES:
+            self._throttle_retries.pop(ctx.url, None)
+            return False
+        self._throttle_retries[ctx.url] = n + 1
+        self.stats["page_throttle_retry"] += 1
+        delay = self.fetcher.scheduler.pause_remaining(urlsplit(ctx.url).netloc)
+
+        async def _release():
+            await asyncio.sleep(delay)
+            await self.frontier.release(ctx)
+
+        task = asyncio.create_task(_release())
+        self._release_tasks.add(task)
+        task.add_done_callback(self._release_tasks.discard)
+        return True
 
-    async def _worker(self, wid: int, queue: "asyncio.Queue[UrlContext]"):
+    async def _worker(self, wid: int):
         try:
             while True:
-                ctx = await queue.get()
-                url = ctx.url
-                depth = ctx.depth
-
-                # Kontrol: Kapsam dışı mı veya zaten ziyaret edildi mi?
-                if url in self.visited_pages or not self._in_scope(url):
-                    queue.task_done()
+                ctx = await self.frontier.pop()
+                if ctx is None:
+                    return
+
+                admit = self._admit(ctx)
+                if admit == "exhausted":
+                    # Sayfa bütçesi bitti: URL kuyruğa geri bırakılır, worker durur
+                    await self.frontier.release(ctx)
+                    return
+                if admit == "skip":
+                    await self.frontier.ack(ctx)
                     continue
+                ctx.fetched = True
 
-                if depth > self._depth_cap():
-                    queue.task_done()
-                    continue
+                ok, error = True, None
+                try:
+                    await self._process_page(wid, ctx)
+                except Throttled as e:
+                    ctx.fetched = False
+                    if self._retry_throttled(ctx):
+                        # ack yok: URL duraklama bitince release() ile kuyruğa döner
+                        continue
+                    ok, error = False, str(e)
+                    print(f"[ERROR][WORKER-{wid}] {ctx.url}: {e} ({MAX_THROTTLE_RETRIES} deneme sonrası)")
+                except Exception as e:
+                    ok, error = False, str(e)
+                    print(f"[ERROR][WORKER-{wid}] {ctx.url}: {e}")
 
-                if self.job.single_page and depth > 0:
-                    queue.task_done()
-                    continue
+                await self.frontier.ack(ctx, ok=ok, error=error)
+                if self._throttle_retries:
+                    self._throttle_retries.pop(ctx.url, None)
 
-                self.visited_pages.add(url)
-                print(f"[w{wid}] FETCH depth={depth} {url}")
+        except asyncio.CancelledError:
+            return
 
-                try:
-                    data, ctype = await self.fetcher.fetch(url, domain=get_domain(url))
-                    if not data:
-                        queue.task_done()
-                        continue
+    def _admit(self, ctx: UrlContext) -> str:
+        """
+        "fetch" | "skip" | "exhausted". Bütçe pop()'un hemen ardından düşülür:
+        arada başka worker son slotu alırsa URL done sayılmaz, kuyruğa döner.
+        Kapsam dışı URL'ler bütçe yemez.
+        """
+        # Kontrol: Kapsam dışı mı? (tekrar ziyaret frontier'da elenir)
+        if not self._in_scope(ctx.url):
+            return "skip"
+        if ctx.depth > self._depth_cap():
+            return "skip"
+        if self.job.single_page and ctx.depth > 0:
+            return "skip"
+        if not self.budget.take(ctx.url):
+            if self.budget.exhausted:
+                return "exhausted"
+            self.stats["page_budget_skipped"] += 1
+            return "skip"
+        return "fetch"
+
+    async def _process_page(self, wid: int, ctx: UrlContext):
+        url = ctx.url
+        depth = ctx.depth
+
+        # Önceki taramadan kalan kayıt varsa koşullu istek gönder (sayfa kanonik
+        # adresiyle saklandıysa doğrulayıcılar o kayıtta)
+        known = self.store.find_page_for_fetch(url) if self.job.incremental else None
+
+        print(f"[w{wid}] FETCH depth={depth} {url}")
+
+        res = await self.fetcher.fetch_stream(
+            url,
+            domain=get_domain(url),
+            max_bytes=self.job.max_page_bytes,
+            etag=known.etag if known else "",
+            last_modified=known.last_modified if known else "",
+            tenant=self.tenant,
+        )
 
-                    if "text/html" in (ctype or "").lower():
-                        html = decode_html(data, ctype)
-                        text, links = self.extractor.extract(url, html)
-
-                        clean_links: List[str] = []
-                        file_links: List[str] = []
-
-                        for ln in links:
-                            ln = urljoin(url, ln)
-                            if has_blocked_ext(ln) or not self._in_scope(ln):
-                                continue
-
-                            if get_ext(ln) in self.job.allowed_file_extensions:
-                                file_links.append(ln)
-                            else:
-                                clean_links.append(ln)
-
-                        # Sayfayı diske kaydet
-
-                        page = await self.store.save_page(
-                            job=self.job,
-                            url=url,
-                            depth=depth,
-                            text=text,
-                            content_type=ctype or "",
-                            links=clean_links,
-                            discovered_files=file_links,
-                            agent_id=self.job.agent_id,
-                            project_id=self.job.project_id
-                        )
-
-                        if page:
-                            discovered_links = page.discovered_links
-                            discovered_files = page.discovered_files
-                        else:
-                            discovered_links = clean_links
-                            discovered_files = file_links
-
-                        # Sayfayı DB'ye kaydet
-                        if not self.job.documents_only:
-                            if page:
-                                await self.pg.upsert_raw_document(
-                                    source_type="page",
-                                    source_id=page.page_id,
-                                    site=page.domain,
-                                    url=page.url,
-                                    raw_text=text,
-                                    content_hash=page.content_hash,
-                                    content_type=page.content_type,
-                                    text_len=page.text_len,
-                                    agent_id=self.job.agent_id,
-                                    project_id=self.job.project_id
-                                )
-
-                        # Bulunan dosyaları işle
-                        for f in file_links:
-                            await self._handle_file_url(f, depth + 1)
-
-                        # Yeni linkleri kuyruğa ekle
-                        if self._can_go_deeper(depth):
-                            for ln in clean_links:
-                                if ln not in self.enqueued_pages:
-                                    self.enqueued_pages.add(ln)
-                                    queue.put_nowait(UrlContext(ln, depth + 1))
-                        else:
-                            pass
+        if res.not_modified and known is not None:
+            # 304: indirme, parse ve DB yazımı yok; kayıtlı linklerle frontier büyümeye devam eder
+            self.stats["page_not_modified"] += 1
+            await self._follow_links(depth, known.discovered_links, known.discovered_files)
+            return
 
-                except Exception as e:
-                    print(f"[ERROR][WORKER-{wid}] {url}: {e}")
+        if res.status in THROTTLE_STATUSES:
+            # Worker URL'i host duraklaması bitince kuyruğa geri koyar (bkz. _retry_throttled)
+            self.budget.give_back(url)
+            raise Throttled(res.error)
 
-                queue.task_done()
+        data, ctype = res.data, res.content_type
+        if not res.ok or not data:
+            return
+        self.stats["page_fetched"] += 1
+        self.stats["page_bytes"] += len(data)
 
-        except asyncio.CancelledError:
+        if "text/html" not in (ctype or "").lower():
+            return
+
+        text, links, canonical, content_hash, sig = await self._parse(url, data, ctype)
+
+        if self.renderer is not None and (self.job.js_render == "always" or is_js_shell(data, text)):
+            rendered = await self._render(url)
+            if rendered is not None:
+                data, ctype = rendered, "text/html; charset=utf-8"
+                text, links, canonical, content_hash, sig = await self._parse(url, data, ctype)
+        # Ham gövde artık gerekmiyor; kayıt/DB yazımı sürerken bellekte tutulmasın
+        data = res.data = None
+
+        seen = getattr(self.frontier, "seen", None)
+        # Relatif linkler kanonik istek adresine değil, yanıtın geldiği adrese göre çözülür
+        base = res.final_url or url
+        links = self.canonicalizer.canonicalize_many([urljoin(base, ln) for ln in links], seen=seen)
+
+        # <link rel=canonical>: sayfa kanonik adresiyle saklanır; kanonik adres
+        # zaten kuyruktaysa/çekildiyse bu sayfa kopyadır, sadece linkleri kullanılır
+        store_url = url
+        duplicate = False
+        if canonical:
+            canonical = self.canonicalizer.canonicalize(canonical)
+            if canonical != url and self._in_scope(canonical):
+                self.canonicalizer.stats["canonical_links"] += 1
+                if seen is not None and not seen.add(canonical):
+                    duplicate = True
+                else:
+                    store_url = canonical
+
+        clean_links: List[str] = []
+        file_links: List[str] = []
+
+        for ln in links:
+            if has_blocked_ext(ln) or not self._in_scope(ln):
+                continue
+
+            if get_ext(ln) in self.job.allowed_file_extensions:
+                file_links.append(ln)
+            else:
+                clean_links.append(ln)
+
+        # Yakın kopya: skip -> hiç kaydedilmez, reference -> orijinale referansla kaydedilir
+        near_dup_of = None
+        if self.near_dup is not None and sig and not duplicate:
+            near_dup_of = self._near_dup_of(hash_url(store_url), sig)
+            if near_dup_of is not None:
+                self.stats["page_near_dup"] += 1
+                print(f"[DOC][PAGE][NEAR_DUP] {store_url} ~ {near_dup_of.url}")
+                if self.job.near_dup == "skip":
+                    duplicate = True
+
+        # Sayfayı diske kaydet
+
+        page = None if duplicate else await self.store.save_page(
+            job=self.job,
+            url=store_url,
+            depth=depth,
+            text=text,
+            content_type=ctype or "",
+            links=clean_links,
+            discovered_files=file_links,
+            agent_id=self.job.agent_id,
+            project_id=self.job.project_id,
+            etag=res.etag,
+            last_modified=res.last_modified,
+            content_hash=content_hash,
+            minhash=sig.hex(),
+            duplicate_of=near_dup_of,
+            fetched_url=url,
+        )
+
+        # Sayfayı DB'ye kaydet (yakın kopyalar downstream'e gönderilmez)
+        if not self.job.documents_only:
+            if page and not page.duplicate_of:
+                await self._queue_raw_document(
+                    source_type="page",
+                    source_id=page.page_id,
+                    site=page.domain,
+                    url=page.url,
+                    raw_text=text,
+                    content_hash=page.content_hash,
+                    content_type=page.content_type,
+                    text_len=page.text_len,
+                    agent_id=self.job.agent_id,
+                    project_id=self.job.project_id
+                )
+
+        await self._follow_links(depth, clean_links, file_links)
+
+    async def _parse(self, url: str, data: bytes, ctype: Optional[str]):
+        fingerprint = self.near_dup is not None
+        if self.parser is not None:
+            return await self.parser.run(parse_page, url, data, ctype, self.extractor.backend.name, fingerprint)
+        return parse_page(url, data, ctype, self.extractor.backend.name, fingerprint)
+
+    def _near_dup_of(self, page_id: str, sig: bytes):
+        """Sitede (bu ve önceki taramalarda) yakın kopyası olan sayfanın kaydı, yoksa None."""
+        if not self._near_dup_loaded:
+            self._near_dup_loaded = True
+            for rec in self.store.pages():
+                if rec.minhash and not rec.duplicate_of:
+                    self.near_dup.add(rec.page_id, bytes.fromhex(rec.minhash))
+        hit = self.near_dup.find(sig, exclude=page_id)
+        if hit is not None:
+            rec = self.store.get_page(hit[0])
+            if rec is not None:
+                return rec
+        # Orijinal sayılır; sonraki sayfalar buna göre karşılaştırılır
+        self.near_dup.add(page_id, sig)
+        return None
+
+    async def _render(self, url: str) -> Optional[bytes]:
+        """Render edilmiş HTML; render yapılamazsa None (çağıran statik parse'la devam eder)."""
+        if self.renderer.disabled:
+            return None
+        if self.renderer.exhausted:
+            self.stats["render_over_budget"] += 1
+            return None
+        try:
+            # Render da host'a yük bindirir: fetch_stream'le aynı anahtarla (netloc,
+            # www. dahil) aynı politeness slot'u kullanılır
+            async with self.fetcher.scheduler.slot(urlsplit(url).netloc):
+                html = await self.renderer.render(url)
+        except Exception as e:
+            self.stats["render_failed"] += 1
+            print(f"[RENDER] {url}: {e}")
+            return None
+        if html is None:
+            return None
+        self.stats["page_rendered"] += 1
+        return html.encode("utf-8")
+
+    async def _follow_links(self, depth: int, links: List[str], file_links: List[str]):
+        # Bulunan dosyaları işle
+        for f in file_links:
+            self._schedule_file_url(f, depth + 1)
+
+        # Yeni linkleri skorlayıp frontier'a ekle (bütçe bittiyse gerek yok)
+        if self._can_go_deeper(depth) and not self.budget.exhausted:
+            await self.frontier.push([self._scored(ln, depth + 1) for ln in links])
+
+    def _scored(self, url: str, depth: int) -> UrlContext:
+        ctx = UrlContext(url, depth)
+        ctx.priority = self.scorer.score(ctx)
+        return ctx
+
+    async def _load_progress_base(self):
+        """Resume edilen job'da önceki sayaçlar taban alınır; ilerleme geri gitmez."""
+        try:
+            row = await self.pg.get_job_progress(self.job.job_id)
+        except Exception as e:
+            print(f"[ERROR] job progress read failed: {e}")
             return
+        stats = row["stats"] if row is not None else None
+        if isinstance(stats, str):
+            stats = json.loads(stats or "{}")
+        self._progress_base = {k: v for k, v in (stats or {}).items() if isinstance(v, int)}
+
+    async def _save_progress(self):
+        """Sayaçları job_progress'e yazar; API ilerlemeyi COUNT(*) yerine buradan okur."""
+        stats = dict(self._progress_base)
+        for k, v in self.stats.items():
+            stats[k] = stats.get(k, 0) + v
+        try:
+            await self.pg.save_job_progress(
+                self.job.job_id,
+                pages_fetched=stats.get("page_fetched", 0),
+                files_extracted=stats.get("file_extracted", 0),
+                bytes_fetched=stats.get("page_bytes", 0) + stats.get("file_bytes", 0),
+                queue_depth=self.frontier.queued() + len(self._file_tasks),
+                stats=json.dumps(stats),
+            )
+        except Exception as e:
+            print(f"[ERROR] job progress write failed: {e}")
+
+    async def _progress_loop(self):
+        while True:
+            await asyncio.sleep(PROGRESS_INTERVAL_S)
+            await self._save_progress()
 
     async def run(self):
+        workers: List[asyncio.Task] = []
+        progress: Optional[asyncio.Task] = None
         try:
             await self.pg.connect()
+            await self._load_progress_base()
+            await self.writer.start()
             self.store.ensure_dirs(self.job)
 
             if self.job.incremental:
@@ -260,15 +588,21 @@ class Crawler:
 
             await self.fetcher.open()
 
-            queue: asyncio.Queue[UrlContext] = asyncio.Queue()
-            for u in self.job.start_urls:
-                if u not in self.enqueued_pages:
-                    self.enqueued_pages.add(u)
-                    queue.put_nowait(UrlContext(u, 0))
+            await self.frontier.start([p for p, _ in self.budget.path_budgets])
+            self.budget.restore(self.frontier.done_at_start, self.frontier.done_by_path_at_start)
+            await self.frontier.seed([
+                self._scored(self.canonicalizer.canonicalize(u), 0) for u in self.job.start_urls
+            ])
 
-            workers = [asyncio.create_task(self._worker(i + 1, queue)) for i in range(self.job.concurrency)]
+            progress = asyncio.create_task(self._progress_loop())
+            workers = [asyncio.create_task(self._worker(i + 1)) for i in range(self.job.concurrency)]
 
-            await queue.join()
+            await asyncio.gather(*workers)
+            await self._drain_file_tasks()
+            await self.writer.flush()
+            if self.writer.stats["FAILED"]:
+                # Yazılamayan dokümanlar sessizce kaybolmasın: job DONE sayılmaz
+                raise RuntimeError(f"raw_documents: {self.writer.stats['FAILED']} doküman yazılamadı")
 
             # Eğer buraya kadar geldiyse iş başarıyla bitmiştir
             await self.pg.set_job_status(self.job.job_id, "DONE")
@@ -283,12 +617,59 @@ class Crawler:
             # Beklenmedik bir hata oluşursa
             print(f"[ERROR] Fatal job error: {e}")
             await self.pg.set_job_status(self.job.job_id, "FAILED", error=str(e))
+            raise  # daemon job'u DONE diye ezmesin
 
         finally:
             for w in workers:
                 w.cancel()
             await asyncio.gather(*workers, return_exceptions=True)
-
-            await self.fetcher.close()
+            if progress is not None:
+                progress.cancel()
+                await asyncio.gather(progress, return_exceptions=True)
+            # Bekleyen throttle tekrarları: kalıcı frontier'da satırlar resume'da kuyruğa döner
+            for t in list(self._release_tasks):
+                t.cancel()
+            await asyncio.gather(*self._release_tasks, return_exceptions=True)
+            for t in list(self._file_tasks):
+                t.cancel()
+            await asyncio.gather(*self._file_tasks, return_exceptions=True)
+            try:
+                await self.frontier.close()
+            except Exception as e:
+                print(f"[ERROR] frontier close failed: {e}")
+            if self._owns_extraction:
+                self.extraction.shutdown(wait=False)
+            if self._owns_parser:
+                self.parser.shutdown(wait=False)
+            if self.renderer is not None:
+                try:
+                    await self.renderer.stop()
+                except Exception as e:
+                    print(f"[ERROR] renderer stop failed: {e}")
+
+            if self._owns_fetcher:
+                await self.fetcher.close()
+            # Önce yazıcı: başarısız satırların index düzeltmeleri log kapanmadan yazılsın
+            try:
+                await self.writer.close()
+            except Exception as e:
+                print(f"[ERROR] raw_documents flush failed: {e}")
             await self.store.write_indexes(self.job)
-            await self.pg.close()
\ No newline at end of file
+            await self._save_progress()
+            print(f"[DB] raw_documents: {dict(self.stats)}")
+            print(f"[FETCH] {self.fetcher.stats}")
+            print(f"[POOL] {self.fetcher.pool_stats()}")
+            if self.parser is not None:
+                print(f"[PARSE] {self.parser.stats}")
+            print(f"[MEM] {self.memory_stats()}")
+            print(f"[URL] {self.canonicalizer.stats}")
+            print(f"[HOSTS] {self.fetcher.scheduler.stats()}")
+            print(f"[PAGES] {self.budget.stats()}")
+            if self.near_dup is not None:
+                print(f"[NEARDUP] {self.near_dup.stats}")
+            if self.renderer is not None:
+                print(f"[RENDER] {self.renderer.snapshot()}")
+            if self.fetcher.budget is not None:
+                print(f"[BUDGET] {self.fetcher.budget.snapshot()}")
+            if self._owns_pg:
+                await self.pg.close()
\ No newline at end of file
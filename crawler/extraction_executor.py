@@ -0,0 +1,105 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from .file_ingestion import extract_text_from_file, as_bytes
+
+
+class ExtractionTimeout(Exception):
+    pass
+
+
+class ExtractionExecutor:
+    """
+    Doküman metin çıkarımını (PyMuPDF, python-docx, ...) event loop dışında,
+    ayrı bir process pool'da çalıştırır. run() ile başka CPU ağırlıklı işler de
+    (örn. page_parser.parse_page) verilebilir.
+
+    - task_timeout_s: tek bir görevin süre limiti; aşılırsa pool yeniden kurulur
+      (takılan process öldürülür).
+    - max_tasks_per_child: her worker process bu kadar dokümandan sonra yenilenir
+      (parser'ların sızdırdığı bellek geri alınır).
+    - max_in_flight: aynı anda pool'a verilen görev sayısı üst sınırı.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        *,
+        task_timeout_s: float = 60.0,
+        max_tasks_per_child: Optional[int] = 50,
+        max_in_flight: Optional[int] = None,
+    ):
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+        self.task_timeout_s = task_timeout_s
+        self.max_tasks_per_child = max_tasks_per_child
+        self.max_in_flight = max_in_flight or self.max_workers * 2
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._generation = 0
+        self._slots: Optional[asyncio.Semaphore] = None
+
+        self.stats = {"tasks": 0, "timeouts": 0, "recycles": 0, "errors": 0}
+
+    def _ensure_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                max_tasks_per_child=self.max_tasks_per_child,
+            )
+            self._generation += 1
+        return self._pool
+
+    def _recycle(self, generation: int):
+        # Başka bir görev pool'u zaten yenilediyse tekrar öldürme
+        if self._pool is None or generation != self._generation:
+            return
+        pool = self._pool
+        self._pool = None
+        self.stats["recycles"] += 1
+
+        # Takılan görevi durdurmanın tek yolu process'i öldürmek
+        for proc in list((getattr(pool, "_processes", None) or {}).values()):
+            try:
+                proc.kill()
+            except Exception:
+                pass
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, fn, *args, timeout: Optional[float] = None):
+        """fn(*args)'ı process pool'da çalıştırır (fn pickle edilebilir, modül seviyesinde olmalı)."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+        timeout = self.task_timeout_s if timeout is None else timeout
+
+        async with self._slots:
+            # Pool başka bir görevin timeout'u yüzünden kırıldıysa bir kez daha dene
+            for attempt in range(2):
+                pool = self._ensure_pool()
+                generation = self._generation
+                fut = asyncio.wrap_future(pool.submit(fn, *args))
+                self.stats["tasks"] += 1
+                try:
+                    return await asyncio.wait_for(fut, timeout)
+                except asyncio.TimeoutError:
+                    self.stats["timeouts"] += 1
+                    self._recycle(generation)
+                    raise ExtractionTimeout(f"extraction exceeded {timeout:.0f}s")
+                except BrokenProcessPool:
+                    self._recycle(generation)
+                    if attempt == 1:
+                        self.stats["errors"] += 1
+                        raise
+
+    async def extract(self, source, ext: str) -> str:
+        # memoryview pickle edilemez; process'e bytes olarak gider
+        if not isinstance(source, str):
+            source = as_bytes(source)
+        return await self.run(extract_text_from_file, source, ext)
+
+    def shutdown(self, wait: bool = True):
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+            self._pool = None
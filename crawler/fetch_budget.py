@@ -0,0 +1,116 @@
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional
+
+
+class FairShareBudget:
+    """
+    Aynı process'te koşan job'lar arasında paylaşılan global fetch
+    eşzamanlılık bütçesi.
+
+    Bütçe doluyken boşalan slot, bekleyenler arasında o anda en az slot
+    kullanan tenant'a (agent_id/project_id) verilir; eşitlikte tenant'lar
+    sırayla gelir. Böylece çok job'u olan bir tenant diğerlerini aç bırakamaz:
+    her tenant yaklaşık total / aktif_tenant kadar slot alır (max-min fairness).
+    """
+
+    def __init__(self, total: int = 64):
+        self.total = total
+        self._inflight = 0
+        self._by_tenant: Dict[str, int] = {}
+        # tenant -> bekleyen future'lar (FIFO)
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {}
+        # Eşitlik bozma için round-robin sırası
+        self._rr: Deque[str] = deque()
+
+        self.stats = {"granted": 0, "waited": 0}
+        self._granted_by_tenant: Dict[str, int] = {}
+
+    def _grant(self, tenant: str):
+        self._inflight += 1
+        self._by_tenant[tenant] = self._by_tenant.get(tenant, 0) + 1
+        self._granted_by_tenant[tenant] = self._granted_by_tenant.get(tenant, 0) + 1
+        self.stats["granted"] += 1
+
+    def _next_tenant(self) -> Optional[str]:
+        best = None
+        best_n = None
+        for tenant in self._rr:
+            if not self._waiters.get(tenant):
+                continue
+            n = self._by_tenant.get(tenant, 0)
+            if best_n is None or n < best_n:
+                best, best_n = tenant, n
+        return best
+
+    def _wake(self):
+        while self._inflight < self.total:
+            tenant = self._next_tenant()
+            if tenant is None:
+                return
+            q = self._waiters[tenant]
+            fut = q.popleft()
+            if not q:
+                del self._waiters[tenant]
+            # Seçilen tenant round-robin'de sona geçer
+            self._rr.remove(tenant)
+            self._rr.append(tenant)
+            if fut.done():
+                continue
+            self._grant(tenant)
+            fut.set_result(None)
+
+    async def acquire(self, tenant: str):
+        if self._inflight < self.total and not self._waiters:
+            self._grant(tenant)
+            return
+
+        self.stats["waited"] += 1
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(tenant, deque()).append(fut)
+        if tenant not in self._rr:
+            self._rr.append(tenant)
+        self._wake()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # Slot verilmişti ama kullanılmayacak
+                self.release(tenant)
+            else:
+                q = self._waiters.get(tenant)
+                if q and fut in q:
+                    q.remove(fut)
+                    if not q:
+                        del self._waiters[tenant]
+            raise
+
+    def release(self, tenant: str):
+        self._inflight -= 1
+        n = self._by_tenant.get(tenant, 0) - 1
+        if n > 0:
+            self._by_tenant[tenant] = n
+        else:
+            self._by_tenant.pop(tenant, None)
+            if not self._waiters.get(tenant) and tenant in self._rr:
+                self._rr.remove(tenant)
+        self._wake()
+
+    @asynccontextmanager
+    async def slot(self, tenant: str):
+        await self.acquire(tenant)
+        try:
+            yield
+        finally:
+            self.release(tenant)
+
+    def snapshot(self) -> dict:
+        return {
+            "total": self.total,
+            "inflight": self._inflight,
+            "by_tenant": dict(self._by_tenant),
+            "waiting": {t: len(q) for t, q in self._waiters.items()},
+            "granted_by_tenant": dict(self._granted_by_tenant),
+            **self.stats,
+        }
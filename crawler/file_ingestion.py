@@ -1,5 +1,6 @@
+import asyncio
+import io
 import os
-import tempfile
 from urllib.parse import urlparse
 
 import fitz
@@ -7,24 +8,47 @@ from docx import Document
 from pptx import Presentation
 from openpyxl import load_workbook
 
-from utils import hash_url
-
 
 def _ext(url: str) -> str:
     return os.path.splitext(urlparse(url).path)[1].lower()
 
 
-def extract_text_from_file(path: str, ext: str) -> str:
+# Bu boyutun üzerindeki dokümanlar diske yazılıp path üzerinden okunur
+SPILL_THRESHOLD_BYTES = 16_000_000
+
+
+def as_bytes(buf) -> bytes:
+    """bytes/bytearray/memoryview -> bytes; mümkünse kopyalamadan."""
+    if isinstance(buf, bytes):
+        return buf
+    if isinstance(buf, memoryview) and isinstance(buf.obj, bytes) and buf.nbytes == len(buf.obj):
+        return buf.obj
+    return bytes(buf)
+
+
+def extract_text_from_file(source, ext: str) -> str:
+    """
+    source: dosya yolu (str) ya da içerik (bytes / bytearray / memoryview).
+    Buffer verildiğinde parser'lar doğrudan bellekten okur, diske yazılmaz.
+    """
+    in_memory = not isinstance(source, str)
+    if in_memory:
+        data = as_bytes(source)
+        # BytesIO(bytes) CPython'da buffer'ı kopyalamaz
+        src = io.BytesIO(data)
+    else:
+        src = source
+
     try:
         if ext == ".pdf":
-            doc = fitz.open(path)
+            doc = fitz.open(stream=data, filetype="pdf") if in_memory else fitz.open(src)
             try:
                 return "\n".join(page.get_text() for page in doc)
             finally:
                 doc.close()
 
         if ext == ".docx": # .doc'u ayırdık çünkü python-docx .doc okuyamaz
-            doc = Document(path)
+            doc = Document(src)
             return "\n".join(p.text for p in doc.paragraphs)
 
         if ext == ".doc":
@@ -34,7 +58,7 @@ def extract_text_from_file(path: str, ext: str) -> str:
             return "[Legacy .doc file - extraction not supported with current library]"
 
         if ext in (".ppt", ".pptx"):
-            prs = Presentation(path)
+            prs = Presentation(src)
             out = []
             for slide in prs.slides:
                 for shape in slide.shapes:
@@ -45,7 +69,7 @@ def extract_text_from_file(path: str, ext: str) -> str:
             return "\n".join(out)
 
         if ext in (".xls", ".xlsx"):
-            wb = load_workbook(path, data_only=True)
+            wb = load_workbook(src, data_only=True)
             out = []
             for ws in wb.worksheets:
                 for row in ws.iter_rows(values_only=True):
@@ -55,7 +79,9 @@ def extract_text_from_file(path: str, ext: str) -> str:
             return "\n".join(out)
 
         if ext == ".txt":
-            with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            if in_memory:
+                return str(data, "utf-8", "ignore")
+            with open(src, "r", encoding="utf-8", errors="ignore") as f:
                 return f.read()
 
     except Exception as e:
@@ -65,35 +91,80 @@ def extract_text_from_file(path: str, ext: str) -> str:
     return ""
 
 
-async def download_extract_delete(fetcher, url: str, *, max_bytes: int | None = None):
+# Doküman linki HTML dönüyorsa (hata/login sayfası) gövdeyi indirmeye gerek yok
+BLOCKED_FILE_CONTENT_TYPES = ("text/html",)
+
+
+async def download_extract_delete(
+    fetcher,
+    url: str,
+    *,
+    max_bytes: int | None = None,
+    executor=None,
+    spill_threshold: int | None = SPILL_THRESHOLD_BYTES,
+    etag: str = "",
+    last_modified: str = "",
+    tenant: str = "",
+):
+    """
+    executor verilirse (ExtractionExecutor) metin çıkarımı process pool'da yapılır,
+    yoksa event loop'u bloklamamak için bir thread'de çalıştırılır.
+
+    Gövde akış halinde indirilir: Content-Length/Content-Type uygun değilse hiç
+    okunmaz, max_bytes aşılırsa yarıda kesilir. İçerik bellekteki buffer'dan
+    çıkarılır; sadece spill_threshold'u aşan dokümanlar geçici dosyaya yazılır.
+
+    etag / last_modified önceki taramadan geliyorsa koşullu istek yapılır;
+    304 dönerse meta["not_modified"] True olur ve hiçbir şey indirilmez.
+    """
     ext = _ext(url) or ".bin"
-    tmp_dir = tempfile.gettempdir()
-    tmp_path = os.path.join(tmp_dir, f"crawl_{hash_url(url)}{ext}")
+    res = None
 
     try:
-        # Crawler'dan fetcher ve url'nin doğru sırayla geldiğinden emin ol
-        data, ctype = await fetcher.fetch(url)
-        if not data:
+        res = await fetcher.fetch_stream(
+            url,
+            max_bytes=max_bytes,
+            blocked_types=BLOCKED_FILE_CONTENT_TYPES if ext != ".txt" else (),
+            spool_threshold=spill_threshold,
+            spool_suffix=ext,
+            etag=etag,
+            last_modified=last_modified,
+            tenant=tenant,
+        )
+        ctype = res.content_type
+
+        if res.not_modified:
+            return "", {"ext": ext, "size": 0, "not_modified": True}, ctype
+
+        if res.aborted == "too_large":
+            return "", {"ext": ext, "size": res.size, "skipped_too_large": True,
+                        "bytes_saved": res.bytes_saved}, ctype
+        if res.aborted == "content_type":
+            return "", {"ext": ext, "size": 0, "skipped_content_type": True,
+                        "bytes_saved": res.bytes_saved}, ctype
+        if res.aborted == "robots":
+            return "", {"ext": ext, "size": 0, "skipped_robots": True}, ctype
+        if res.error:
+            return "", {"ext": ext, "size": 0, "error": res.error}, ctype
+        if not res.data and res.path is None:
             return "", {"ext": ext, "size": 0}, ctype
 
-        if max_bytes is not None and len(data) > max_bytes:
-            return "", {"ext": ext, "size": len(data), "skipped_too_large": True}, ctype
-
-        with open(tmp_path, "wb") as f:
-            f.write(data)
+        source = res.path if res.path is not None else memoryview(res.data)
 
-        # Hata kontrolünü burada yapıyoruz
-        text = extract_text_from_file(tmp_path, ext)
-        meta = {"ext": ext, "size": len(data)}
+        if executor is not None:
+            text = await executor.extract(source, ext)
+        else:
+            text = await asyncio.to_thread(extract_text_from_file, source, ext)
+        meta = {
+            "ext": ext, "size": res.size, "spilled": res.path is not None,
+            "etag": res.etag, "last_modified": res.last_modified,
+        }
         return text, meta, ctype
 
     except Exception as e:
-        # İndirme veya yazma aşamasındaki hatalar için
+        # İndirme veya çıkarım aşamasındaki hatalar için
         return "", {"ext": ext, "size": 0, "error": str(e)}, None
 
     finally:
-        try:
-            if os.path.exists(tmp_path):
-                os.remove(tmp_path)
-        except Exception:
-            pass
\ No newline at end of file
+        if res is not None:
+            res.cleanup()
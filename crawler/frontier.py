@@ -0,0 +1,316 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from models import UrlContext
+from utils import get_domain
+from .seen_set import make_seen_set
+
+
+class MemoryFrontier:
+    """
+    Process içi frontier: öncelik kuyruğu + daha önce kuyruğa girmiş URL'lerin
+    seen-set'i (bkz. seen_set.make_seen_set).
+
+    Yüksek UrlContext.priority önce çıkar; eşit önceliklerde bulunma sırası
+    (FIFO) korunur.
+
+    pop() kuyruk boşaldığında ve elde işlenen sayfa kalmadığında None döner;
+    worker'lar bunu "iş bitti" olarak yorumlar.
+    """
+
+    def __init__(self, seen=None):
+        self._heap: List[Tuple[float, int, UrlContext]] = []
+        self._seq = itertools.count()
+        self.seen = seen if seen is not None else make_seen_set()
+        self._inflight = 0
+        self._cond = asyncio.Condition()
+        # Önceki çalıştırmalarda çekilmiş sayfa sayısı (bellek içi frontier'da hep 0)
+        self.done_at_start = 0
+        self.done_by_path_at_start: Dict[str, int] = {}
+
+    async def start(self, path_prefixes: Iterable[str] = ()):
+        pass
+
+    async def seed(self, items: Iterable[UrlContext]):
+        await self.push(items)
+
+    async def push(self, items: Iterable[UrlContext]):
+        added = False
+        for ctx in items:
+            if not self.seen.add(ctx.url):
+                continue
+            heapq.heappush(self._heap, (-ctx.priority, next(self._seq), ctx))
+            added = True
+        if added:
+            async with self._cond:
+                self._cond.notify_all()
+
+    async def pop(self) -> Optional[UrlContext]:
+        async with self._cond:
+            while True:
+                if self._heap:
+                    self._inflight += 1
+                    return heapq.heappop(self._heap)[2]
+                if self._inflight == 0:
+                    # Uyuyan diğer worker'lar da çıkabilsin
+                    self._cond.notify_all()
+                    return None
+                await self._cond.wait()
+
+    async def ack(self, ctx: UrlContext, ok: bool = True, error: Optional[str] = None):
+        async with self._cond:
+            self._inflight -= 1
+            self._cond.notify_all()
+
+    async def release(self, ctx: UrlContext):
+        """İşlenmeyecek URL'i kuyruğa geri koyar (ör. sayfa bütçesi bittiğinde)."""
+        heapq.heappush(self._heap, (-ctx.priority, next(self._seq), ctx))
+        await self.ack(ctx)
+
+    def queued(self) -> int:
+        return len(self._heap)
+
+    async def close(self):
+        pass
+
+
+class PostgresFrontier:
+    """
+    url_frontier tablosunda tutulan kalıcı frontier.
+
+    - Worker'lar satırları batch_size'lık gruplar halinde FOR UPDATE SKIP LOCKED
+      ile claim eder (queued -> processing); önce priority'si yüksek olanlar.
+    - Bulunan linkler push_batch'lik gruplar halinde tek INSERT ile eklenir;
+      (job_id, url, kind) UNIQUE olduğu için tekrar eden URL'ler DB'de elenir.
+    - Tamamlanan satırlar toplu olarak done/failed işaretlenir.
+
+    Bellekte sadece claim edilmiş küçük bir tampon ve yazılmayı bekleyen linkler
+    tutulur. Yarıda kalan bir job tekrar çalıştığında processing'de kalmış ve
+    yeniden denenebilir failed satırlar kuyruğa geri alınır, done olanlar
+    tekrar çekilmez.
+    """
+
+    KIND = "page"
+
+    def __init__(
+        self,
+        pg,
+        job_id: str,
+        *,
+        batch_size: int = 50,
+        push_batch: int = 500,
+        ack_batch: int = 200,
+        max_retries: int = 2,
+        heartbeat_s: float = 30.0,
+    ):
+        self.pg = pg
+        self.job_id = job_id
+        self.batch_size = batch_size
+        self.push_batch = push_batch
+        self.ack_batch = ack_batch
+        self.max_retries = max_retries
+        self.heartbeat_s = heartbeat_s
+
+        self._local: Deque[UrlContext] = deque()
+        self._pending_push: List[UrlContext] = []
+        self._done_ids: List[int] = []
+        self._fetched_ids: List[int] = []
+        self._inflight = 0
+        self._queued_estimate = 0
+        self._cond = asyncio.Condition()
+        self._claim_lock = asyncio.Lock()
+        self._last_heartbeat = 0.0
+        self.done_at_start = 0
+        self.done_by_path_at_start: Dict[str, int] = {}
+
+    async def start(self, path_prefixes: Iterable[str] = ()):
+        """path_prefixes: PageBudget path önekleri; her biri için çekilmiş sayfa sayısı da geri yüklenir."""
+        n = await self.pg.requeue_frontier(self.job_id, self.KIND, self.max_retries)
+        if n:
+            print(f"[FRONTIER] job {self.job_id}: {n} URL kuyruğa geri alındı (resume)")
+        self._queued_estimate = await self.pg.count_frontier(self.job_id, self.KIND, "queued")
+        # Resume'da sayfa bütçesi kaldığı yerden devam etsin; kapsam dışı / path
+        # bütçesi yüzünden çekilmeden done olan satırlar sayılmaz
+        self.done_at_start = await self.pg.count_fetched_frontier(self.job_id, self.KIND)
+        if self.done_at_start and path_prefixes:
+            self.done_by_path_at_start = await self.pg.count_fetched_frontier_by_prefix(
+                self.job_id, self.KIND, list(path_prefixes)
+            )
+
+    async def seed(self, items: Iterable[UrlContext]):
+        self._pending_push.extend(items)
+        await self._flush_pushes()
+
+    async def push(self, items: Iterable[UrlContext]):
+        self._pending_push.extend(items)
+        if len(self._pending_push) >= self.push_batch:
+            await self._flush_pushes()
+        async with self._cond:
+            self._cond.notify_all()
+
+    async def _flush_pushes(self):
+        if not self._pending_push:
+            return
+        batch, self._pending_push = self._pending_push, []
+        self._queued_estimate += await self.pg.enqueue_frontier(
+            self.job_id,
+            self.KIND,
+            [(c.url, get_domain(c.url), c.depth, c.priority) for c in batch],
+        )
+
+    async def _flush_acks(self, force: bool = False):
+        if self._done_ids and (force or len(self._done_ids) >= self.ack_batch):
+            ids, self._done_ids = self._done_ids, []
+            fetched, self._fetched_ids = self._fetched_ids, []
+            await self.pg.complete_frontier(ids, fetched)
+
+        now = time.monotonic()
+        if force or now - self._last_heartbeat >= self.heartbeat_s:
+            self._last_heartbeat = now
+            # Uzun süren job'lar stale sayılmasın
+            await self.pg.touch_job(self.job_id)
+
+    async def _claim(self) -> int:
+        async with self._claim_lock:
+            if self._local:
+                return len(self._local)
+            await self._flush_pushes()
+            rows = await self.pg.claim_frontier(self.job_id, self.KIND, self.batch_size)
+            for r in rows:
+                self._local.append(UrlContext(r["url"], r["depth"], frontier_id=r["id"], priority=r["priority"]))
+            self._queued_estimate = max(0, self._queued_estimate - len(rows))
+            return len(rows)
+
+    async def pop(self) -> Optional[UrlContext]:
+        while True:
+            if self._local:
+                self._inflight += 1
+                return self._local.popleft()
+
+            if await self._claim():
+                continue
+
+            if self._inflight == 0 and not self._pending_push:
+                async with self._cond:
+                    self._cond.notify_all()
+                return None
+
+            # Başka worker'lar hâlâ sayfa işliyor; yeni link gelebilir
+            async with self._cond:
+                try:
+                    await asyncio.wait_for(self._cond.wait(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def ack(self, ctx: UrlContext, ok: bool = True, error: Optional[str] = None):
+        if ctx.frontier_id is not None:
+            if ok:
+                self._done_ids.append(ctx.frontier_id)
+                if ctx.fetched:
+                    self._fetched_ids.append(ctx.frontier_id)
+            else:
+                await self.pg.fail_frontier(ctx.frontier_id, error or "")
+        await self._flush_acks()
+        self._inflight -= 1
+        async with self._cond:
+            self._cond.notify_all()
+
+    async def release(self, ctx: UrlContext):
+        """İşlenmeyecek URL'i retry sayacını artırmadan queued'a geri bırakır."""
+        if ctx.frontier_id is not None:
+            await self.pg.release_frontier([ctx.frontier_id])
+        self._inflight -= 1
+        async with self._cond:
+            self._cond.notify_all()
+
+    def queued(self) -> int:
+        return self._queued_estimate + len(self._local) + len(self._pending_push)
+
+    async def close(self):
+        await self._flush_pushes()
+        await self._flush_acks(force=True)
+        if self._local:
+            # Claim edilip işlenmeyen satırları bir sonraki çalıştırmaya bırak
+            ids = [c.frontier_id for c in self._local if c.frontier_id is not None]
+            self._local.clear()
+            await self.pg.release_frontier(ids)
+
+
+class PageBudget:
+    """
+    Job'un sayfa bütçesi: toplamda max_total, path_budgets'taki her path
+    öneki için ayrıca kendi limiti kadar sayfa çekilir.
+
+    take() worker URL'i frontier'dan alır almaz çağrılır; False dönerse sayfa
+    çekilmez (bütçe bittiyse URL kuyruğa geri bırakılır).
+    Toplam bütçe bittiğinde exhausted True olur ve worker'lar durur.
+    """
+
+    def __init__(self, max_total: int = 0, path_budgets: Optional[Dict[str, int]] = None, used: int = 0):
+        self.max_total = max_total or 0
+        # Uzun önek önce eşleşsin (/haber/2024 > /haber)
+        self.path_budgets = sorted(
+            ((p.rstrip("/") or "/", n) for p, n in (path_budgets or {}).items()),
+            key=lambda x: len(x[0]),
+            reverse=True,
+        )
+        self.used = used
+        self.used_by_path: Dict[str, int] = {p: 0 for p, _ in self.path_budgets}
+        self.skipped_by_path: Dict[str, int] = {}
+
+    @property
+    def exhausted(self) -> bool:
+        return self.max_total > 0 and self.used >= self.max_total
+
+    def _prefix(self, url: str) -> Optional[Tuple[str, int]]:
+        path = urlparse(url).path or "/"
+        for p, n in self.path_budgets:
+            if p == "/" or path == p or path.startswith(p + "/"):
+                return p, n
+        return None
+
+    def take(self, url: str) -> bool:
+        if self.exhausted:
+            return False
+        hit = self._prefix(url)
+        if hit is not None:
+            p, n = hit
+            if self.used_by_path[p] >= n:
+                self.skipped_by_path[p] = self.skipped_by_path.get(p, 0) + 1
+                return False
+            self.used_by_path[p] += 1
+        self.used += 1
+        return True
+
+    def restore(self, used: int, used_by_path: Dict[str, int]):
+        """Resume: önceki çalıştırmalarda çekilmiş sayfaları (toplam ve path başına) sayar."""
+        self.used = used
+        for p, n in used_by_path.items():
+            if p in self.used_by_path:
+                self.used_by_path[p] = n
+
+    def give_back(self, url: str):
+        """take() ile düşülen sayfa çekilmeden kuyruğa döndüyse bütçeyi iade eder."""
+        hit = self._prefix(url)
+        if hit is not None and self.used_by_path[hit[0]] > 0:
+            self.used_by_path[hit[0]] -= 1
+        self.used = max(0, self.used - 1)
+
+    def stats(self) -> dict:
+        return {
+            "used": self.used,
+            "max_total": self.max_total,
+            "by_path": dict(self.used_by_path),
+            "skipped_by_path": dict(self.skipped_by_path),
+        }
+
+
+def make_frontier(job, pg):
+    if getattr(job, "frontier", "memory") == "postgres":
+        return PostgresFrontier(pg, job.job_id)
+    return MemoryFrontier(seen=make_seen_set(job.seen_set, job.seen_set_fp_rate))
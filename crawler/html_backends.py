@@ -0,0 +1,200 @@
+"""
+HTML parse backend'leri.
+
+Her backend parse(html) -> (text, hrefs, canonical_href) döner:
+  text           -> script/style/noscript/template dışındaki metin düğümleri, her
+                    biri strip edilip "\\n" ile birleştirilmiş (BeautifulSoup'un
+                    get_text("\\n", strip=True) çıktısıyla aynı biçim)
+  hrefs          -> <a href> değerleri, belge sırasıyla, ham haliyle
+  canonical_href -> ilk <link rel="canonical" href> değeri ya da None
+
+SKIP_TAGS'in altındaki her şey (metin, link, canonical) üç backend'de de
+yok sayılır: <template> içeriği render edilmez, <noscript> JS açık bir
+tarayıcıda görünmez.
+
+URL çözümleme ve tekrar eleme LinkExtractor'da ortaktır.
+"""
+import os
+import re
+from typing import List, Optional, Tuple
+
+SKIP_TAGS = ("script", "style", "noscript", "template")
+
+# lxml, encoding bildirimi içeren str'i kabul etmez
+_xml_decl = re.compile(r"^\s*<\?xml[^>]*\?>")
+# lexbor <head> içindeki <noscript>'te izin verilmeyen etiketi görünce noscript'i
+# kapatıp içeriği <body>'ye taşır; bu yüzden noscript'ler parse'tan önce atılır
+_noscript = re.compile(r"<noscript\b[^>]*>.*?</noscript\s*>", re.I | re.S)
+
+ParseResult = Tuple[str, List[str], Optional[str]]
+
+
+def _is_canonical(rel) -> bool:
+    if not rel:
+        return False
+    if isinstance(rel, str):
+        rel = rel.split()
+    return "canonical" in rel
+
+
+class Bs4Backend:
+    """Referans backend: BeautifulSoup + html.parser (eski davranış)."""
+
+    name = "bs4"
+
+    def __init__(self):
+        from bs4 import BeautifulSoup
+        self._bs = BeautifulSoup
+
+    def parse(self, html: str) -> ParseResult:
+        soup = self._bs(html or "", "html.parser")
+
+        for tag in soup(list(SKIP_TAGS)):
+            tag.decompose()
+
+        canonical = None
+        link = soup.find("link", rel="canonical", href=True)
+        if link is not None:
+            canonical = link["href"]
+
+        text = soup.get_text("\n", strip=True)
+
+        hrefs = [a.get("href") for a in soup.select("a[href]")]
+        return text, [h for h in hrefs if h], canonical
+
+
+class LxmlBackend:
+    """lxml.html; metin ve linkler ağaç üzerinde tek geçişte toplanır."""
+
+    name = "lxml"
+
+    def __init__(self):
+        import lxml.html
+        from lxml import etree
+        self._fromstring = lxml.html.document_fromstring
+        self._parser_error = etree.ParserError
+
+    def parse(self, html: str) -> ParseResult:
+        try:
+            root = self._fromstring(_xml_decl.sub("", html or "", count=1))
+        except (self._parser_error, ValueError):
+            # Boş belge
+            return "", [], None
+
+        parts: List[str] = []
+        hrefs: List[str] = []
+        canonical = None
+
+        # (element, kapanış_mı); tail kapanıştan sonra, çocuklardan sonra gelir
+        stack = [(root, False)]
+        while stack:
+            el, closing = stack.pop()
+            if closing:
+                tail = el.tail
+                if tail:
+                    tail = tail.strip()
+                    if tail:
+                        parts.append(tail)
+                continue
+
+            if el is not root:
+                stack.append((el, True))
+            tag = el.tag
+            if not isinstance(tag, str):
+                # yorum / processing instruction: metni yok, tail'i var
+                continue
+            if tag in SKIP_TAGS:
+                continue
+
+            if tag == "a":
+                href = el.get("href")
+                if href:
+                    hrefs.append(href)
+            elif tag == "link" and canonical is None and _is_canonical(el.get("rel")):
+                canonical = el.get("href") or None
+
+            text = el.text
+            if text:
+                text = text.strip()
+                if text:
+                    parts.append(text)
+
+            for child in reversed(el):
+                stack.append((child, False))
+
+        return "\n".join(parts), hrefs, canonical
+
+
+class SelectolaxBackend:
+    """selectolax (lexbor); skip tag'leri C tarafında atılır, sonra tek traverse."""
+
+    name = "selectolax"
+
+    def __init__(self):
+        from selectolax.lexbor import LexborHTMLParser
+        self._parser = LexborHTMLParser
+
+    def parse(self, html: str) -> ParseResult:
+        tree = self._parser(_noscript.sub("", html or ""))
+        root = tree.root
+        if root is None:
+            return "", [], None
+        tree.strip_tags(list(SKIP_TAGS))
+
+        parts: List[str] = []
+        hrefs: List[str] = []
+        canonical = None
+
+        for node in root.traverse(include_text=True):
+            tag = node.tag
+            if tag == "-text":
+                t = node.text(deep=False, strip=True)
+                if t:
+                    parts.append(t)
+            elif tag == "a":
+                href = node.attributes.get("href")
+                if href:
+                    hrefs.append(href)
+            elif tag == "link" and canonical is None and _is_canonical(node.attributes.get("rel")):
+                canonical = node.attributes.get("href") or None
+
+        return "\n".join(parts), hrefs, canonical
+
+
+BACKENDS = {
+    "bs4": Bs4Backend,
+    "lxml": LxmlBackend,
+    "selectolax": SelectolaxBackend,
+}
+
+# "auto" seçiminde denenme sırası (en hızlıdan)
+AUTO_ORDER = ("selectolax", "lxml", "bs4")
+
+
+def available_backends() -> List[str]:
+    out = []
+    for name, cls in BACKENDS.items():
+        try:
+            cls()
+        except ImportError:
+            continue
+        out.append(name)
+    return out
+
+
+def make_backend(name: Optional[str] = None):
+    """
+    name verilmezse HTML_PARSER ortam değişkeni (varsayılan "bs4") kullanılır.
+    "auto" -> kurulu olan en hızlı backend.
+    """
+    name = (name or os.getenv("HTML_PARSER") or "bs4").lower()
+    if name == "auto":
+        for candidate in AUTO_ORDER:
+            try:
+                return BACKENDS[candidate]()
+            except ImportError:
+                continue
+        raise RuntimeError("no HTML parser backend installed (bs4, lxml, selectolax)")
+    if name not in BACKENDS:
+        raise ValueError(f"unknown HTML parser backend: {name}")
+    return BACKENDS[name]()
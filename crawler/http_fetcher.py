@@ -1,56 +1,331 @@
-import asyncio
-from typing import Optional, Tuple
+import contextlib
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple
+from urllib.parse import urlsplit
 
 import aiohttp
 
+from .fetch_budget import FairShareBudget
+from .politeness import HostScheduler, THROTTLE_STATUSES
 
-class DomainLimiter:
-    def __init__(self, per_domain: int):
-        self.per_domain = per_domain
-        self._locks: dict[str, asyncio.Semaphore] = {}
+try:  # aiohttp br'yi ancak brotli kuruluysa çözebilir
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = "gzip, deflate, br"
+    except ImportError:
+        ACCEPT_ENCODING = "gzip, deflate"
 
-    def sem(self, domain: str) -> asyncio.Semaphore:
-        if domain not in self._locks:
-            self._locks[domain] = asyncio.Semaphore(self.per_domain)
-        return self._locks[domain]
+
+@dataclass
+class FetchResult:
+    url: str
+    # Redirect'ler sonrası yanıtın geldiği adres (relatif linkler buna göre çözülür)
+    final_url: str = ""
+    status: int = 0
+    content_type: str = ""
+    # Gövde ya bellekte (data) ya da spool edilmiş geçici dosyada (path) durur
+    data: Optional[bytes] = None
+    path: Optional[str] = None
+    size: int = 0
+    # "too_large" | "content_type" | "robots" -> gövde okunmadan/yarıda bırakıldı
+    aborted: Optional[str] = None
+    bytes_saved: int = 0
+    error: Optional[str] = None
+    # Koşullu istekler için sunucunun verdiği doğrulayıcılar
+    etag: str = ""
+    last_modified: str = ""
+
+    @property
+    def not_modified(self) -> bool:
+        return self.status == 304
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.aborted is None and (self.data is not None or self.path is not None)
+
+    def cleanup(self):
+        if self.path is not None:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+            self.path = None
 
 
 class HttpFetcher:
+    """
+    Tek bir ClientSession + ayarlı TCPConnector üzerinden çalışır.
+
+    Aynı process'teki job'lar tek bir fetcher'ı paylaşabilir: bağlantı havuzu,
+    DNS cache'i ve host zamanlayıcısı (politeness) job'lar arasında ortaktır.
+    Paylaşılan fetcher'ı sahibi kapatır (Crawler dışarıdan verileni kapatmaz).
+
+    limit           -> toplam açık bağlantı üst sınırı
+    limit_per_host  -> host başına bağlantı; verilmezse zamanlayıcının
+                       max_concurrency'si (zamanlayıcı izin verdiği kadar soket)
+    dns_ttl_s       -> DNS cache süresi
+    keepalive_s     -> boşta bekleyen bağlantının havuzda tutulma süresi
+    budget          -> job'lar arası global eşzamanlılık bütçesi (FairShareBudget);
+                       fetch_stream(tenant=...) ile tenant bazında adil paylaşılır
+    """
+
     def __init__(
         self,
         timeout_s: int = 20,
         per_domain: int = 2,
         user_agent: str = "aime_crawler/1.0",
+        chunk_size: int = 64 * 1024,
+        respect_robots: bool = True,
+        scheduler: Optional[HostScheduler] = None,
+        limit: int = 100,
+        limit_per_host: Optional[int] = None,
+        dns_ttl_s: int = 300,
+        keepalive_s: float = 30.0,
+        compress: bool = True,
+        budget: Optional[FairShareBudget] = None,
     ):
         self._timeout = aiohttp.ClientTimeout(total=timeout_s)
         self._session: Optional[aiohttp.ClientSession] = None
-        self._ua = user_agent
-        self._limiter = DomainLimiter(per_domain)
+        self.user_agent = user_agent
+        self._chunk_size = chunk_size
+        self.respect_robots = respect_robots
+        self.scheduler = scheduler or HostScheduler(
+            initial_concurrency=per_domain,
+            user_agent=user_agent.split("/", 1)[0],
+        )
+
+        self.limit = limit
+        self.limit_per_host = limit_per_host or self.scheduler.max_concurrency
+        self.dns_ttl_s = dns_ttl_s
+        self.keepalive_s = keepalive_s
+        self.compress = compress
+        self.budget = budget
+
+        self.stats = {
+            "aborted_too_large": 0, "aborted_content_type": 0, "bytes_saved": 0,
+            "spooled": 0, "not_modified": 0, "aborted_robots": 0,
+        }
+        # TraceConfig sayaçları
+        self.pool = {
+            "requests": 0, "conn_created": 0, "conn_reused": 0,
+            "dns_hits": 0, "dns_misses": 0,
+        }
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        tc = aiohttp.TraceConfig()
+
+        def counter(key):
+            async def _inc(session, ctx, params):
+                self.pool[key] += 1
+            return _inc
+
+        tc.on_request_start.append(counter("requests"))
+        tc.on_connection_create_end.append(counter("conn_created"))
+        tc.on_connection_reuseconn.append(counter("conn_reused"))
+        tc.on_dns_cache_hit.append(counter("dns_hits"))
+        tc.on_dns_cache_miss.append(counter("dns_misses"))
+        return tc
 
     async def open(self):
         if self._session is None or self._session.closed:
-            headers = {"User-Agent": self._ua}
-            self._session = aiohttp.ClientSession(timeout=self._timeout, headers=headers)
+            headers = {"User-Agent": self.user_agent}
+            if self.compress:
+                headers["Accept-Encoding"] = ACCEPT_ENCODING
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                use_dns_cache=True,
+                ttl_dns_cache=self.dns_ttl_s,
+                keepalive_timeout=self.keepalive_s,
+                enable_cleanup_closed=True,
+            )
+            self._session = aiohttp.ClientSession(
+                timeout=self._timeout,
+                headers=headers,
+                connector=connector,
+                auto_decompress=True,
+                trace_configs=[self._trace_config()],
+            )
 
     async def close(self):
         if self._session is not None and not self._session.closed:
             await self._session.close()
         self._session = None
 
-    async def fetch(self, url: str, domain: Optional[str] = None) -> Tuple[Optional[bytes], str]:
+    def pool_stats(self) -> dict:
+        p = self.pool
+        conns = p["conn_created"] + p["conn_reused"]
+        lookups = p["dns_hits"] + p["dns_misses"]
+        return {
+            **p,
+            "reuse_rate": round(p["conn_reused"] / conns, 3) if conns else None,
+            "dns_hit_rate": round(p["dns_hits"] / lookups, 3) if lookups else None,
+        }
+
+    async def fetch(
+        self,
+        url: str,
+        domain: Optional[str] = None,
+        max_bytes: Optional[int] = None,
+    ) -> Tuple[Optional[bytes], str]:
         """
         Returns (data_bytes, content_type). data_bytes None if failed.
-        If domain is provided, limits concurrency per-domain.
+        Concurrency/rate is limited per host by the HostScheduler (domain is kept
+        for backwards compatibility and ignored).
+        If max_bytes is provided, bodies over the budget are aborted (data None).
+        """
+        res = await self.fetch_stream(url, domain=domain, max_bytes=max_bytes)
+        if not res.ok:
+            return None, res.content_type
+        return res.data, res.content_type
+
+    async def fetch_stream(
+        self,
+        url: str,
+        domain: Optional[str] = None,
+        *,
+        max_bytes: Optional[int] = None,
+        blocked_types: Sequence[str] = (),
+        spool_threshold: Optional[int] = None,
+        spool_suffix: str = "",
+        etag: str = "",
+        last_modified: str = "",
+        tenant: str = "",
+    ) -> FetchResult:
+        """
+        Gövdeyi parça parça okur.
+
+        - Content-Length max_bytes'ı aşıyorsa ya da Content-Type blocked_types'tan
+          biriyle eşleşiyorsa gövde hiç okunmaz.
+        - Okuma sırasında max_bytes aşılırsa indirme yarıda kesilir.
+        - spool_threshold aşılınca gövde bellek yerine geçici dosyaya yazılır
+          (FetchResult.path, uzantısı spool_suffix); çağıran cleanup() ile siler.
+        - etag / last_modified verilirse If-None-Match / If-Modified-Since
+          gönderilir; sunucu 304 dönerse gövde yoktur (res.not_modified).
         """
         await self.open()
         assert self._session is not None
 
-        sem = self._limiter.sem(domain or "_")
-        async with sem:
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        res = FetchResult(url=url)
+        if self.respect_robots and not await self.scheduler.allowed(url, self._fetch_robots):
+            return self._abort(res, "robots", 0)
+
+        host = urlsplit(url).netloc
+        # Önce host nezaketi beklenir; global bütçe sadece gerçekten istek atılacakken tutulur
+        async with self.scheduler.slot(host), self._budget_slot(tenant):
+            t0 = time.monotonic()
             try:
-                async with self._session.get(url, allow_redirects=True) as resp:
-                    ctype = resp.headers.get("Content-Type", "") or ""
-                    data = await resp.read()
-                    return data, ctype
-            except Exception:
-                return None, ""
+                async with self._session.get(url, allow_redirects=True, headers=headers or None) as resp:
+                    self.scheduler.record(
+                        host,
+                        status=resp.status,
+                        latency_s=time.monotonic() - t0,
+                        retry_after=resp.headers.get("Retry-After"),
+                    )
+                    res.status = resp.status
+                    res.final_url = str(resp.url)
+                    if resp.status in THROTTLE_STATUSES:
+                        res.error = f"HTTP {resp.status}"
+                        return res
+                    res.content_type = resp.headers.get("Content-Type", "") or ""
+                    res.etag = resp.headers.get("ETag", "") or ""
+                    res.last_modified = resp.headers.get("Last-Modified", "") or ""
+                    declared = resp.content_length
+
+                    if res.not_modified:
+                        self.stats["not_modified"] += 1
+                        res.data = b""
+                        return res
+
+                    ctype = res.content_type.lower()
+                    if ctype and any(t in ctype for t in blocked_types):
+                        return self._abort(res, "content_type", declared or 0)
+
+                    if max_bytes is not None and declared is not None and declared > max_bytes:
+                        return self._abort(res, "too_large", declared)
+
+                    await self._read_body(resp, res, max_bytes, spool_threshold, spool_suffix)
+                    return res
+            except Exception as e:
+                if res.status == 0:
+                    self.scheduler.record(host, error=True)
+                res.cleanup()
+                res.data = None
+                res.error = str(e) or e.__class__.__name__
+                return res
+
+    def _budget_slot(self, tenant: str):
+        if self.budget is None:
+            return contextlib.nullcontext()
+        return self.budget.slot(tenant or "_")
+
+    async def _fetch_robots(self, robots_url: str) -> Tuple[int, str]:
+        assert self._session is not None
+        async with self._session.get(robots_url, allow_redirects=True) as resp:
+            if resp.status != 200:
+                return resp.status, ""
+            body = await resp.content.read(512 * 1024)
+            return resp.status, body.decode("utf-8", errors="ignore")
+
+    async def _read_body(
+        self,
+        resp,
+        res: FetchResult,
+        max_bytes: Optional[int],
+        spool_threshold: Optional[int],
+        spool_suffix: str,
+    ):
+        buf = bytearray()
+        spool = None
+        total = 0
+        try:
+            async for chunk in resp.content.iter_chunked(self._chunk_size):
+                total += len(chunk)
+                if max_bytes is not None and total > max_bytes:
+                    declared = resp.content_length
+                    # Content-Length yoksa kaçınılan miktar bilinmiyor; sadece kesildiğini sayarız
+                    self._abort(res, "too_large", (declared - total) if declared else 0)
+                    res.size = total
+                    if spool is not None:
+                        spool.close()
+                        spool = None
+                        res.cleanup()
+                    return
+
+                if spool is not None:
+                    spool.write(chunk)
+                    continue
+
+                buf += chunk
+                if spool_threshold is not None and len(buf) > spool_threshold:
+                    fd, res.path = tempfile.mkstemp(prefix="crawl_", suffix=spool_suffix)
+                    spool = os.fdopen(fd, "wb")
+                    spool.write(buf)
+                    buf = bytearray()
+                    self.stats["spooled"] += 1
+        finally:
+            if spool is not None:
+                spool.close()
+
+        res.size = total
+        if res.path is None:
+            res.data = bytes(buf)
+
+    def _abort(self, res: FetchResult, reason: str, saved: int) -> FetchResult:
+        res.aborted = reason
+        res.bytes_saved = max(0, saved)
+        self.stats[f"aborted_{reason}"] += 1
+        self.stats["bytes_saved"] += res.bytes_saved
+        return res
@@ -1,36 +1,199 @@
 import asyncio
-from playwright.async_api import async_playwright
+import re
+import time
+from typing import Optional
+
+# Bu kadar (ve üstü) görünür metni olan sayfa JS kabuğu sayılmaz
+SHELL_MAX_TEXT = 400
+# Kabuk sayılması için gereken en az <script> sayısı (kök işareti yoksa)
+SHELL_MIN_SCRIPTS = 3
+# Tespit için taranan bayt (kök div'ler ve script'ler genelde başta/ortada)
+SHELL_SCAN_BYTES = 256 * 1024
+
+# SPA kök elemanları / framework işaretleri
+_spa_markers = re.compile(
+    rb"<div[^>]+id\s*=\s*[\"']?(?:root|app|__next|__nuxt|svelte|main-app)[\"'\s>]"
+    rb"|\bng-app\b|\bng-version\b|data-reactroot|data-server-rendered|__NEXT_DATA__|window\.__NUXT__",
+    re.I,
+)
+_script = re.compile(rb"<script\b", re.I)
+_noscript_hint = re.compile(rb"<noscript[^>]*>[^<]{0,200}(?:javascript|JavaScript)", re.I)
+
+# Render sırasında hiç indirilmeyecek kaynak tipleri
+BLOCKED_RESOURCES = ("image", "font", "media")
+
+
+def is_js_shell(data: bytes, text: str) -> bool:
+    """
+    Sayfa içeriği JS ile mi oluşturuluyor? Statik parse sonucu (text) zaten
+    yeterince metin içeriyorsa HTML'e hiç bakılmaz; kısa sayfalarda SPA kök
+    işareti, "JavaScript'i etkinleştirin" noscript'i veya çok sayıda script aranır.
+    """
+    if len(text.strip()) >= SHELL_MAX_TEXT:
+        return False
+    head = data[:SHELL_SCAN_BYTES]
+    if _spa_markers.search(head) or _noscript_hint.search(head):
+        return True
+    return len(_script.findall(head)) >= SHELL_MIN_SCRIPTS
+
 
 class JSRenderer:
-    def __init__(self, pool_size: int = 2):
-        self.pool_size = pool_size
+    """
+    Playwright/Chromium ile sayfa render'ı.
+
+    - Her render kendi Page'inde, izole browser context'lerinden birinde koşar;
+      context'ler pages_per_context render'dan sonra (ya da hata alınca)
+      kapatılıp yenilenir, böylece çerez/bellek birikmez.
+    - Görsel, font ve medya istekleri route ile iptal edilir.
+    - networkidle beklenmez: DOM hazır olunca gövdede settle_text kadar metin
+      belirmesi en fazla settle_s beklenir.
+    - budget_s: job başına toplam render süresi; dolunca render() None döner.
+    - Browser açılamazsa (Playwright/Chromium kurulu değil vb.) renderer
+      kapatılır (disabled): render() hep None döner, çağıran statik parse'la
+      devam eder; açılış her sayfada tekrar denenmez.
+    """
+
+    def __init__(
+        self,
+        contexts: int = 2,
+        pages_per_context: int = 50,
+        timeout_s: float = 20.0,
+        settle_s: float = 5.0,
+        settle_text: int = SHELL_MAX_TEXT,
+        budget_s: float = 0.0,
+        user_agent: Optional[str] = None,
+    ):
+        self.contexts = max(1, contexts)
+        self.pages_per_context = pages_per_context
+        self.timeout_s = timeout_s
+        self.settle_s = settle_s
+        self.settle_text = settle_text
+        self.budget_s = budget_s
+        self.user_agent = user_agent
+
         self._pw = None
         self._browser = None
-        self._pages: asyncio.Queue = asyncio.Queue()
+        # Boştaki context'ler: (context, o context'te yapılan render sayısı)
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._start_lock = asyncio.Lock()
 
-    async def start(self):
-        self._pw = await async_playwright().start()
-        self._browser = await self._pw.chromium.launch(headless=True)
-        for _ in range(self.pool_size):
-            page = await self._browser.new_page()
-            await self._pages.put(page)
+        self.used_s = 0.0
+        self.disabled = False
+        self.stats = {
+            "rendered": 0, "failed": 0, "over_budget": 0, "blocked": 0, "recycled": 0,
+            "launch_failed": 0,
+        }
 
-    async def stop(self):
-        while not self._pages.empty():
-            p = await self._pages.get()
+    @property
+    def exhausted(self) -> bool:
+        return self.budget_s > 0 and self.used_s >= self.budget_s
+
+    async def start(self) -> bool:
+        """Browser'ı açar; açılamazsa renderer'ı kapatır (disabled) ve False döner."""
+        async with self._start_lock:
+            if self._browser is not None:
+                return True
+            if self.disabled:
+                return False
             try:
-                await p.close()
-            except:
-                pass
+                from playwright.async_api import async_playwright
+
+                self._pw = await async_playwright().start()
+                self._browser = await self._pw.chromium.launch(headless=True)
+            except Exception as e:
+                self.disabled = True
+                self.stats["launch_failed"] += 1
+                print(f"[RENDER] browser açılamadı, render kapatıldı (statik parse kullanılacak): {e}")
+                try:
+                    await self.stop()
+                except Exception:
+                    pass
+                return False
+            for _ in range(self.contexts):
+                await self._idle.put((None, 0))
+            return True
+
+    async def stop(self):
+        while not self._idle.empty():
+            ctx, _ = self._idle.get_nowait()
+            await self._close_context(ctx)
         if self._browser:
             await self._browser.close()
+            self._browser = None
         if self._pw:
             await self._pw.stop()
+            self._pw = None
+
+    async def _new_context(self):
+        kw = {"user_agent": self.user_agent} if self.user_agent else {}
+        ctx = await self._browser.new_context(java_script_enabled=True, **kw)
+        await ctx.route("**/*", self._route)
+        return ctx
+
+    async def _route(self, route):
+        if route.request.resource_type in BLOCKED_RESOURCES:
+            self.stats["blocked"] += 1
+            await route.abort()
+        else:
+            await route.continue_()
 
-    async def render(self, url: str) -> str:
-        page = await self._pages.get()
+    @staticmethod
+    async def _close_context(ctx):
+        if ctx is None:
+            return
         try:
-            await page.goto(url, wait_until="networkidle", timeout=20000)
-            return await page.content()
+            await ctx.close()
+        except Exception:
+            pass
+
+    async def render(self, url: str) -> Optional[str]:
+        if self.disabled:
+            return None
+        if self.exhausted:
+            self.stats["over_budget"] += 1
+            return None
+        if self._browser is None and not await self.start():
+            return None
+
+        ctx, uses = await self._idle.get()
+        t0 = time.monotonic()
+        ok = False
+        try:
+            if ctx is None:
+                ctx = await self._new_context()
+            page = await ctx.new_page()
+            try:
+                await page.goto(url, wait_until="domcontentloaded", timeout=self.timeout_s * 1000)
+                try:
+                    await page.wait_for_function(
+                        "n => document.body && document.body.innerText.trim().length >= n",
+                        arg=self.settle_text,
+                        timeout=self.settle_s * 1000,
+                    )
+                except Exception:
+                    # Metin gelmedi: o ana kadarki DOM yine de kullanılır
+                    pass
+                html = await page.content()
+            finally:
+                await page.close()
+            ok = True
+            self.stats["rendered"] += 1
+            return html
+        except Exception as e:
+            self.stats["failed"] += 1
+            print(f"[RENDER] {url}: {e}")
+            return None
         finally:
-            await self._pages.put(page)
+            self.used_s += time.monotonic() - t0
+            uses += 1
+            if not ok or uses >= self.pages_per_context:
+                self.stats["recycled"] += 1
+                await self._close_context(ctx)
+                ctx, uses = None, 0
+            self._idle.put_nowait((ctx, uses))
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats, "used_s": round(self.used_s, 1), "budget_s": self.budget_s,
+            "disabled": self.disabled,
+        }
@@ -1,31 +1,28 @@
-from bs4 import BeautifulSoup
+from typing import Optional
 from urllib.parse import urljoin, urldefrag
 
+from .html_backends import make_backend
 
-class LinkExtractor:
-    def extract(self, base_url: str, html: str):
-        soup = BeautifulSoup(html or "", "html.parser")
 
-        # text
-        for tag in soup(["script", "style", "noscript"]):
-            tag.decompose()
-        text = soup.get_text("\n", strip=True)
+class LinkExtractor:
+    def __init__(self, backend: Optional[str] = None):
+        """backend: "bs4" | "lxml" | "selectolax" | "auto" (bkz. html_backends.make_backend)."""
+        self.backend = make_backend(backend)
 
-        links = []
-        for a in soup.select("a[href]"):
-            href = a.get("href")
-            if not href:
-                continue
-            abs_url = urljoin(base_url, href)
-            abs_url, _ = urldefrag(abs_url)
-            links.append(abs_url)
+    def extract(self, base_url: str, html: str):
+        """Returns (text, links, canonical_url|None)."""
+        text, hrefs, canonical_href = self.backend.parse(html)
 
+        canonical = None
+        if canonical_href:
+            canonical, _ = urldefrag(urljoin(base_url, canonical_href.strip()))
 
         seen = set()
         out = []
-        for u in links:
-            if u not in seen:
-                seen.add(u)
-                out.append(u)
+        for href in hrefs:
+            abs_url, _ = urldefrag(urljoin(base_url, href))
+            if abs_url not in seen:
+                seen.add(abs_url)
+                out.append(abs_url)
 
-        return text, out
+        return text, out, canonical
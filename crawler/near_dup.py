@@ -0,0 +1,133 @@
+"""
+Yakın-kopya (near-duplicate) tespiti: MinHash + LSH bantları.
+
+Sadece tarih, sayaç ya da "ilgili haberler" bloğu farklı olan sayfalar
+hash_text eşitliğine takılmaz ama 3 kelimelik shingle kümelerinin Jaccard
+benzerliği yüksektir. minhash() parse process'lerinde (page_parser.parse_page)
+hesaplanır; NearDupIndex crawler'da site başına tutulur.
+
+İmza: tek permütasyonlu MinHash (shingle hash'i 64 kovaya bölünür, her
+kovanın minimumu alınır) ve her minimumun sadece son 8 biti (b-bit MinHash).
+64 byte'lık imza kayıtlarda 128 karakterlik hex olarak saklanır.
+"""
+import hashlib
+import re
+from typing import Dict, List, Optional, Tuple
+
+_word = re.compile(r"\w+")
+_MASK = (1 << 64) - 1
+BINS = 64
+_BIN_SHIFT = 64 - 6
+_VALUE_MASK = (1 << _BIN_SHIFT) - 1
+# LSH: 16 bant x 4 kova değeri (32 bit anahtar)
+BANDS = 16
+ROWS = BINS // BANDS
+_K1 = 0x9E3779B97F4A7C15
+_K2 = 0xC2B2AE3D27D4EB4F
+
+# Process başına kelime -> 64-bit hash cache'i (aynı sitenin sayfaları kelimeleri paylaşır)
+_token_hashes: Dict[str, int] = {}
+_TOKEN_CACHE_MAX = 200_000
+
+
+def _token_hash(tok: str) -> int:
+    h = _token_hashes.get(tok)
+    if h is None:
+        if len(_token_hashes) >= _TOKEN_CACHE_MAX:
+            _token_hashes.clear()
+        h = _token_hashes[tok] = int.from_bytes(
+            hashlib.blake2b(tok.encode("utf-8"), digest_size=8).digest(), "little"
+        )
+    return h
+
+
+def _shingles(text: str) -> set:
+    toks = [_token_hash(t) for t in _word.findall(text.lower())]
+    if not toks:
+        return set()
+    if len(toks) < 3:
+        toks += [0] * (3 - len(toks))
+    return {((a * _K1) ^ (b * _K2) ^ c) & _MASK for a, b, c in zip(toks, toks[1:], toks[2:])}
+
+
+def minhash(text: str) -> bytes:
+    """Metnin 64 byte'lık b-bit MinHash imzası; metin yoksa b""."""
+    shingles = _shingles(text)
+    if not shingles:
+        return b""
+    mins = [_VALUE_MASK + 1] * BINS
+    for h in shingles:
+        b = h >> _BIN_SHIFT
+        v = h & _VALUE_MASK
+        if v < mins[b]:
+            mins[b] = v
+    # Kısa metinlerde boş kalan kovalar sağdaki ilk dolu kovadan doldurulur
+    # (densification); kova farkı karıştırılır ki kopyalar birbirine eşit olmasın
+    if _VALUE_MASK + 1 in mins:
+        filled = list(mins)
+        for i in range(BINS):
+            if mins[i] > _VALUE_MASK:
+                for step in range(1, BINS):
+                    v = mins[(i + step) % BINS]
+                    if v <= _VALUE_MASK:
+                        filled[i] = (v * _K1 + step) & _VALUE_MASK
+                        break
+        mins = filled
+    return bytes(m & 0xFF for m in mins)
+
+
+def similarity(a: bytes, b: bytes) -> float:
+    """İki imzadan Jaccard tahmini (8 bitlik değerlerin rastlantısal eşitliği düzeltilir)."""
+    if not a or not b:
+        return 0.0
+    eq = sum(x == y for x, y in zip(a, b)) / BINS
+    return max(0.0, (eq - 1 / 256) / (1 - 1 / 256))
+
+
+class NearDupIndex:
+    """
+    MinHash imzaları için LSH: imza BANDS banda bölünür, bir bandı birebir
+    aynı olan sayfalar aday olur ve tahmini Jaccard benzerliği threshold'u
+    geçen en benzer aday döner. Benzerliği ~0.9 olan iki sayfa neredeyse her
+    zaman aday olur; ilgisiz sayfalar pratikte hiç olmaz.
+    """
+
+    def __init__(self, threshold: float = 0.9):
+        self.threshold = threshold
+        self._buckets: List[Dict[bytes, List[str]]] = [{} for _ in range(BANDS)]
+        # page_id -> güncel imza (eski kova girdileri bununla elenir)
+        self._sig: Dict[str, bytes] = {}
+
+        self.stats = {"indexed": 0, "checked": 0, "candidates": 0, "matched": 0}
+
+    def __len__(self) -> int:
+        return len(self._sig)
+
+    def add(self, page_id: str, sig: bytes):
+        if not sig or self._sig.get(page_id) == sig:
+            return
+        self._sig[page_id] = sig
+        for i, buckets in enumerate(self._buckets):
+            buckets.setdefault(sig[i * ROWS:(i + 1) * ROWS], []).append(page_id)
+        self.stats["indexed"] += 1
+
+    def find(self, sig: bytes, exclude: str = "") -> Optional[Tuple[str, float]]:
+        """En benzer eşleşme (page_id, benzerlik) ya da None. exclude: sayfanın kendisi."""
+        self.stats["checked"] += 1
+        best: Optional[Tuple[str, float]] = None
+        seen = set()
+        for i, buckets in enumerate(self._buckets):
+            for pid in buckets.get(sig[i * ROWS:(i + 1) * ROWS], ()):
+                if pid == exclude or pid in seen:
+                    continue
+                seen.add(pid)
+                cur = self._sig.get(pid)
+                if cur is None:
+                    continue
+                sim = similarity(sig, cur)
+                if sim >= self.threshold and (best is None or sim > best[1]):
+                    best = (pid, sim)
+        self.stats["candidates"] += len(seen)
+        if best is not None:
+            self.stats["matched"] += 1
+        return best
@@ -0,0 +1,44 @@
+"""
+HTML sayfa parse aşaması: decode + metin/link çıkarımı + içerik hash'i
+(+ istenirse yakın-kopya için MinHash imzası).
+
+parse_page modül seviyesinde ve pickle edilebilir argümanlarla çalışır; böylece
+event loop'u bloklamadan ExtractionExecutor üzerinden process pool'da koşar.
+Bu modül hafif tutulur (aiohttp/asyncpg import etmez), worker process'ler
+sadece parser bağımlılıklarını yükler.
+"""
+from typing import Dict, List, Optional, Tuple
+
+from utils import hash_text
+from .charset import decode_body
+from .link_extractor import LinkExtractor
+from .near_dup import minhash
+
+# Process başına backend adı -> LinkExtractor (her sayfada yeniden kurulmaz)
+_extractors: Dict[str, LinkExtractor] = {}
+
+
+def decode_html(data: bytes, content_type: Optional[str]) -> str:
+    """HTML içeriğini doğru karakter setiyle decode eder (bkz. charset.decode_body)."""
+    return decode_body(data, content_type)[0]
+
+
+def _extractor(backend: Optional[str]) -> LinkExtractor:
+    key = backend or ""
+    ext = _extractors.get(key)
+    if ext is None:
+        ext = _extractors[key] = LinkExtractor(backend)
+    return ext
+
+
+def parse_page(
+    url: str,
+    data: bytes,
+    content_type: Optional[str],
+    backend: Optional[str] = None,
+    fingerprint: bool = False,
+) -> Tuple[str, List[str], Optional[str], str, bytes]:
+    """Returns (text, links, canonical_url|None, content_hash, minhash|b"")."""
+    html = decode_html(data, content_type)
+    text, links, canonical = _extractor(backend).extract(url, html)
+    return text, links, canonical, hash_text(text), minhash(text) if fingerprint else b""
@@ -0,0 +1,261 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+# Sunucunun "yavaşla" dediği durumlar
+THROTTLE_STATUSES = (429, 503)
+# Retry-After en fazla bu kadar dikkate alınır (kötü niyetli/bozuk değer host'u süresiz kilitlemesin)
+MAX_RETRY_AFTER_S = 600.0
+
+
+class Throttled(RuntimeError):
+    """Sayfa 429/503 ile döndü; host duraklatıldı, URL sonra tekrar denenebilir."""
+
+
+def parse_retry_after(value: Optional[str], max_s: float = MAX_RETRY_AFTER_S) -> Optional[float]:
+    """Retry-After: saniye ya da HTTP tarihi -> bekleme süresi (s), en fazla max_s."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return min(float(value), max_s)
+    try:
+        dt = parsedate_to_datetime(value)
+        return min(max(0.0, dt.timestamp() - time.time()), max_s)
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._ts = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._ts) * self.rate)
+        self._ts = now
+
+    def wait_time(self) -> float:
+        """Bir token alınabilmesi için beklenmesi gereken süre (0 -> hemen)."""
+        self._refill()
+        if self._tokens >= 1:
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    def take(self):
+        self._refill()
+        self._tokens -= 1
+
+
+class HostState:
+    def __init__(self, limit: float, rate: float, burst: float):
+        self.limit = limit
+        self.inflight = 0
+        self.bucket = TokenBucket(rate, burst)
+        self.max_rate = rate
+        self.pause_until = 0.0
+        self.cond = asyncio.Condition()
+
+        self.latency_ewma: Optional[float] = None
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+        self.consecutive_errors = 0
+
+        self.robots: Optional[RobotFileParser] = None
+        self.robots_expires = 0.0
+        self.robots_lock = asyncio.Lock()
+        self.crawl_delay: Optional[float] = None
+        self.disallowed = 0
+
+
+class HostScheduler:
+    """
+    Host bazlı nezaket zamanlayıcısı.
+
+    - Token bucket: host başına istek hızı (req/s) ve burst; robots.txt
+      Crawl-delay varsa hız 1/delay'e indirilir.
+    - AIMD eşzamanlılık: hızlı ve hatasız cevaplarda limit yavaşça artar,
+      429/503/5xx/timeout ya da hedefin çok üstündeki gecikmelerde yarıya iner.
+      429/503'te Retry-After kadar host tamamen duraklatılır.
+    - robots.txt host başına bir kez çekilir, robots_ttl_s boyunca cache'lenir.
+
+    Durum process içidir: birden çok worker daemon'u aynı host'a gidiyorsa
+    limitler daemon başına uygulanır (toplam yük daemon sayısıyla çarpılır).
+    """
+
+    def __init__(
+        self,
+        *,
+        initial_concurrency: int = 2,
+        min_concurrency: int = 1,
+        max_concurrency: int = 8,
+        rate: float = 10.0,
+        burst: float = 10.0,
+        min_rate: float = 0.2,
+        target_latency_s: float = 1.5,
+        robots_ttl_s: float = 3600.0,
+        user_agent: str = "*",
+    ):
+        self.initial_concurrency = initial_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.target_latency_s = target_latency_s
+        self.robots_ttl_s = robots_ttl_s
+        self.user_agent = user_agent
+
+        self._hosts: Dict[str, HostState] = {}
+
+    def _host(self, host: str) -> HostState:
+        st = self._hosts.get(host)
+        if st is None:
+            st = HostState(float(self.initial_concurrency), self.rate, self.burst)
+            self._hosts[host] = st
+        return st
+
+    # -------------------- ROBOTS --------------------
+
+    async def allowed(self, url: str, fetch_text: Callable[[str], Awaitable[Tuple[int, str]]]) -> bool:
+        """
+        fetch_text(robots_url) -> (status, body). robots.txt yoksa (4xx) her şey
+        serbest; 5xx/ağ hatasında da serbest sayılır ama kısa süre sonra tekrar denenir.
+        """
+        parts = urlsplit(url)
+        st = self._host(parts.netloc.lower())
+
+        if st.robots is None or time.monotonic() >= st.robots_expires:
+            async with st.robots_lock:
+                if st.robots is None or time.monotonic() >= st.robots_expires:
+                    await self._load_robots(st, f"{parts.scheme}://{parts.netloc}/robots.txt", fetch_text)
+
+        if st.robots.can_fetch(self.user_agent, url):
+            return True
+        st.disallowed += 1
+        return False
+
+    async def _load_robots(self, st: HostState, robots_url: str, fetch_text):
+        rp = RobotFileParser(robots_url)
+        ttl = self.robots_ttl_s
+        try:
+            status, body = await fetch_text(robots_url)
+        except Exception:
+            status, body = 0, ""
+
+        if 200 <= status < 300:
+            rp.parse(body.splitlines())
+        else:
+            rp.parse([])
+            if status == 0 or status >= 500:
+                ttl = min(ttl, 300.0)
+
+        st.robots = rp
+        st.robots_expires = time.monotonic() + ttl
+
+        delay = rp.crawl_delay(self.user_agent)
+        st.crawl_delay = float(delay) if delay else None
+        if st.crawl_delay:
+            st.max_rate = min(self.rate, 1.0 / st.crawl_delay)
+            st.bucket.rate = min(st.bucket.rate, st.max_rate)
+            st.bucket.burst = 1.0
+
+    # -------------------- SLOTS --------------------
+
+    @asynccontextmanager
+    async def slot(self, host: str):
+        st = self._host(host.lower())
+        async with st.cond:
+            while True:
+                now = time.monotonic()
+                if now < st.pause_until:
+                    wait = st.pause_until - now
+                elif st.inflight >= max(1, int(st.limit)):
+                    wait = None
+                else:
+                    wait = st.bucket.wait_time()
+                    if wait == 0:
+                        break
+                try:
+                    await asyncio.wait_for(st.cond.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+            st.bucket.take()
+            st.inflight += 1
+        try:
+            yield
+        finally:
+            async with st.cond:
+                st.inflight -= 1
+                st.cond.notify_all()
+
+    def record(
+        self,
+        host: str,
+        *,
+        status: int = 0,
+        latency_s: Optional[float] = None,
+        retry_after: Optional[str] = None,
+        error: bool = False,
+    ):
+        st = self._host(host.lower())
+        st.requests += 1
+
+        if latency_s is not None:
+            st.latency_ewma = latency_s if st.latency_ewma is None else 0.8 * st.latency_ewma + 0.2 * latency_s
+
+        throttled = status in THROTTLE_STATUSES
+        failed = error or throttled or status >= 500
+        slow = latency_s is not None and latency_s > 2 * self.target_latency_s
+
+        if failed:
+            st.errors += 1
+            st.consecutive_errors += 1
+            # Multiplicative decrease
+            st.limit = max(float(self.min_concurrency), st.limit / 2)
+            st.bucket.rate = max(self.min_rate, st.bucket.rate / 2)
+
+            pause = parse_retry_after(retry_after) if throttled else None
+            if throttled:
+                st.throttled += 1
+            if pause is None:
+                pause = min(60.0, 0.5 * (2 ** min(st.consecutive_errors, 7)))
+            st.pause_until = max(st.pause_until, time.monotonic() + pause)
+        elif slow:
+            st.consecutive_errors = 0
+            st.limit = max(float(self.min_concurrency), st.limit * 0.75)
+        else:
+            st.consecutive_errors = 0
+            # Additive increase (~ her "tur" için +1)
+            st.limit = min(float(self.max_concurrency), st.limit + 1.0 / max(1.0, st.limit))
+            st.bucket.rate = min(st.max_rate, st.bucket.rate + 0.1)
+
+    def pause_remaining(self, host: str) -> float:
+        """Host'un Retry-After / hata duraklamasından kalan süre (s)."""
+        st = self._hosts.get(host.lower())
+        return max(0.0, st.pause_until - time.monotonic()) if st is not None else 0.0
+
+    def stats(self) -> Dict[str, dict]:
+        out = {}
+        for host, st in self._hosts.items():
+            out[host] = {
+                "limit": round(st.limit, 2),
+                "inflight": st.inflight,
+                "rate": round(st.bucket.rate, 2),
+                "requests": st.requests,
+                "errors": st.errors,
+                "throttled": st.throttled,
+                "latency_ms": round(st.latency_ewma * 1000) if st.latency_ewma is not None else None,
+                "crawl_delay": st.crawl_delay,
+                "robots_disallowed": st.disallowed,
+                "paused_s": round(max(0.0, st.pause_until - time.monotonic()), 1),
+            }
+        return out
@@ -0,0 +1,217 @@
+import hashlib
+import math
+import sys
+from array import array
+from typing import Dict, List
+
+
+def _digest(url: str, size: int) -> bytes:
+    return hashlib.blake2b(url.encode("utf-8", errors="ignore"), digest_size=size).digest()
+
+
+class PySeenSet:
+    """Tam URL string'lerini tutan Python set'i (eski davranış); referans için."""
+
+    def __init__(self):
+        self._set = set()
+        self._str_bytes = 0
+
+    def add(self, url: str) -> bool:
+        if url in self._set:
+            return False
+        self._set.add(url)
+        self._str_bytes += sys.getsizeof(url)
+        return True
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._set
+
+    def __len__(self) -> int:
+        return len(self._set)
+
+    def memory_bytes(self) -> int:
+        return sys.getsizeof(self._set) + self._str_bytes
+
+
+class ExactSeenSet:
+    """
+    URL'lerin 8 ya da 16 byte'lık blake2b özetlerini array tabanlı, open
+    addressing (linear probing) bir hash tablosunda tutar.
+
+    URL başına ~10-25 byte harcar (Python set'inde string'le birlikte ~100+ byte).
+    Yanlış pozitif ancak özet çakışmasıyla mümkündür: 8 byte'ta 10M URL için
+    olasılık ~3e-6, 16 byte'ta pratikte sıfır.
+    """
+
+    def __init__(self, digest_bytes: int = 8, initial_capacity: int = 1024, max_load: float = 0.7):
+        if digest_bytes not in (8, 16):
+            raise ValueError("digest_bytes must be 8 or 16")
+        self.digest_bytes = digest_bytes
+        self.max_load = max_load
+        self._count = 0
+
+        cap = 1
+        while cap < initial_capacity:
+            cap <<= 1
+        self._alloc(cap)
+
+    def _alloc(self, cap: int):
+        self._cap = cap
+        self._mask = cap - 1
+        # 0 (ya da 16 byte'ta 0,0) boş slot demek
+        self._hi = array("Q", bytes(8 * cap))
+        self._lo = array("Q", bytes(8 * cap)) if self.digest_bytes == 16 else None
+
+    def _key(self, url: str):
+        d = _digest(url, self.digest_bytes)
+        hi = int.from_bytes(d[:8], "little") or 1
+        lo = int.from_bytes(d[8:], "little") if self.digest_bytes == 16 else 0
+        return hi, lo
+
+    def _find(self, hi: int, lo: int):
+        """(bulundu_mu, slot) döner."""
+        hi_arr, lo_arr, mask = self._hi, self._lo, self._mask
+        i = hi & mask
+        while True:
+            h = hi_arr[i]
+            if h == 0 and (lo_arr is None or lo_arr[i] == 0):
+                return False, i
+            if h == hi and (lo_arr is None or lo_arr[i] == lo):
+                return True, i
+            i = (i + 1) & mask
+
+    def _grow(self):
+        old_hi, old_lo, old_cap = self._hi, self._lo, self._cap
+        self._alloc(old_cap * 2)
+        for j in range(old_cap):
+            h = old_hi[j]
+            lo = old_lo[j] if old_lo is not None else 0
+            if h == 0 and lo == 0:
+                continue
+            _, i = self._find(h, lo)
+            self._hi[i] = h
+            if self._lo is not None:
+                self._lo[i] = lo
+
+    def add(self, url: str) -> bool:
+        hi, lo = self._key(url)
+        found, i = self._find(hi, lo)
+        if found:
+            return False
+        self._hi[i] = hi
+        if self._lo is not None:
+            self._lo[i] = lo
+        self._count += 1
+        if self._count > self._cap * self.max_load:
+            self._grow()
+        return True
+
+    def __contains__(self, url: str) -> bool:
+        return self._find(*self._key(url))[0]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def memory_bytes(self) -> int:
+        n = sys.getsizeof(self._hi)
+        if self._lo is not None:
+            n += sys.getsizeof(self._lo)
+        return n
+
+
+class _BloomFilter:
+    def __init__(self, capacity: int, fp_rate: float):
+        self.capacity = capacity
+        bits = max(64, int(math.ceil(-capacity * math.log(fp_rate) / (math.log(2) ** 2))))
+        self.nbits = bits
+        self.k = max(1, int(round(bits / capacity * math.log(2))))
+        self.bits = bytearray((bits + 7) // 8)
+        self.count = 0
+
+    def contains(self, h1: int, h2: int) -> bool:
+        bits, n = self.bits, self.nbits
+        for i in range(self.k):
+            p = (h1 + i * h2) % n
+            if not bits[p >> 3] & (1 << (p & 7)):
+                return False
+        return True
+
+    def add(self, h1: int, h2: int):
+        bits, n = self.bits, self.nbits
+        for i in range(self.k):
+            p = (h1 + i * h2) % n
+            bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+
+class BloomSeenSet:
+    """
+    Ölçeklenebilir Bloom filtresi (Almeida et al. 2007).
+
+    Dolan filtrenin arkasına kapasitesi growth katı, hata oranı tightening
+    katı olan yeni bir filtre eklenir; toplam yanlış pozitif oranı fp_rate
+    civarında kalır. Yanlış pozitif, yeni bir URL'in "görülmüş" sayılıp
+    atlanması demektir.
+    """
+
+    def __init__(
+        self,
+        fp_rate: float = 0.001,
+        initial_capacity: int = 100_000,
+        growth: int = 2,
+        tightening: float = 0.85,
+    ):
+        self.fp_rate = fp_rate
+        self.growth = growth
+        self.tightening = tightening
+        # Seri toplamı fp_rate'i geçmesin diye ilk filtre (1 - r) ile başlar
+        self._filters: List[_BloomFilter] = [_BloomFilter(initial_capacity, fp_rate * (1 - tightening))]
+        self._count = 0
+
+    @staticmethod
+    def _hashes(url: str):
+        d = _digest(url, 16)
+        return int.from_bytes(d[:8], "little"), int.from_bytes(d[8:], "little") | 1
+
+    def __contains__(self, url: str) -> bool:
+        h1, h2 = self._hashes(url)
+        return any(f.contains(h1, h2) for f in self._filters)
+
+    def add(self, url: str) -> bool:
+        h1, h2 = self._hashes(url)
+        if any(f.contains(h1, h2) for f in self._filters):
+            return False
+        last = self._filters[-1]
+        if last.count >= last.capacity:
+            fp = self.fp_rate * (1 - self.tightening) * (self.tightening ** len(self._filters))
+            last = _BloomFilter(last.capacity * self.growth, fp)
+            self._filters.append(last)
+        last.add(h1, h2)
+        self._count += 1
+        return True
+
+    def __len__(self) -> int:
+        return self._count
+
+    def memory_bytes(self) -> int:
+        return sum(sys.getsizeof(f.bits) for f in self._filters)
+
+
+def make_seen_set(mode: str = "exact", fp_rate: float = 0.001):
+    """
+    mode: "set" (tam string), "exact" (8 byte özet), "exact16" (16 byte özet),
+          "bloom" (ölçeklenebilir Bloom filtresi, fp_rate ile).
+    """
+    if mode == "set":
+        return PySeenSet()
+    if mode == "exact":
+        return ExactSeenSet(digest_bytes=8)
+    if mode == "exact16":
+        return ExactSeenSet(digest_bytes=16)
+    if mode == "bloom":
+        return BloomSeenSet(fp_rate=fp_rate)
+    raise ValueError(f"unknown seen-set mode: {mode}")
+
+
+def seen_set_stats(s) -> Dict[str, int]:
+    return {"items": len(s), "bytes": s.memory_bytes()}
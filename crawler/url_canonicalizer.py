@@ -0,0 +1,192 @@
+import posixpath
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode, quote
+
+# Her sitede atılan izleme / oturum parametreleri
+TRACKING_PREFIXES = ("utm_",)
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "gbraid", "wbraid", "msclkid", "yclid", "igshid",
+    "mc_cid", "mc_eid", "_ga", "_gl", "_hsenc", "_hsmi", "ref_src", "spm",
+}
+SESSION_PARAMS = {
+    "phpsessid", "jsessionid", "sid", "sessionid", "session_id", "aspsessionid",
+    "cfid", "cftoken", "zenid", "oscsid",
+}
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+_pct = re.compile(r"%[0-9a-fA-F]{2}")
+# /page;jsessionid=ABC gibi path'e gömülü oturum kimlikleri
+_session_path = re.compile(r";(?:jsessionid|phpsessid|sid)=[^/?#]*", re.I)
+# Path'te kodlanmadan kalabilecek karakterler (RFC 3986 unreserved + sub-delims + ":@/")
+_PATH_SAFE = "/:@!$&'()*+,;=-._~"
+_UNRESERVED = set("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~")
+
+
+@dataclass
+class SiteRules:
+    """
+    Site bazlı kanonikleştirme kuralları (CrawlJob.url_rules[domain] ile override edilir).
+
+    scheme: "auto" -> başlangıç URL'inin şeması, None -> dokunma, "http"/"https" -> zorla
+    host:   "auto" -> başlangıç URL'inin host yazımı (www. dahil/hariç), None -> dokunma
+    trailing_slash: "keep" | "strip" (strip sadece dizin ve dosya aynı içeriği veren
+                    sitelerde açılmalı; aksi halde relatif linkler yanlış dizine çözülür)
+    keep_params: verilirse sadece bu query parametreleri kalır
+    """
+    scheme: Optional[str] = "auto"
+    host: Optional[str] = "auto"
+    trailing_slash: str = "keep"
+    sort_query: bool = True
+    drop_params: List[str] = field(default_factory=list)
+    keep_params: Optional[List[str]] = None
+    lowercase_path: bool = False
+
+
+def _normalize_pct(s: str) -> str:
+    """%7e -> ~ (unreserved ise çöz), %2f -> %2F (büyük harf)."""
+    def repl(m):
+        ch = chr(int(m.group(0)[1:], 16))
+        return ch if ch in _UNRESERVED else m.group(0).upper()
+    return _pct.sub(repl, s)
+
+
+def _normalize_path(path: str, trailing_slash: str) -> str:
+    if not path:
+        return "/"
+    path = _normalize_pct(quote(path, safe=_PATH_SAFE + "%"))
+    had_slash = path.endswith("/")
+    norm = posixpath.normpath(path)
+    if norm.startswith("//"):
+        norm = "/" + norm.lstrip("/")
+    if norm == ".":
+        norm = "/"
+    if had_slash and norm != "/" and trailing_slash == "keep":
+        norm += "/"
+    return norm
+
+
+class UrlCanonicalizer:
+    """
+    Frontier/seen-set kontrolünden ve hash_url'den önce URL'leri tek bir
+    kanonik forma getirir; aynı sayfanın farklı yazımları bir kez çekilir.
+
+    stats:
+      rewritten       -> kanonik formu ham halinden farklı çıkan URL sayısı
+      fetches_saved   -> sadece kanonikleştirme sayesinde tekrar çekilmeyen URL sayısı
+      canonical_links -> <link rel=canonical> ile yönlendirilen sayfa sayısı
+    """
+
+    def __init__(self, start_url: str = "", rules: Optional[Dict[str, dict]] = None):
+        self._default = SiteRules()
+        self._rules: Dict[str, SiteRules] = {
+            d.lower().removeprefix("www."): SiteRules(**r) for d, r in (rules or {}).items()
+        }
+
+        self._start_scheme = None
+        self._start_host = None
+        self._start_domain = None
+        if start_url:
+            parts = urlsplit(start_url)
+            self._start_scheme = parts.scheme.lower() or None
+            self._start_host = (parts.hostname or "").lower() or None
+            if self._start_host:
+                self._start_domain = self._start_host.removeprefix("www.")
+
+        self.stats = {"rewritten": 0, "fetches_saved": 0, "canonical_links": 0}
+
+    def rules_for(self, domain: str) -> SiteRules:
+        return self._rules.get(domain, self._default)
+
+    def canonicalize(self, url: str) -> str:
+        try:
+            parts = urlsplit(url.strip())
+        except ValueError:
+            return url
+        scheme = parts.scheme.lower()
+        if scheme not in DEFAULT_PORTS:
+            return url
+
+        host = (parts.hostname or "").lower().rstrip(".")
+        if not host:
+            return url
+        domain = host.removeprefix("www.")
+        rules = self.rules_for(domain)
+
+        # Başlangıç URL'iyle aynı site ise onun şema/host yazımını kullan
+        same_site = self._start_domain == domain
+        if rules.scheme == "auto":
+            if same_site and self._start_scheme:
+                scheme = self._start_scheme
+        elif rules.scheme:
+            scheme = rules.scheme
+        if rules.host == "auto":
+            if same_site:
+                host = self._start_host
+        elif rules.host:
+            host = rules.host
+
+        netloc = host
+        try:
+            port = parts.port
+        except ValueError:
+            port = None
+        if port and port != DEFAULT_PORTS.get(scheme):
+            netloc = f"{host}:{port}"
+        if parts.username:
+            netloc = f"{parts.username}{':' + parts.password if parts.password else ''}@{netloc}"
+
+        path = _session_path.sub("", parts.path)
+        if rules.lowercase_path:
+            path = path.lower()
+        path = _normalize_path(path, rules.trailing_slash)
+
+        query = self._normalize_query(parts.query, rules)
+
+        return urlunsplit((scheme, netloc, path, query, ""))
+
+    def _normalize_query(self, query: str, rules: SiteRules) -> str:
+        if not query:
+            return ""
+        drop = {p.lower() for p in rules.drop_params}
+        keep = {p.lower() for p in rules.keep_params} if rules.keep_params is not None else None
+
+        params = []
+        for k, v in parse_qsl(query, keep_blank_values=True):
+            kl = k.lower()
+            if keep is not None:
+                if kl not in keep:
+                    continue
+            elif kl in TRACKING_PARAMS or kl in SESSION_PARAMS or kl in drop or kl.startswith(TRACKING_PREFIXES):
+                continue
+            params.append((k, v))
+
+        if rules.sort_query:
+            params.sort()
+        return urlencode(params, quote_via=quote, safe="/:@!$'()*+,;-._~")
+
+    def canonicalize_many(self, urls: List[str], seen=None) -> List[str]:
+        """
+        URL listesini kanonikleştirir ve liste içi tekrarları atar.
+        seen (seen-set) verilirse, sadece kanonikleştirme sayesinde zaten
+        görülmüş sayılan URL'ler fetches_saved'a eklenir.
+        """
+        out: List[str] = []
+        local = set()
+        for raw in urls:
+            c = self.canonicalize(raw)
+            rewritten = c != raw
+            if rewritten:
+                self.stats["rewritten"] += 1
+            if c in local:
+                if rewritten:
+                    self.stats["fetches_saved"] += 1
+                continue
+            local.add(c)
+            if rewritten and seen is not None and c in seen:
+                self.stats["fetches_saved"] += 1
+            out.append(c)
+        return out
+
@@ -0,0 +1,117 @@
+import datetime
+import re
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+from models import CrawlJob, UrlContext
+
+# Doküman linki barındırma ihtimali yüksek path parçaları
+FILE_HINTS = (
+    "download", "downloads", "indir", "dosya", "dosyalar", "files", "documents",
+    "docs", "belge", "belgeler", "dokuman", "doküman", "rapor", "raporlar",
+    "report", "reports", "yayin", "yayinlar", "yayınlar", "publication",
+    "publications", "mevzuat", "attachment", "attachments", "uploads", "media",
+)
+# Güncel içerik sinyali veren path parçaları
+FRESH_HINTS = ("haber", "haberler", "news", "duyuru", "duyurular", "announcement", "announcements", "blog")
+
+_year = re.compile(r"(?<!\d)(19|20)\d{2}(?!\d)")
+
+DEFAULT_WEIGHTS = {
+    "depth": 1.0,   # derinlik başına ceza
+    "path": 2.0,    # başlangıç path'ine / priority_paths'e yakınlık
+    "file": 1.5,    # doküman linki ihtimali
+    "fresh": 1.0,   # güncellik sinyali
+    "known": -0.5,  # önceki taramada zaten çekilmiş sayfa
+}
+
+
+def _segments(path: str) -> List[str]:
+    return [s for s in (path or "/").lower().split("/") if s]
+
+
+class FifoScorer:
+    """Tüm URL'lere aynı skor: frontier bulunma sırasıyla (eski davranış) çalışır."""
+
+    def __init__(self, job: CrawlJob, known: Optional[Callable[[str], bool]] = None):
+        pass
+
+    def score(self, ctx: UrlContext) -> float:
+        return 0.0
+
+
+class DefaultScorer:
+    """
+    Yüksek skor önce çekilir. Bileşenler (her biri 0..1, CrawlJob.score_weights ile ağırlıklandırılır):
+
+      depth -> derinlik (ceza)
+      path  -> başlangıç URL'inin path'iyle ortak önek oranı; priority_paths'ten
+               biriyle başlıyorsa 1
+      file  -> path'te doküman sayfası ipucu (indir, dosya, rapor, ...)
+      fresh -> path'te bu yıl/geçen yıl ya da haber/duyuru ipucu
+      known -> incremental taramada sayfa zaten kayıtlı (yeni sayfalar önce gelsin)
+    """
+
+    def __init__(self, job: CrawlJob, known: Optional[Callable[[str], bool]] = None):
+        self.weights = {**DEFAULT_WEIGHTS, **(job.score_weights or {})}
+        self.known = known
+        start = job.start_urls[0] if job.start_urls else ""
+        self._start_segs = _segments(urlparse(start).path)
+        self._priority = [p.lower().rstrip("/") or "/" for p in (job.priority_paths or [])]
+        year = datetime.date.today().year
+        self._fresh_years = {str(year), str(year - 1)}
+
+    def _path_score(self, path: str, segs: List[str]) -> float:
+        lower = path.lower()
+        for p in self._priority:
+            if lower == p or lower.startswith(p + "/") or p == "/":
+                return 1.0
+        if not self._start_segs:
+            return 0.0
+        common = 0
+        for a, b in zip(self._start_segs, segs):
+            if a != b:
+                break
+            common += 1
+        return common / len(self._start_segs)
+
+    def _fresh_score(self, path: str, segs: List[str]) -> float:
+        if any(m.group(0) in self._fresh_years for m in _year.finditer(path)):
+            return 1.0
+        if any(s in FRESH_HINTS for s in segs):
+            return 0.5
+        return 0.0
+
+    def score(self, ctx: UrlContext) -> float:
+        w = self.weights
+        path = urlparse(ctx.url).path or "/"
+        segs = _segments(path)
+
+        s = -w["depth"] * ctx.depth
+        s += w["path"] * self._path_score(path, segs)
+        if any(seg in FILE_HINTS for seg in segs):
+            s += w["file"]
+        s += w["fresh"] * self._fresh_score(path, segs)
+        if self.known is not None and self.known(ctx.url):
+            s += w["known"]
+        return s
+
+
+SCORERS: Dict[str, type] = {
+    "default": DefaultScorer,
+    "fifo": FifoScorer,
+}
+
+
+def register_scorer(name: str, cls: type):
+    """Yeni skorlayıcı ekler; arayüz: __init__(job, known) ve score(ctx) -> float."""
+    SCORERS[name] = cls
+
+
+def make_scorer(job: CrawlJob, known: Optional[Callable[[str], bool]] = None):
+    """CrawlJob.scorer adıyla kayıtlı skorlayıcıyı kurar ("default" | "fifo" | register_scorer ile eklenenler)."""
+    name = job.scorer or "default"
+    cls = SCORERS.get(name)
+    if cls is None:
+        raise ValueError(f"unknown URL scorer: {name}")
+    return cls(job, known)
@@ -0,0 +1,89 @@
+import asyncio
+import os
+import time
+from typing import Optional
+
+import asyncpg
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# create_job bu kanala job_id ile NOTIFY gönderir
+JOBS_CHANNEL = "crawl_jobs"
+
+NOTIFY_JOB_SQL = "SELECT pg_notify($1, $2)"
+
+
+class JobListener:
+    """
+    Ayrı (pool dışı) bir asyncpg bağlantısında LISTEN yapar; yeni job
+    bildirimi gelince wait() döner.
+
+    Bildirimler bir event'te birleşir: 100 job'luk bir toplu ekleme daemon'u
+    bir kez uyandırır, daemon da kuyruk boşalana kadar job çeker. Bağlantı
+    koparsa wait() çağrılarında reconnect_s aralıklarla tekrar denenir; bu
+    sürede çağıran taraf kısa aralıklı polling'e düşmelidir (bkz. listening).
+    """
+
+    def __init__(self, dsn: Optional[str] = None, channel: str = JOBS_CHANNEL, reconnect_s: float = 10.0):
+        self.dsn = dsn or os.environ["DATABASE_URL"]
+        self.channel = channel
+        self.reconnect_s = reconnect_s
+
+        self._con: Optional[asyncpg.Connection] = None
+        self._event = asyncio.Event()
+        self._last_attempt = 0.0
+
+        self.stats = {"notifications": 0, "wakeups": 0, "timeouts": 0, "reconnects": 0}
+
+    @property
+    def listening(self) -> bool:
+        return self._con is not None and not self._con.is_closed()
+
+    async def start(self) -> bool:
+        self._last_attempt = time.monotonic()
+        try:
+            con = await asyncpg.connect(self.dsn)
+            await con.add_listener(self.channel, self._on_notify)
+        except Exception as e:
+            print(f"[LISTEN] {self.channel} dinlenemiyor, polling'e düşülüyor: {e}")
+            self._con = None
+            return False
+        con.add_termination_listener(self._on_terminated)
+        self._con = con
+        print(f"[LISTEN] {self.channel} dinleniyor")
+        return True
+
+    def _on_notify(self, _con, _pid, _channel, _payload):
+        self.stats["notifications"] += 1
+        self._event.set()
+
+    def _on_terminated(self, _con):
+        print(f"[LISTEN] {self.channel} bağlantısı koptu")
+        self._con = None
+        # Kopukluk süresince kaçan bildirimler olabilir; çağıran hemen bir kez bakmalı
+        self._event.set()
+
+    async def wait(self, timeout: float) -> bool:
+        """Bildirim gelirse True, timeout dolarsa False döner."""
+        if not self.listening and time.monotonic() - self._last_attempt >= self.reconnect_s:
+            self.stats["reconnects"] += 1
+            await self.start()
+
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            return False
+        self._event.clear()
+        self.stats["wakeups"] += 1
+        return True
+
+    async def close(self):
+        con, self._con = self._con, None
+        if con is not None and not con.is_closed():
+            try:
+                await con.remove_listener(self.channel, self._on_notify)
+            except Exception:
+                pass
+            await con.close()
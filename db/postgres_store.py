@@ -2,19 +2,27 @@ import asyncpg
 import os
 from dotenv import load_dotenv
 
+from .job_listener import JOBS_CHANNEL, NOTIFY_JOB_SQL
+
 load_dotenv()
 
+# Pool'un boşta açık tuttuğu bağlantı sayısı; geri kalanı ihtiyaç oldukça açılır
+POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+
 
 class PostgresStore:
-    def __init__(self):
+    def __init__(self, pool_size: int = 10):
         self.dsn = os.environ["DATABASE_URL"]
+        self.pool_size = pool_size
         self.pool = None
 
     # -------------------- CONNECTION --------------------
 
     async def connect(self):
         if self.pool is None:
-            self.pool = await asyncpg.create_pool(self.dsn)
+            self.pool = await asyncpg.create_pool(
+                self.dsn, min_size=min(POOL_MIN_SIZE, self.pool_size), max_size=self.pool_size
+            )
 
     async def close(self):
         if self.pool is not None:
@@ -23,24 +31,39 @@ class PostgresStore:
 
     # -------------------- JOB QUEUE --------------------
 
-    async def pick_job(self):
+    async def pick_job(self, max_per_tenant: int | None = None):
+        """
+        Tenant'lar (agent_id, project_id) arasında adil sırayla bir PENDING job alır:
+        önce o an en az RUNNING job'u olan tenant, eşitlikte en eski job.
+        max_per_tenant verilirse bu kadar job'u çalışan tenant'lar atlanır.
+        """
         # NOT: jobs tablonuzda 'documents_only' kolonu mutlaka bulunmalıdır.
         q = """
+        WITH running AS (
+            SELECT agent_id, project_id, count(*) AS n
+            FROM jobs
+            WHERE status = 'RUNNING'
+            GROUP BY agent_id, project_id
+        )
         UPDATE jobs
         SET status = 'RUNNING',
+            started_at = COALESCE(started_at, NOW()),
             updated_at = NOW()
         WHERE job_id = (
-            SELECT job_id
-            FROM jobs
-            WHERE status = 'PENDING'
-            ORDER BY created_at
+            SELECT j.job_id
+            FROM jobs j
+            LEFT JOIN running r
+                   ON r.agent_id = j.agent_id AND r.project_id = j.project_id
+            WHERE j.status = 'PENDING'
+              AND ($1::int IS NULL OR COALESCE(r.n, 0) < $1::int)
+            ORDER BY COALESCE(r.n, 0), j.created_at
             LIMIT 1
-            FOR UPDATE SKIP LOCKED
+            FOR UPDATE OF j SKIP LOCKED
         )
         RETURNING *
         """
         async with self.pool.acquire() as con:
-            return await con.fetchrow(q)
+            return await con.fetchrow(q, max_per_tenant)
 
     async def set_job_status(self, job_id: str, status: str, error: str | None = None):
         q = """
@@ -53,6 +76,333 @@ class PostgresStore:
         async with self.pool.acquire() as con:
             await con.execute(q, job_id, status, error)
 
+    async def touch_job(self, job_id: str):
+        q = "UPDATE jobs SET updated_at = NOW() WHERE job_id = $1"
+        async with self.pool.acquire() as con:
+            await con.execute(q, job_id)
+
+    async def acquire_site_lock(self, site_key: str, job_id: str, stale_minutes: int) -> bool:
+        """
+        Site klasörü kilidini job'a almayı dener (process'ler arası). Kilit boşsa,
+        zaten bu job'daysa ya da sahibi artık RUNNING değilse / heartbeat'i
+        stale_minutes'tir kesikse alınır. Alınamazsa False.
+        """
+        q = """
+            INSERT INTO site_locks (site_key, job_id, acquired_at)
+            VALUES ($1, $2, NOW())
+            ON CONFLICT (site_key) DO UPDATE SET
+                job_id      = EXCLUDED.job_id,
+                acquired_at = NOW()
+            WHERE site_locks.job_id = EXCLUDED.job_id
+               OR NOT EXISTS (
+                    SELECT 1
+                    FROM jobs j
+                    WHERE j.job_id = site_locks.job_id
+                      AND j.status = 'RUNNING'
+                      AND j.updated_at >= NOW() - ($3 * INTERVAL '1 minute')
+               )
+            RETURNING job_id
+            """
+        async with self.pool.acquire() as con:
+            return await con.fetchval(q, site_key, job_id, stale_minutes) is not None
+
+    async def release_site_lock(self, site_key: str, job_id: str):
+        q = "DELETE FROM site_locks WHERE site_key = $1 AND job_id = $2"
+        async with self.pool.acquire() as con:
+            await con.execute(q, site_key, job_id)
+
+    async def requeue_resumable_jobs(self, timeout_minutes: int) -> int:
+        """
+        Yarıda kalmış (stale RUNNING ya da kesilmiş/stale FAILED) ve frontier'da
+        işlenmemiş URL'i olan job'ları tekrar PENDING yapar; kaldıkları yerden devam ederler.
+        """
+        q = """
+            UPDATE jobs
+            SET status     = 'PENDING',
+                error      = 'resumed',
+                updated_at = NOW()
+            WHERE (
+                    (status = 'RUNNING' AND updated_at < NOW() - ($1 * INTERVAL '1 minute'))
+                 OR (status = 'FAILED' AND error IN ('stale job timeout', 'Interrupted by user (SIGINT)'))
+              )
+              AND EXISTS (
+                SELECT 1
+                FROM url_frontier f
+                WHERE f.job_id = jobs.job_id
+                  AND f.state IN ('queued', 'processing')
+              )
+            """
+        async with self.pool.acquire() as con:
+            res = await con.execute(q, timeout_minutes)
+        return int(res.split()[-1])
+
+    async def create_jobs(self, rows: list) -> list:
+        """
+        rows: [(job_id, start_url, root_domain, config_json, agent_id, project_id,
+        documents_only, path_mode, single_page, incremental, download_files), ...]
+
+        Tek round trip'te (unnest) ekler. Aynı tenant için aynı start_url'le
+        PENDING bekleyen job varsa (ya da batch'te tekrar ediyorsa) yeni job
+        açılmaz. Dönen satırlar: job_id, start_url, agent_id, project_id, created.
+        Eklenen varsa commit'te tek NOTIFY gönderilir.
+        """
+        if not rows:
+            return []
+        cols = list(zip(*rows))
+        q = """
+        WITH input AS (
+            SELECT *
+            FROM unnest($1::text[], $2::text[], $3::text[], $4::text[], $5::text[], $6::int[],
+                        $7::bool[], $8::bool[], $9::bool[], $10::bool[], $11::bool[])
+                 WITH ORDINALITY
+                 AS t(job_id, start_url, root_domain, config, agent_id, project_id,
+                      documents_only, path_mode, single_page, incremental, download_files, ord)
+        ),
+        existing AS (
+            SELECT DISTINCT ON (j.start_url, j.agent_id, j.project_id)
+                   j.job_id, j.start_url, j.agent_id, j.project_id
+            FROM jobs j
+            JOIN (SELECT DISTINCT start_url, agent_id, project_id FROM input) i
+              ON i.start_url = j.start_url AND i.agent_id = j.agent_id AND i.project_id = j.project_id
+            WHERE j.status = 'PENDING'
+            ORDER BY j.start_url, j.agent_id, j.project_id, j.created_at
+        ),
+        fresh AS (
+            SELECT DISTINCT ON (i.start_url, i.agent_id, i.project_id) i.*
+            FROM input i
+            WHERE NOT EXISTS (
+                SELECT 1 FROM existing e
+                WHERE e.start_url = i.start_url AND e.agent_id = i.agent_id AND e.project_id = i.project_id
+            )
+            ORDER BY i.start_url, i.agent_id, i.project_id, i.ord
+        ),
+        ins AS (
+            INSERT INTO jobs (job_id, start_url, root_domain, config, status, agent_id, project_id,
+                              documents_only, path_mode, single_page, incremental, download_files)
+            SELECT job_id, start_url, root_domain, config::jsonb, 'PENDING', agent_id, project_id,
+                   documents_only, path_mode, single_page, incremental, download_files
+            FROM fresh
+            RETURNING job_id, start_url, agent_id, project_id
+        )
+        SELECT job_id, start_url, agent_id, project_id, TRUE AS created FROM ins
+        UNION ALL
+        SELECT job_id, start_url, agent_id, project_id, FALSE AS created FROM existing
+        """
+        async with self.pool.acquire() as con:
+            async with con.transaction():
+                # Eşzamanlı iki toplu ekleme aynı URL'i ikişer kez açmasın
+                await con.execute("SELECT pg_advisory_xact_lock(hashtext('jobs_bulk_insert'))")
+                out = await con.fetch(q, *cols)
+                created = sum(1 for r in out if r["created"])
+                if created:
+                    # Dinleyen daemon'lar bildirimleri zaten birleştirir; batch başına bir tane yeter
+                    await con.execute(NOTIFY_JOB_SQL, JOBS_CHANNEL, f"bulk:{created}")
+        return out
+
+    async def get_job(self, job_id: str):
+        q = """
+        SELECT job_id, status, start_url, root_domain, agent_id, project_id, error,
+               created_at, started_at, finished_at, updated_at
+        FROM jobs
+        WHERE job_id = $1
+        """
+        async with self.pool.acquire() as con:
+            return await con.fetchrow(q, job_id)
+
+    # -------------------- JOB PROGRESS --------------------
+
+    async def save_job_progress(
+        self,
+        job_id: str,
+        *,
+        pages_fetched: int,
+        files_extracted: int,
+        bytes_fetched: int,
+        queue_depth: int,
+        stats: str,
+    ):
+        """Crawler'ın periyodik sayaç yazımı (tek satır upsert); stats: ek sayaçların JSON'u."""
+        q = """
+        INSERT INTO job_progress (job_id, pages_fetched, files_extracted, bytes_fetched, queue_depth, stats, updated_at)
+        VALUES ($1, $2, $3, $4, $5, $6::jsonb, NOW())
+        ON CONFLICT (job_id) DO UPDATE SET
+            pages_fetched   = EXCLUDED.pages_fetched,
+            files_extracted = EXCLUDED.files_extracted,
+            bytes_fetched   = EXCLUDED.bytes_fetched,
+            queue_depth     = EXCLUDED.queue_depth,
+            stats           = EXCLUDED.stats,
+            updated_at      = NOW()
+        """
+        async with self.pool.acquire() as con:
+            await con.execute(q, job_id, pages_fetched, files_extracted, bytes_fetched, queue_depth, stats)
+
+    async def get_job_progress(self, job_id: str):
+        """Job durumu + son yazılan sayaçlar (henüz yazılmadıysa sayaçlar NULL)."""
+        q = """
+        SELECT j.job_id, j.status, j.error, j.started_at, j.updated_at AS job_updated_at,
+               p.pages_fetched, p.files_extracted, p.bytes_fetched, p.queue_depth, p.stats,
+               p.updated_at
+        FROM jobs j
+        LEFT JOIN job_progress p ON p.job_id = j.job_id
+        WHERE j.job_id = $1
+        """
+        async with self.pool.acquire() as con:
+            return await con.fetchrow(q, job_id)
+
+    # -------------------- URL FRONTIER --------------------
+
+    async def enqueue_frontier(self, job_id: str, kind: str, rows: list) -> int:
+        """rows: [(url, domain, depth, priority), ...]; zaten olan URL'ler atlanır. Eklenen satır sayısını döner."""
+        if not rows:
+            return 0
+        urls, domains, depths, priorities = zip(*rows)
+        q = """
+            INSERT INTO url_frontier (job_id, kind, url, domain, depth, priority)
+            SELECT $1, $2, u.url, u.domain, u.depth, u.priority
+            FROM unnest($3::text[], $4::text[], $5::int[], $6::float4[]) AS u(url, domain, depth, priority)
+            ON CONFLICT (job_id, url, kind) DO NOTHING
+            """
+        async with self.pool.acquire() as con:
+            res = await con.execute(
+                q, job_id, kind, list(urls), list(domains), list(depths), [float(p) for p in priorities]
+            )
+        return int(res.split()[-1])
+
+    async def claim_frontier(self, job_id: str, kind: str, limit: int):
+        q = """
+            UPDATE url_frontier
+            SET state      = 'processing',
+                locked_at  = NOW(),
+                updated_at = NOW()
+            WHERE id IN (
+                SELECT id
+                FROM url_frontier
+                WHERE job_id = $1
+                  AND kind = $2
+                  AND state = 'queued'
+                ORDER BY priority DESC, depth, id
+                LIMIT $3
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id, url, depth, priority
+            """
+        async with self.pool.acquire() as con:
+            rows = await con.fetch(q, job_id, kind, limit)
+        return sorted(rows, key=lambda r: (-r["priority"], r["depth"], r["id"]))
+
+    async def complete_frontier(self, ids: list, fetched_ids: list = ()):
+        """ids: done olacak satırlar; fetched_ids: bunlardan gerçekten çekilenler."""
+        if not ids:
+            return
+        q = """
+            UPDATE url_frontier
+            SET state      = 'done',
+                fetched    = fetched OR id = ANY($2::bigint[]),
+                locked_at  = NULL,
+                updated_at = NOW()
+            WHERE id = ANY($1::bigint[])
+            """
+        async with self.pool.acquire() as con:
+            await con.execute(q, ids, list(fetched_ids))
+
+    async def fail_frontier(self, frontier_id: int, error: str):
+        q = """
+            UPDATE url_frontier
+            SET state       = 'failed',
+                retry_count = retry_count + 1,
+                last_error  = $2,
+                locked_at   = NULL,
+                updated_at  = NOW()
+            WHERE id = $1
+            """
+        async with self.pool.acquire() as con:
+            await con.execute(q, frontier_id, error)
+
+    async def release_frontier(self, ids: list):
+        if not ids:
+            return
+        q = """
+            UPDATE url_frontier
+            SET state      = 'queued',
+                locked_at  = NULL,
+                updated_at = NOW()
+            WHERE id = ANY($1::bigint[])
+              AND state = 'processing'
+            """
+        async with self.pool.acquire() as con:
+            await con.execute(q, ids)
+
+    async def requeue_frontier(self, job_id: str, kind: str, max_retries: int) -> int:
+        """Önceki çalıştırmadan processing'de kalan ve yeniden denenebilir failed satırları kuyruğa alır."""
+        q = """
+            UPDATE url_frontier
+            SET state      = 'queued',
+                locked_at  = NULL,
+                updated_at = NOW()
+            WHERE job_id = $1
+              AND kind = $2
+              AND (state = 'processing' OR (state = 'failed' AND retry_count < $3))
+            """
+        async with self.pool.acquire() as con:
+            res = await con.execute(q, job_id, kind, max_retries)
+        return int(res.split()[-1])
+
+    async def count_frontier(self, job_id: str, kind: str, state: str) -> int:
+        q = """
+            SELECT COUNT(*)
+            FROM url_frontier
+            WHERE job_id = $1
+              AND kind = $2
+              AND state = $3::frontier_state
+            """
+        async with self.pool.acquire() as con:
+            return await con.fetchval(q, job_id, kind, state)
+
+    async def count_fetched_frontier(self, job_id: str, kind: str) -> int:
+        """Önceki çalıştırmalarda gerçekten çekilmiş (sayfa bütçesinden düşülmüş) satırlar."""
+        q = """
+            SELECT COUNT(*)
+            FROM url_frontier
+            WHERE job_id = $1
+              AND kind = $2
+              AND state = 'done'
+              AND fetched
+            """
+        async with self.pool.acquire() as con:
+            return await con.fetchval(q, job_id, kind)
+
+    async def count_fetched_frontier_by_prefix(self, job_id: str, kind: str, prefixes: list) -> dict:
+        """
+        Çekilmiş satırları path öneklerine göre sayar: {önek: sayı}. Her URL,
+        PageBudget._prefix gibi path'ine uyan en uzun öneğe sayılır.
+        """
+        if not prefixes:
+            return {}
+        q = """
+            SELECT p.prefix, COUNT(*) AS n
+            FROM (
+                SELECT COALESCE(NULLIF(substring(url FROM '^[^:/?#]+://[^/?#]*([^?#]*)'), ''), '/') AS path
+                FROM url_frontier
+                WHERE job_id = $1
+                  AND kind = $2
+                  AND state = 'done'
+                  AND fetched
+            ) f
+            CROSS JOIN LATERAL (
+                SELECT b.prefix
+                FROM unnest($3::text[]) AS b(prefix)
+                WHERE b.prefix = '/'
+                   OR f.path = b.prefix
+                   OR starts_with(f.path, b.prefix || '/')
+                ORDER BY length(b.prefix) DESC
+                LIMIT 1
+            ) p
+            GROUP BY p.prefix
+            """
+        async with self.pool.acquire() as con:
+            rows = await con.fetch(q, job_id, kind, list(prefixes))
+        return {r["prefix"]: r["n"] for r in rows}
+
     # -------------------- RAW DOCUMENTS --------------------
 
     async def mark_stale_jobs_as_failed(self, timeout_minutes: int):
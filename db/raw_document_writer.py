@@ -0,0 +1,212 @@
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .postgres_store import PostgresStore
+
+
+# Staging tablosuna COPY edilen kolonlar (sıra önemli)
+STAGE_COLUMNS = (
+    "source_type",
+    "source_id",
+    "site",
+    "url",
+    "raw_text",
+    "content_hash",
+    "content_type",
+    "text_len",
+    "agent_id",
+    "project_id",
+)
+
+_CREATE_STAGE = """
+CREATE TEMP TABLE raw_documents_stage (
+    source_type  TEXT NOT NULL,
+    source_id    TEXT NOT NULL,
+    site         TEXT NOT NULL,
+    url          TEXT NOT NULL,
+    raw_text     TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    content_type TEXT,
+    text_len     INTEGER,
+    agent_id     TEXT NOT NULL,
+    project_id   INTEGER NOT NULL
+) ON COMMIT DROP
+"""
+
+# Sadece content_hash'i değişen satırlara dokunur; RETURNING'de olmayan satırlar SKIPPED sayılır.
+_MERGE = """
+INSERT INTO raw_documents (
+    source_type, source_id, site, url, raw_text, content_hash,
+    content_type, text_len, agent_id, project_id, created_at, updated_at
+)
+SELECT source_type, source_id, site, url, raw_text, content_hash,
+       content_type, text_len, agent_id, project_id, NOW(), NOW()
+FROM raw_documents_stage
+ON CONFLICT (source_type, source_id)
+DO UPDATE SET
+    raw_text     = EXCLUDED.raw_text,
+    content_hash = EXCLUDED.content_hash,
+    content_type = EXCLUDED.content_type,
+    text_len     = EXCLUDED.text_len,
+    updated_at   = NOW()
+WHERE raw_documents.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+RETURNING source_type, source_id, (xmax = 0) AS inserted
+"""
+
+
+class RawDocumentWriter:
+    """
+    raw_documents için tamponlu toplu yazıcı.
+
+    Dokümanlar bellekte toplanır; satır/byte limiti dolunca ya da flush_interval_s
+    geçince tek transaction içinde temp staging tablosuna COPY edilip tek bir
+    INSERT ... ON CONFLICT ile raw_documents'a merge edilir.
+
+    add() her satır için INSERTED / UPDATED / SKIPPED / FAILED sonucunu veren
+    bir future döner. Başarısız batch retries kez daha denenir; yine olmazsa
+    satırları FAILED olur (stats["FAILED"]) ve karar çağırana kalır.
+    """
+
+    def __init__(
+        self,
+        pg: PostgresStore,
+        *,
+        max_rows: int = 500,
+        max_bytes: int = 8_000_000,
+        flush_interval_s: float = 2.0,
+        retries: int = 2,
+        retry_delay_s: float = 1.0,
+    ):
+        self.pg = pg
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.flush_interval_s = flush_interval_s
+        self.retries = retries
+        self.retry_delay_s = retry_delay_s
+
+        # (source_type, source_id) -> (row, [futures])
+        self._buf: Dict[Tuple[str, str], Tuple[tuple, List[asyncio.Future]]] = {}
+        self._buf_bytes = 0
+        self._last_flush = time.monotonic()
+        self._flush_lock = asyncio.Lock()
+        self._ticker: Optional[asyncio.Task] = None
+
+        self.stats: Dict[str, int] = {
+            "INSERTED": 0, "UPDATED": 0, "SKIPPED": 0, "FAILED": 0, "flushes": 0,
+        }
+
+    async def start(self):
+        if self._ticker is None:
+            self._ticker = asyncio.create_task(self._tick())
+
+    async def close(self):
+        if self._ticker is not None:
+            self._ticker.cancel()
+            try:
+                await self._ticker
+            except asyncio.CancelledError:
+                pass
+            self._ticker = None
+        await self.flush()
+
+    async def _tick(self):
+        while True:
+            await asyncio.sleep(self.flush_interval_s)
+            if self._buf and time.monotonic() - self._last_flush >= self.flush_interval_s:
+                try:
+                    await self.flush()
+                except Exception as e:
+                    print(f"[DB][WRITER] periodic flush failed: {e}")
+
+    def pending(self) -> int:
+        return len(self._buf)
+
+    async def add(
+        self,
+        *,
+        source_type: str,
+        source_id: str,
+        site: str,
+        url: str,
+        raw_text: str,
+        content_hash: str,
+        content_type: str,
+        text_len: int,
+        agent_id: str,
+        project_id: int
+    ) -> asyncio.Future:
+        """Dokümanı tampona ekler; limit dolarsa flush eder (backpressure)."""
+        fut = asyncio.get_running_loop().create_future()
+        row = (
+            source_type, source_id, site, url, raw_text or "", content_hash,
+            content_type, text_len, agent_id, project_id,
+        )
+        key = (source_type, source_id)
+
+        # Aynı batch'te aynı kaynak iki kez olursa ON CONFLICT hata verir; son hali kazanır.
+        prev = self._buf.get(key)
+        if prev is not None:
+            self._buf_bytes -= len(prev[0][4])
+            futures = prev[1]
+        else:
+            futures = []
+        futures.append(fut)
+        self._buf[key] = (row, futures)
+        self._buf_bytes += len(row[4])
+
+        if len(self._buf) >= self.max_rows or self._buf_bytes >= self.max_bytes:
+            await self.flush()
+
+        return fut
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._buf:
+                return
+
+            batch = self._buf
+            self._buf = {}
+            self._buf_bytes = 0
+            self._last_flush = time.monotonic()
+
+            records = [row for row, _ in batch.values()]
+            attempt = 0
+            while True:
+                try:
+                    touched = await self._merge(records)
+                    break
+                except Exception as e:
+                    print(f"[DB][WRITER] flush of {len(batch)} rows failed (deneme {attempt + 1}): {e}")
+                    if attempt >= self.retries:
+                        self._resolve(batch, {}, default="FAILED")
+                        return
+                    attempt += 1
+                    # Transaction geri alındı; geçici hatalar (bağlantı, deadlock) için kısa bekleme
+                    await asyncio.sleep(self.retry_delay_s * attempt)
+
+            outcomes = {
+                (r["source_type"], r["source_id"]): ("INSERTED" if r["inserted"] else "UPDATED")
+                for r in touched
+            }
+            self.stats["flushes"] += 1
+            self._resolve(batch, outcomes, default="SKIPPED")
+
+    async def _merge(self, records: List[tuple]):
+        async with self.pg.pool.acquire() as con:
+            async with con.transaction():
+                await con.execute(_CREATE_STAGE)
+                await con.copy_records_to_table(
+                    "raw_documents_stage",
+                    records=records,
+                    columns=STAGE_COLUMNS,
+                )
+                return await con.fetch(_MERGE)
+
+    def _resolve(self, batch, outcomes: Dict[Tuple[str, str], str], default: str):
+        for key, (_, futures) in batch.items():
+            outcome = outcomes.get(key, default)
+            self.stats[outcome] += 1
+            for fut in futures:
+                if not fut.done():
+                    fut.set_result(outcome)
@@ -21,6 +21,11 @@ CREATE TABLE IF NOT EXISTS jobs (
 
 CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs(status, created_at);
 
+-- tenant bazında adil job seçimi (pick_job)
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS agent_id TEXT;
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS project_id INT;
+CREATE INDEX IF NOT EXISTS idx_jobs_tenant_status ON jobs(agent_id, project_id, status);
+
 -- 2) url frontier (pages + files)
 DO $$ BEGIN
   CREATE TYPE frontier_state AS ENUM ('queued','processing','done','failed');
@@ -43,7 +48,16 @@ CREATE TABLE IF NOT EXISTS url_frontier (
   UNIQUE(job_id, url, kind)
 );
 
+-- url_scorer skoru: yüksek olan önce claim edilir
+ALTER TABLE url_frontier ADD COLUMN IF NOT EXISTS priority REAL NOT NULL DEFAULT 0;
+-- done satırlardan gerçekten çekilenler (kapsam/path bütçesi yüzünden atlananlar değil);
+-- resume'da sayfa bütçesi bunlardan sayılır
+ALTER TABLE url_frontier ADD COLUMN IF NOT EXISTS fetched BOOLEAN NOT NULL DEFAULT FALSE;
+
 CREATE INDEX IF NOT EXISTS idx_frontier_job_kind_state ON url_frontier(job_id, kind, state);
+-- batch claim: queued satırları (priority DESC, depth, id) sırasıyla LIMIT'li tarar
+DROP INDEX IF EXISTS idx_frontier_claim;
+CREATE INDEX IF NOT EXISTS idx_frontier_claim_priority ON url_frontier(job_id, kind, state, priority DESC, depth, id);
 
 -- 3) documents (no embeddings here)
 DO $$ BEGIN
@@ -71,3 +85,25 @@ CREATE TABLE IF NOT EXISTS documents (
 );
 
 CREATE INDEX IF NOT EXISTS idx_docs_job_status ON documents(job_id, status);
+
+-- toplu job eklemede PENDING start_url tekrarı kontrolü (create_jobs)
+CREATE INDEX IF NOT EXISTS idx_jobs_pending_start_url ON jobs(start_url, agent_id, project_id) WHERE status = 'PENDING';
+
+-- 4) job ilerlemesi: crawler periyodik olarak yazar, API (GET /jobs/{id}/progress) buradan okur
+CREATE TABLE IF NOT EXISTS job_progress (
+  job_id TEXT PRIMARY KEY REFERENCES jobs(job_id) ON DELETE CASCADE,
+  pages_fetched BIGINT NOT NULL DEFAULT 0,
+  files_extracted BIGINT NOT NULL DEFAULT 0,
+  bytes_fetched BIGINT NOT NULL DEFAULT 0,
+  queue_depth BIGINT NOT NULL DEFAULT 0,
+  stats JSONB, -- diğer crawler sayaçları (page_inserted, page_not_modified, ...)
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- 5) incremental site klasörü kilidi: aynı pages_index.jsonl'e filoda tek job yazar.
+-- Sahibi RUNNING değilse ya da heartbeat'i (jobs.updated_at) kesildiyse kilit devralınabilir.
+CREATE TABLE IF NOT EXISTS site_locks (
+  site_key TEXT PRIMARY KEY,
+  job_id TEXT NOT NULL,
+  acquired_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
@@ -1,66 +1,278 @@
+import argparse
+import os
+import signal
 import subprocess
 import sys
 import time
-import signal
-import os
 
-def run_integration_system():
-    processes = []
+# Çöken süreç için yeniden başlatma bekleme süreleri (sn): 1, 2, 4, ... en fazla 60
+BACKOFF_BASE_S = 1.0
+BACKOFF_MAX_S = 60.0
+# Bu kadar süre ayakta kalan süreç "sağlıklı" sayılır, backoff sıfırlanır
+STABLE_AFTER_S = 60.0
+# Kapatmada SIGTERM sonrası SIGKILL'e kadar beklenecek süre
+SHUTDOWN_GRACE_S = 30.0
+# Filonun toplam PG bağlantı bütçesi (Postgres max_connections=100; yönetim/migration payı bırakılır)
+DB_CONNECTIONS = 90
+# Süreç başına en az pool boyutu; daemon'a ayrıca LISTEN bağlantısı eklenir
+MIN_POOL_SIZE = 2
 
 
+def _read_rss_kb(pid: int) -> int:
     try:
-        # 1. API'yi Başlat (Uvicorn)
-        # --reload modunu geliştirme aşamasında kullanabilirsin
-        print("[1/2] API Sunucusu (FastAPI) başlatılıyor...")
-        api_proc = subprocess.Popen(
-            [sys.executable, "-m", "uvicorn", "api.main:app", "--host", "127.0.0.1", "--port", "8000"],
-            stdout=None, # Loglar doğrudan ana terminale akar
-            stderr=None
-        )
-        processes.append(api_proc)
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return 0
+
+
+def _descendants(pid: int) -> list:
+    """/proc üzerinden alt süreçler (uvicorn worker'ları, process pool'lar)."""
+    out = []
+    stack = [pid]
+    while stack:
+        p = stack.pop()
+        try:
+            tasks = os.listdir(f"/proc/{p}/task")
+        except OSError:
+            continue
+        for tid in tasks:
+            try:
+                with open(f"/proc/{p}/task/{tid}/children") as f:
+                    kids = [int(x) for x in f.read().split()]
+            except (OSError, ValueError):
+                continue
+            out.extend(kids)
+            stack.extend(kids)
+    return out
+
+
+class Child:
+    """Launcher'ın izlediği tek bir alt süreç (API ya da worker daemon)."""
+
+    def __init__(self, name: str, cmd: list, env: dict | None = None):
+        self.name = name
+        self.cmd = cmd
+        self.env = env
+        self.proc: subprocess.Popen | None = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self.failures = 0
+        self.next_start = 0.0
+        self.last_exit: int | None = None
+
+    def start(self):
+        self.proc = subprocess.Popen(self.cmd, env=self.env, stdout=None, stderr=None)
+        self.started_at = time.monotonic()
+        print(f"[LAUNCHER] {self.name} başlatıldı (PID: {self.proc.pid})")
+
+    def alive(self) -> bool:
+        return self.proc is not None and self.proc.poll() is None
+
+    def check(self, now: float):
+        """Ölen süreci backoff ile yeniden başlatır."""
+        if self.proc is None:
+            if now >= self.next_start:
+                self.start()
+            return
+
+        code = self.proc.poll()
+        if code is None:
+            if self.failures and now - self.started_at >= STABLE_AFTER_S:
+                self.failures = 0
+            return
+
+        self.last_exit = code
+        self.proc = None
+        if now - self.started_at >= STABLE_AFTER_S:
+            self.failures = 0
+        delay = min(BACKOFF_MAX_S, BACKOFF_BASE_S * (2 ** self.failures))
+        self.failures += 1
+        self.restarts += 1
+        self.next_start = now + delay
+        print(f"[LAUNCHER] {self.name} durdu (Exit Code: {code}); {delay:.0f} sn sonra yeniden başlatılacak")
+
+    def health(self, now: float) -> dict:
+        if not self.alive():
+            return {
+                "name": self.name, "state": "restarting" if self.proc is None else "exited",
+                "restarts": self.restarts, "last_exit": self.last_exit,
+                "next_start_s": round(max(0.0, self.next_start - now), 1),
+            }
+        pid = self.proc.pid
+        kids = _descendants(pid)
+        rss = _read_rss_kb(pid) + sum(_read_rss_kb(k) for k in kids)
+        return {
+            "name": self.name, "state": "up", "pid": pid, "children": len(kids),
+            "uptime_s": round(now - self.started_at), "restarts": self.restarts,
+            "rss_mb": round(rss / 1024, 1),
+        }
+
+
+def _print_health(children: list):
+    now = time.monotonic()
+    total = 0.0
+    print("[LAUNCHER] --- health ---")
+    for c in children:
+        h = c.health(now)
+        total += h.get("rss_mb", 0.0)
+        print(f"[LAUNCHER] {h}")
+    print(f"[LAUNCHER] toplam RSS: {total:.1f} MB")
+
+
+def _shutdown(children: list):
+    # Önce nazikçe: SIGTERM (worker'lar koşan job'ları "Interrupted" işaretler)
+    for c in children:
+        if c.alive():
+            print(f"--- Süreç kapatılıyor: {c.name} (PID: {c.proc.pid}) ---")
+            c.proc.terminate()
+
+    deadline = time.monotonic() + SHUTDOWN_GRACE_S
+    for c in children:
+        if c.proc is None:
+            continue
+        try:
+            c.proc.wait(timeout=max(0.1, deadline - time.monotonic()))
+        except subprocess.TimeoutExpired:
+            print(f"--- {c.name} zamanında kapanmadı, öldürülüyor (PID: {c.proc.pid}) ---")
+            c.proc.kill()
+            c.proc.wait()
+
 
+def max_workers(db_connections: int, api_workers: int) -> int:
+    """Bağlantı bütçesine sığan en fazla daemon sayısı (her biri MIN_POOL_SIZE + LISTEN)."""
+    return (db_connections - api_workers * MIN_POOL_SIZE) // (MIN_POOL_SIZE + 1)
+
+
+def fit_workers(args):
+    """
+    Daemon sayısını bağlantı bütçesine sığacak kadar indirir (uyararak); en az 1
+    daemon her zaman başlar. Bütçe API + 1 daemon'a bile yetmiyorsa pool'lar en
+    küçük boyutta kalır ve bütçenin aşılacağı söylenir.
+    """
+    fit = max_workers(args.db_connections, args.api_workers)
+    if args.workers > fit:
+        capped = max(1, fit)
+        print(f"[LAUNCHER] UYARI: {args.workers} daemon {args.db_connections} PG bağlantısına sığmıyor; "
+              f"{capped} daemon başlatılacak (--db-connections ile bütçeyi artırabilirsiniz)")
+        args.workers = capped
+    if fit < 1:
+        need = (args.api_workers + 1) * MIN_POOL_SIZE + 1
+        print(f"[LAUNCHER] UYARI: {args.db_connections} PG bağlantısı API + 1 daemon için bile az "
+              f"(en az {need}); pool'lar en küçük boyutta açılacak, bütçe aşılabilir")
+
+
+def db_pool_sizes(args) -> tuple:
+    """
+    Bağlantı bütçesini süreçlere paylaştırır: (API worker başına pool, daemon başına pool).
+    Her daemon pool'una ek olarak bir LISTEN bağlantısı açar. Pool'lar
+    MIN_POOL_SIZE'ın altına inmez (bkz. fit_workers).
+    """
+    procs = args.api_workers + args.workers
+    per_proc = max(MIN_POOL_SIZE, (args.db_connections - args.workers) // procs)
+    return per_proc, per_proc
+
+
+def build_children(args) -> list:
+    children = []
+    api_pool, worker_pool = db_pool_sizes(args)
+
+    # 1. API: uvicorn kendi worker süreçlerini yönetir (--workers)
+    api_cmd = [
+        sys.executable, "-m", "uvicorn", "api.main:app",
+        "--host", args.host, "--port", str(args.port),
+        "--workers", str(args.api_workers),
+    ]
+    api_env = dict(os.environ)
+    api_env.setdefault("API_DB_POOL_SIZE", str(api_pool))
+    children.append(Child("api", api_cmd, api_env))
+
+    # 2. Worker daemon'ları: çekirdekler daemon'lar arasında paylaştırılır;
+    #    her daemon'un process pool'ları kendi payı kadar büyür
+    cpus = os.cpu_count() or 1
+    share = max(1, cpus // args.workers)
+    env = dict(os.environ)
+    env.setdefault("WORKER_EXTRACT_PROCS", str(share))
+    # Çekirdek başına bir daemon varsa parse daemon'un kendi loop'unda yapılır
+    env.setdefault("WORKER_PARSE_PROCS", str(share - 1 if share > 1 else 0))
+    # Bağlantı bütçesi daemon'lara bölünür (LISTEN bağlantısı bunun dışında)
+    env.setdefault("WORKER_DB_POOL_SIZE", str(worker_pool))
+    for i in range(args.workers):
+        children.append(Child(f"worker-{i + 1}", [sys.executable, "-m", "workers.worker_daemon"], env))
+
+    return children
+
+
+def run_integration_system(args):
+    fit_workers(args)
+    children = build_children(args)
+    stopping = False
+
+    def _on_signal(signum, _frame):
+        nonlocal stopping
+        if not stopping:
+            print(f"\nKapatma sinyali ({signal.Signals(signum).name}) alındı. Süreçler sonlandırılıyor...")
+        stopping = True
+
+    signal.signal(signal.SIGTERM, _on_signal)
+    signal.signal(signal.SIGINT, _on_signal)
+
+    try:
+        print(f"[LAUNCHER] API ({args.api_workers} worker) + {args.workers} worker daemon başlatılıyor "
+              f"(PG bağlantı bütçesi: {args.db_connections})...")
+        children[0].start()
         # API'nin portu dinlemeye başlaması için kısa bir bekleme
         time.sleep(2)
-
-        # 2. Worker Daemon'ı Başlat
-        print("[2/2] Worker Daemon (Crawler) başlatılıyor...")
-        worker_proc = subprocess.Popen(
-            [sys.executable, "-m", "workers.worker_daemon"],
-            stdout=None,
-            stderr=None
-        )
-        processes.append(worker_proc)
+        for c in children[1:]:
+            c.start()
 
         print("\nSistem aktif. Durdurmak için Control+C tuşlarına basın.\n")
 
-        # Süreçleri sürekli izle
-        while True:
+        last_health = time.monotonic()
+        while not stopping:
             time.sleep(1)
-            # Eğer süreçlerden biri kendi kendine kapandıysa (hata vb.)
-            for proc in processes:
-                poll = proc.poll()
-                if poll is not None:
-                    print(f"\nBir süreç beklenmedik şekilde durdu (Exit Code: {poll}).")
-                    raise KeyboardInterrupt
-
-    except KeyboardInterrupt:
-        print("\nKapatma sinyali (SIGINT) alındı. Süreçler sonlandırılıyor...")
+            now = time.monotonic()
+            # Süreçlerden biri kendi kendine kapandıysa sadece o yeniden başlatılır
+            for c in children:
+                c.check(now)
+            if args.health_interval and now - last_health >= args.health_interval:
+                last_health = now
+                _print_health(children)
+
     except Exception as e:
         print(f"\n️ Beklenmedik Hata: {e}")
     finally:
-        # Temizlik aşaması: Açık kalan süreçleri öldür
-        for proc in processes:
-            if proc.poll() is None: # Eğer hala çalışıyorsa
-                print(f"--- Süreç kapatılıyor (PID: {proc.pid}) ---")
-                proc.terminate() # Nazikçe kapatmayı dene
-                
-        # Süreçlerin tamamen kapanmasını bekle
-        for proc in processes:
-            proc.wait()
-        
+        _shutdown(children)
         print("Tüm sistem güvenle kapatıldı.")
 
+
+def parse_args(argv=None):
+    cpus = os.cpu_count() or 1
+    ap = argparse.ArgumentParser(description="API + worker daemon filosu")
+    ap.add_argument("--workers", type=int, default=int(os.getenv("LAUNCHER_WORKERS", cpus)),
+                    help="worker daemon süreç sayısı (varsayılan: CPU sayısı; PG bağlantı bütçesine "
+                         "sığmazsa uyarıyla azaltılır). Host başına "
+                         "politeness limitleri daemon başınadır; aynı host'a giden toplam yük "
+                         "en fazla bu sayı kadar katlanır")
+    ap.add_argument("--api-workers", type=int, default=int(os.getenv("LAUNCHER_API_WORKERS", min(4, cpus))),
+                    help="uvicorn worker sayısı")
+    ap.add_argument("--host", default=os.getenv("LAUNCHER_HOST", "127.0.0.1"))
+    ap.add_argument("--port", type=int, default=int(os.getenv("LAUNCHER_PORT", "8000")))
+    ap.add_argument("--db-connections", type=int,
+                    default=int(os.getenv("LAUNCHER_DB_CONNECTIONS", DB_CONNECTIONS)),
+                    help="tüm süreçlerin toplam PG bağlantı bütçesi (Postgres max_connections'ın altında olmalı)")
+    ap.add_argument("--health-interval", type=float, default=60.0,
+                    help="sağlık/bellek raporu aralığı (sn, 0 -> kapalı)")
+    args = ap.parse_args(argv)
+    args.workers = max(1, args.workers)
+    args.api_workers = max(1, args.api_workers)
+    return args
+
+
 if __name__ == "__main__":
     # Scriptin bulunduğu dizine geç (yolların şaşmaması için)
     os.chdir(os.path.dirname(os.path.abspath(__file__)))
-    run_integration_system()
+    run_integration_system(parse_args())
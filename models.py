@@ -1,5 +1,5 @@
 from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 
 @dataclass
@@ -32,12 +32,52 @@ class CrawlJob:
     )
 
     max_file_bytes: int = 25_000_000
+    # HTML sayfa gövdesi bu boyutu aşarsa indirme yarıda kesilir
+    max_page_bytes: int = 10_000_000
+    # Bu boyutu aşan dokümanlar çıkarım için geçici dosyaya yazılır
+    extract_spill_bytes: int = 16_000_000
+
+    # "memory" -> process içi kuyruk, "postgres" -> url_frontier tablosu (resume edilebilir)
+    frontier: str = "memory"
+    # Ziyaret edilen URL kümesi: "set" | "exact" | "exact16" | "bloom"
+    seen_set: str = "exact"
+    seen_set_fp_rate: float = 0.001
+    # domain -> url_canonicalizer.SiteRules alanları (örn. {"drop_params": ["sort"]})
+    url_rules: Dict[str, dict] = field(default_factory=dict)
+    # HTML parse process sayısı: None -> CPU sayısına göre, 0 -> event loop'ta parse
+    parse_workers: Optional[int] = None
+
+    # Frontier önceliği (crawler/url_scorer.py): "default" | "fifo"
+    scorer: str = "default"
+    # DefaultScorer ağırlıkları (depth, path, file, fresh, known) için override
+    score_weights: Dict[str, float] = field(default_factory=dict)
+    # Bu path önekleriyle başlayan URL'ler öne alınır
+    priority_paths: List[str] = field(default_factory=list)
+    # path öneki -> en fazla çekilecek sayfa (max_pages_total'a ek alt bütçeler)
+    path_budgets: Dict[str, int] = field(default_factory=dict)
+
+    # JS render (crawler/js_renderer.py): "off" | "auto" (sadece JS kabuğu sayfalar) | "always"
+    js_render: str = "off"
+    # Job başına toplam render süresi (sn, 0 -> sınırsız)
+    render_budget_s: float = 300.0
+    # Aynı anda açık izole browser context sayısı
+    render_contexts: int = 2
+
+    # Yakın-kopya sayfalar (crawler/near_dup.py): "off" | "skip" | "reference"
+    near_dup: str = "off"
+    # Bu tahmini Jaccard benzerliği (3 kelimelik shingle'lar) ve üstü yakın kopya sayılır
+    near_dup_threshold: float = 0.9
 
 
 @dataclass
 class UrlContext:
     url: str
     depth: int
+    frontier_id: Optional[int] = None
+    # Yüksek olan önce çekilir (url_scorer)
+    priority: float = 0.0
+    # Sayfa bütçesinden düşülüp gerçekten çekildi mi (resume'da bütçe sayımı için)
+    fetched: bool = False
 
 
 @dataclass
@@ -55,6 +95,14 @@ class PageRecord:
     text_len: int = 0
     agent_id: str = "default_agent_id"
     project_id: int = 1
+    # Koşullu yeniden tarama için HTTP doğrulayıcıları
+    etag: str = ""
+    last_modified: str = ""
+    # Doğrulayıcıların geldiği (çekilen) adres, url'den farklıysa (<link rel=canonical>)
+    fetched_url: str = ""
+    # MinHash imzası (hex) ve yakın kopyaysa orijinal sayfanın page_id'si
+    minhash: str = ""
+    duplicate_of: str = ""
 
 
 @dataclass
@@ -69,4 +117,6 @@ class FileRecord:
     size_bytes: int
     agent_id: str = "default_agent_id"
     project_id: int = 1
-    content_hash: str = ""
\ No newline at end of file
+    content_hash: str = ""
+    etag: str = ""
+    last_modified: str = ""
\ No newline at end of file
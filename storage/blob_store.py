@@ -0,0 +1,409 @@
+import gzip
+import os
+import sqlite3
+import threading
+import zlib
+from typing import Optional
+
+from .segment_store import (
+    SEGMENT_BYTES,
+    SEGMENT_SCHEME,
+    append_entry,
+    encode_entry,
+    parse_ref,
+    reader_for,
+    segment_path,
+    segment_ref,
+)
+
+try:
+    import zstandard
+except ImportError:  # opsiyonel; yoksa gzip kullanılır
+    zstandard = None
+
+ZSTD_LEVEL = 3
+GZIP_LEVEL = 5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+  hash TEXT PRIMARY KEY,
+  path TEXT NOT NULL,
+  refs INTEGER NOT NULL,
+  raw_bytes INTEGER NOT NULL,
+  stored_bytes INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS refs (
+  owner TEXT PRIMARY KEY,
+  hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS segments (
+  id INTEGER PRIMARY KEY,
+  bytes INTEGER NOT NULL DEFAULT 0,
+  dead_bytes INTEGER NOT NULL DEFAULT 0
+);
+"""
+# Segment layout'unda blob'un yeri (offset index); files layout'unda NULL
+_SEGMENT_COLUMNS = ("segment", "offset", "length")
+
+
+def _default_codec() -> str:
+    codec = os.getenv("BLOB_CODEC", "").lower()
+    if codec in ("zstd", "gzip"):
+        if codec == "zstd" and zstandard is None:
+            return "gzip"
+        return codec
+    return "zstd" if zstandard is not None else "gzip"
+
+
+def _default_layout() -> str:
+    return "segments" if os.getenv("BLOB_LAYOUT", "").lower() == "segments" else "files"
+
+
+def _compress(raw: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    return gzip.compress(raw, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _decompress(data, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd blob okumak için 'zstandard' paketi gerekli")
+        return zstandard.ZstdDecompressor().decompress(data)
+    # gzip.decompress buffer'ı kopyalar; zlib doğrudan memoryview'dan açar
+    return zlib.decompress(data, wbits=31)
+
+
+def read_bytes(path: str) -> bytes:
+    """Blob (.zst / .gz / segment://) ya da eski düz .txt dosyasını açıp ham içeriği döner."""
+    if path.startswith(SEGMENT_SCHEME):
+        root, content_hash = parse_ref(path)
+        codec, payload = reader_for(root).read(content_hash)
+        return _decompress(payload, codec)
+    with open(path, "rb") as f:
+        data = f.read()
+    if path.endswith(".zst"):
+        return _decompress(data, "zstd")
+    if path.endswith(".gz"):
+        return _decompress(data, "gzip")
+    return data
+
+
+def read_text(path: str) -> str:
+    """PageRecord.text_path / FileRecord.file_path'i sıkıştırmadan bağımsız okur."""
+    return read_bytes(path).decode("utf-8")
+
+
+class BlobStore:
+    """
+    content_hash ile adreslenen, sıkıştırılmış metin deposu.
+
+    Aynı içerik kaç URL'de, kaç job'da geçerse geçsin diske bir kez yazılır
+    (zstandard varsa zstd, yoksa gzip). Her kayıt (owner: site klasörü +
+    page/file id) tek bir blob'a bağlanır; refcount'lar SQLite'ta tutulur ve
+    birden fazla worker process'i aynı kökü paylaşabilir.
+
+    layout="files"    -> her blob ayrı dosya (root/ab/cd/<hash>.zst); sayısı
+                         sıfıra düşen blob aynı transaction içinde silinir.
+    layout="segments" -> blob'lar root/segments altındaki büyük, sadece
+                         sona eklenen segment dosyalarına yazılır; yerleri
+                         (segment, offset, length) blobs tablosunda tutulur,
+                         okuma mmap ile yapılır. Düşen blob'lar segmentte
+                         ölü alan bırakır, compact_segments() temizler.
+    """
+
+    def __init__(self, root: str, codec: Optional[str] = None, layout: Optional[str] = None,
+                 segment_bytes: int = SEGMENT_BYTES):
+        self.root = root
+        self.codec = codec or _default_codec()
+        self.ext = ".zst" if self.codec == "zstd" else ".gz"
+        self.layout = layout or _default_layout()
+        self.segment_bytes = segment_bytes
+        os.makedirs(root, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            os.path.join(root, "refs.sqlite"), timeout=30.0, isolation_level=None, check_same_thread=False
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        cols = {r[1] for r in self._db.execute("PRAGMA table_info(blobs)")}
+        for col in _SEGMENT_COLUMNS:
+            if col not in cols:
+                self._db.execute(f"ALTER TABLE blobs ADD COLUMN {col} INTEGER")
+
+        self.stats = {"written": 0, "deduped": 0, "released": 0, "raw_bytes": 0, "stored_bytes": 0}
+
+    def path_for(self, content_hash: str) -> str:
+        return os.path.join(self.root, content_hash[:2], content_hash[2:4], content_hash + self.ext)
+
+    def _write_file(self, path: str, payload: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(payload)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _exists(self, path: str, segment: Optional[int]) -> bool:
+        if segment is not None:
+            return os.path.exists(segment_path(self.root, segment))
+        return os.path.exists(path)
+
+    def _active_segment(self, size: int) -> int:
+        # Çağıran transaction içinde: son segment doluysa yenisi açılır
+        row = self._db.execute("SELECT id, bytes FROM segments ORDER BY id DESC LIMIT 1").fetchone()
+        if row is not None and row[1] + size <= self.segment_bytes:
+            return row[0]
+        seg_id = (row[0] + 1) if row is not None else 1
+        self._db.execute("INSERT INTO segments (id) VALUES (?)", (seg_id,))
+        return seg_id
+
+    def _append(self, content_hash: str, payload: bytes):
+        """Sıkıştırılmış blob'u aktif segmente ekler -> (segment, offset, length)."""
+        entry = encode_entry(content_hash, self.codec, payload)
+        seg_id = self._active_segment(len(entry))
+        offset = append_entry(self.root, seg_id, entry)
+        self._db.execute("UPDATE segments SET bytes = bytes + ? WHERE id = ?", (len(entry), seg_id))
+        return seg_id, offset, len(entry)
+
+    def _release(self, owner_hash: str):
+        # Çağıran transaction içinde
+        self._db.execute("UPDATE blobs SET refs = refs - 1 WHERE hash = ?", (owner_hash,))
+        row = self._db.execute(
+            "SELECT path, refs, segment, length FROM blobs WHERE hash = ?", (owner_hash,)
+        ).fetchone()
+        if row and row[1] <= 0:
+            self._db.execute("DELETE FROM blobs WHERE hash = ?", (owner_hash,))
+            if row[2] is not None:
+                # Segmentte ölü alan olarak kalır; compaction'da silinir
+                self._db.execute("UPDATE segments SET dead_bytes = dead_bytes + ? WHERE id = ?", (row[3], row[2]))
+            else:
+                self._remove(row[0])
+            self.stats["released"] += 1
+
+    def _stored(self, content_hash: str) -> bool:
+        with self._lock:
+            blob = self._db.execute(
+                "SELECT path, segment FROM blobs WHERE hash = ?", (content_hash,)
+            ).fetchone()
+            return blob is not None and self._exists(blob[0], blob[1])
+
+    def _prepare(self, content_hash: str, text: str):
+        """
+        Lock ve transaction dışında: metni sıkıştırır, files layout'unda dosyayı
+        da yazar (içerik adresli; aynı hash'i yazan iki süreç aynı baytları yazar).
+        -> (raw, payload, yazılan dosya ya da None)
+        """
+        raw = text.encode("utf-8")
+        payload = _compress(raw, self.codec)
+        written = None
+        if self.layout != "segments":
+            written = self.path_for(content_hash)
+            self._write_file(written, payload)
+        return raw, payload, written
+
+    def put(self, owner: str, content_hash: str, text: Optional[str]) -> Optional[str]:
+        """
+        owner'ı content_hash blob'una bağlar (gerekirse blob'u yazar) ve blob
+        yolunu döner. owner önceden başka bir blob'a bağlıysa o blob'un
+        referansı düşülür. text None ise blob yazılmaz: blob yoksa hiçbir şey
+        değişmez ve None döner (bkz. link). Bloklayıcıdır; event loop'ta
+        asyncio.to_thread ile çağrılmalı.
+
+        Sıkıştırma (ve files layout'unda dosya yazımı) lock'tan önce yapılır;
+        lock + transaction içinde sadece refcount/index güncellenir.
+        """
+        prepared = None
+        if text is not None and not self._stored(content_hash):
+            prepared = self._prepare(content_hash, text)
+
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute("SELECT hash FROM refs WHERE owner = ?", (owner,)).fetchone()
+                old = row[0] if row else None
+
+                blob = self._db.execute(
+                    "SELECT path, segment FROM blobs WHERE hash = ?", (content_hash,)
+                ).fetchone()
+                if blob is not None and self._exists(blob[0], blob[1]):
+                    path = blob[0]
+                    if prepared is not None and prepared[2] is not None and prepared[2] != path:
+                        # Arada başka süreç aynı içeriği başka yola (ör. eski codec) yazdı
+                        self._remove(prepared[2])
+                    if old != content_hash:
+                        self._db.execute("UPDATE blobs SET refs = refs + 1 WHERE hash = ?", (content_hash,))
+                    self.stats["deduped"] += 1
+                elif text is None:
+                    self._db.execute("ROLLBACK")
+                    return None
+                else:
+                    if prepared is None:
+                        # Ön kontrolden sonra blob silindi (nadir): burada hazırlanır
+                        prepared = self._prepare(content_hash, text)
+                    raw, payload, written = prepared
+                    if self.layout == "segments":
+                        path = segment_ref(self.root, content_hash)
+                        seg = self._append(content_hash, payload)
+                    else:
+                        path = written
+                        if not os.path.exists(path):
+                            # Lock dışındaki yazımdan sonra son referansı düşen bir
+                            # transaction dosyayı sildi: yeniden yazılır
+                            self._write_file(path, payload)
+                        seg = (None, None, None)
+                    if blob is None:
+                        self._db.execute(
+                            "INSERT INTO blobs (hash, path, refs, raw_bytes, stored_bytes, segment, offset, length)"
+                            " VALUES (?, ?, 1, ?, ?, ?, ?, ?)",
+                            (content_hash, path, len(raw), len(payload), *seg),
+                        )
+                    else:
+                        # Kayıt var ama dosya kaybolmuş: yeniden yazıldı
+                        self._db.execute(
+                            "UPDATE blobs SET path = ?, raw_bytes = ?, stored_bytes = ?, refs = refs + ?,"
+                            " segment = ?, offset = ?, length = ? WHERE hash = ?",
+                            (path, len(raw), len(payload), 1 if old != content_hash else 0, *seg, content_hash),
+                        )
+                    self.stats["written"] += 1
+                    self.stats["raw_bytes"] += len(raw)
+                    self.stats["stored_bytes"] += len(payload)
+
+                if old != content_hash:
+                    self._db.execute(
+                        "INSERT INTO refs (owner, hash) VALUES (?, ?)"
+                        " ON CONFLICT(owner) DO UPDATE SET hash = excluded.hash",
+                        (owner, content_hash),
+                    )
+                    if old is not None:
+                        self._release(old)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return path
+
+    def link(self, owner: str, content_hash: str) -> Optional[str]:
+        """owner'ı sadece zaten var olan bir blob'a bağlar; blob yoksa None (hash'in altına başka metin yazılmaz)."""
+        return self.put(owner, content_hash, None)
+
+    def drop(self, owner: str):
+        """owner'ın blob bağlantısını kaldırır (kayıt silindiğinde)."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute("SELECT hash FROM refs WHERE owner = ?", (owner,)).fetchone()
+                if row:
+                    self._db.execute("DELETE FROM refs WHERE owner = ?", (owner,))
+                    self._release(row[0])
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def move_to_segment(self, content_hash: str) -> Optional[str]:
+        """
+        Files layout'undaki bir blob'u segmente taşır ve yeni (segment://) yolunu
+        döner. Eski dosya silinmez: ona bakan kayıtlar güncellenene kadar
+        okunabilir kalmalı (bkz. storage.migrate_segments).
+        """
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT path, segment FROM blobs WHERE hash = ?", (content_hash,)
+                ).fetchone()
+                if row is None:
+                    self._db.execute("COMMIT")
+                    return None
+                if row[1] is not None:
+                    self._db.execute("COMMIT")
+                    return row[0]
+                with open(row[0], "rb") as f:
+                    payload = f.read()
+                codec = "zstd" if row[0].endswith(".zst") else "gzip"
+                if codec != self.codec:
+                    payload = _compress(_decompress(payload, codec), self.codec)
+                path = segment_ref(self.root, content_hash)
+                seg = self._append(content_hash, payload)
+                self._db.execute(
+                    "UPDATE blobs SET path = ?, stored_bytes = ?, segment = ?, offset = ?, length = ? WHERE hash = ?",
+                    (path, len(payload), *seg, content_hash),
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return path
+
+    def compact_segments(self, min_dead_ratio: float = 0.3) -> dict:
+        """
+        Ölü alan oranı min_dead_ratio'yu geçen (aktif olmayan) segmentlerdeki
+        canlı blob'ları aktif segmente kopyalayıp eski segmenti siler. Kayıtlar
+        mantıksal segment:// adresi tuttuğu için index dışında bir şey değişmez.
+        """
+        out = {"segments": 0, "moved": 0, "freed_bytes": 0}
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, bytes, dead_bytes FROM segments"
+                " WHERE id < (SELECT MAX(id) FROM segments) AND bytes > 0"
+                " AND CAST(dead_bytes AS REAL) / bytes >= ?",
+                (min_dead_ratio,),
+            ).fetchall()
+
+        for seg_id, size, dead in rows:
+            path = segment_path(self.root, seg_id)
+            with self._lock:
+                self._db.execute("BEGIN IMMEDIATE")
+                try:
+                    live = self._db.execute(
+                        "SELECT hash, offset, length FROM blobs WHERE segment = ?", (seg_id,)
+                    ).fetchall()
+                    if live:
+                        with open(path, "rb") as f:
+                            for content_hash, offset, length in live:
+                                f.seek(offset)
+                                entry = f.read(length)
+                                new_seg = self._active_segment(len(entry))
+                                new_off = append_entry(self.root, new_seg, entry)
+                                self._db.execute(
+                                    "UPDATE segments SET bytes = bytes + ? WHERE id = ?", (len(entry), new_seg)
+                                )
+                                self._db.execute(
+                                    "UPDATE blobs SET segment = ?, offset = ? WHERE hash = ?",
+                                    (new_seg, new_off, content_hash),
+                                )
+                    self._db.execute("DELETE FROM segments WHERE id = ?", (seg_id,))
+                    self._db.execute("COMMIT")
+                except BaseException:
+                    self._db.execute("ROLLBACK")
+                    raise
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            out["segments"] += 1
+            out["moved"] += len(live)
+            out["freed_bytes"] += dead
+        return out
+
+    def usage(self) -> dict:
+        """Depodaki blob sayısı, referans sayısı ve ham/sıkıştırılmış toplam boyut."""
+        with self._lock:
+            n, refs, raw, stored = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(refs), 0), COALESCE(SUM(raw_bytes), 0),"
+                " COALESCE(SUM(stored_bytes), 0) FROM blobs"
+            ).fetchone()
+        return {"blobs": n, "refs": refs, "raw_bytes": raw, "stored_bytes": stored}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
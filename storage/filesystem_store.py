@@ -1,11 +1,17 @@
+import asyncio
 import os
 import json
-import aiofiles
-from typing import List
+from dataclasses import fields
+from typing import Dict, Iterator, Optional
 from urllib.parse import urlparse
 
 from models import CrawlJob, PageRecord, FileRecord
 from utils import hash_url, get_domain, hash_text
+from .blob_store import BlobStore
+from .index_log import IndexLog, migrate_json_index
+
+PAGES_INDEX = "pages_index.jsonl"
+FILES_INDEX = "files_index.jsonl"
 
 
 def _safe_site_key(domain: str) -> str:
@@ -17,11 +23,209 @@ def _start_path(url: str) -> str:
     return p.rstrip("/") or "/"
 
 
+def _record(cls, raw: dict):
+    """Index satırından kayıt üretir; bilinmeyen (eski/yeni sürüm) alanları atlar."""
+    allowed = {f.name for f in fields(cls)}
+    return cls(**{k: v for k, v in raw.items() if k in allowed})
+
+
+def _set_validators(rec, etag: str, last_modified: str, fetched_url: str = "") -> bool:
+    """
+    ETag/Last-Modified değiştiyse kayda yazar; değişiklik olup olmadığını döner.
+    fetched_url: doğrulayıcıların geldiği adres (sadece sayfa kayıtlarında; kaydın
+    kendi url'iyse boş tutulur).
+    """
+    if fetched_url == rec.url:
+        fetched_url = ""
+    if (rec.etag == etag and rec.last_modified == last_modified
+            and getattr(rec, "fetched_url", "") == fetched_url):
+        return False
+    rec.etag = etag
+    rec.last_modified = last_modified
+    if hasattr(rec, "fetched_url"):
+        rec.fetched_url = fetched_url
+    return True
+
+
+def blob_owner(site_key: str, kind: str, rec_id: str) -> str:
+    """BlobStore referans anahtarı: site klasörü + "page"/"file" + kayıt id'si."""
+    return f"{site_key}:{kind}:{rec_id}"
+
+
+def iter_index_records(site_dir: str, kind: str) -> Iterator[dict]:
+    """
+    Site klasöründeki "pages" / "files" index kayıtlarını döner.
+    JSONL log yoksa eski *_index.json dosyasına düşer.
+    """
+    key = "page_id" if kind == "pages" else "file_id"
+    log = IndexLog(os.path.join(site_dir, f"{kind}_index.jsonl"), key)
+    if log.exists():
+        yield from log.load()
+        return
+
+    legacy = os.path.join(site_dir, f"{kind}_index.json")
+    if os.path.exists(legacy):
+        with open(legacy, "r", encoding="utf-8") as f:
+            yield from json.loads(f.read() or "[]")
+
+
+def iter_site_dirs(data_dir: str) -> Iterator[str]:
+    """data_dir altındaki index'i olan site klasörleri (blob kökü hariç)."""
+    blobs = os.path.abspath(os.path.join(data_dir, "blobs"))
+    for name in sorted(os.listdir(data_dir)):
+        d = os.path.join(data_dir, name)
+        if not os.path.isdir(d) or os.path.abspath(d) == blobs:
+            continue
+        if any(os.path.exists(os.path.join(d, f)) for f in (PAGES_INDEX, FILES_INDEX, "pages_index.json", "files_index.json")):
+            yield d
+
+
 class FilesystemStore:
     def __init__(self, base_dir: str = "data"):
         self.base_dir = base_dir
-        self._pages: List[PageRecord] = []
-        self._files: List[FileRecord] = []
+        # page_id / file_id -> kayıt (dict insertion order'ı index sırasını korur)
+        self._pages: Dict[str, PageRecord] = {}
+        self._files: Dict[str, FileRecord] = {}
+        # content_hash -> page_id
+        self._page_by_hash: Dict[str, str] = {}
+        # hash_url(fetched_url) -> page_id: kanonik adresiyle saklanan sayfanın çekildiği adres
+        self._page_by_fetched: Dict[str, str] = {}
+
+        # Append-only index log'ları; kayıt değiştikçe satır eklenir
+        self._page_log: Optional[IndexLog] = None
+        self._file_log: Optional[IndexLog] = None
+        self._loaded = True
+        self._compactions: Dict[str, asyncio.Task] = {}
+        # Metinler job'lar arası ortak, content_hash adresli blob deposunda
+        self._blobs: Optional[BlobStore] = None
+
+    @property
+    def blobs(self) -> BlobStore:
+        if self._blobs is None:
+            self._blobs = BlobStore(os.path.join(self.base_dir, "blobs"))
+        return self._blobs
+
+    async def _put_text(self, job: CrawlJob, kind: str, rec_id: str, content_hash: str,
+                        text: str, old_path: str = "") -> str:
+        """Metni blob deposuna yazar (aynı içerik varsa sadece referans ekler), blob yolunu döner."""
+        owner = blob_owner(os.path.basename(self.job_dir(job)), kind, rec_id)
+        path = await asyncio.to_thread(self.blobs.put, owner, content_hash, text or "")
+        self._drop_legacy_txt(old_path, path)
+        return path
+
+    async def _link_text(self, job: CrawlJob, kind: str, rec_id: str, content_hash: str,
+                         old_path: str = "") -> Optional[str]:
+        """Kaydı var olan bir blob'a bağlar (metin yazmadan); blob yoksa None."""
+        owner = blob_owner(os.path.basename(self.job_dir(job)), kind, rec_id)
+        path = await asyncio.to_thread(self.blobs.link, owner, content_hash)
+        if path is not None:
+            self._drop_legacy_txt(old_path, path)
+        return path
+
+    @staticmethod
+    def _drop_legacy_txt(old_path: str, path: str):
+        # Blob öncesi düz .txt kaydı artık kullanılmıyor
+        if old_path and old_path.endswith(".txt") and old_path != path:
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+
+    def _open_logs(self, job: CrawlJob):
+        if self._page_log is None:
+            base = self.job_dir(job)
+            self._page_log = IndexLog(os.path.join(base, PAGES_INDEX), "page_id")
+            self._file_log = IndexLog(os.path.join(base, FILES_INDEX), "file_id")
+
+    def _ensure_loaded(self):
+        """Index log'larını ilk erişimde okur."""
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            for x in self._page_log.load():
+                self._index_page(_record(PageRecord, x))
+        except Exception as e:
+            print(f"[STORE] pages index okunamadı: {e}")
+            self._pages = {}
+            self._page_by_hash = {}
+            self._page_by_fetched = {}
+        try:
+            self._files = {x["file_id"]: _record(FileRecord, x) for x in self._file_log.load()}
+        except Exception as e:
+            print(f"[STORE] files index okunamadı: {e}")
+            self._files = {}
+
+    def _persist(self, log: IndexLog, records: Dict, rec):
+        log.append(rec.__dict__)
+        if log.path in self._compactions or not log.needs_compaction(len(records)):
+            return
+        if not log.begin_compaction():
+            return
+        # Anlık görüntü loop thread'inde alınır, yazma işi thread'de yapılır
+        snapshot = [dict(r.__dict__) for r in records.values()]
+        task = asyncio.create_task(asyncio.to_thread(log.compact, snapshot, True))
+        self._compactions[log.path] = task
+        task.add_done_callback(lambda _t, k=log.path: self._compactions.pop(k, None))
+
+    def _persist_page(self, job: CrawlJob, rec: PageRecord):
+        self._open_logs(job)
+        self._persist(self._page_log, self._pages, rec)
+
+    def _persist_file(self, job: CrawlJob, rec: FileRecord):
+        self._open_logs(job)
+        self._persist(self._file_log, self._files, rec)
+
+    def get_page(self, page_id: str) -> Optional[PageRecord]:
+        self._ensure_loaded()
+        return self._pages.get(page_id)
+
+    def pages(self) -> list:
+        self._ensure_loaded()
+        return list(self._pages.values())
+
+    def get_file(self, file_id: str) -> Optional[FileRecord]:
+        self._ensure_loaded()
+        return self._files.get(file_id)
+
+    def forget_validators(self, job: CrawlJob, kind: str, rec_id: str):
+        """
+        Kaydın ETag/Last-Modified'ını siler: downstream'e (raw_documents) yazılamayan
+        sayfa/dosya sonraki taramada 304 ile atlanmasın, yeniden çekilip gönderilsin.
+        """
+        rec = self.get_page(rec_id) if kind == "page" else self.get_file(rec_id)
+        if rec is None or not _set_validators(rec, "", ""):
+            return
+        if kind == "page":
+            self._persist_page(job, rec)
+        else:
+            self._persist_file(job, rec)
+
+    def find_page_for_fetch(self, url: str) -> Optional[PageRecord]:
+        """
+        url çekilirken koşullu istekte kullanılacak kayıt: url'in kendi kaydı, yoksa
+        url'den çekilip <link rel=canonical> adresiyle saklanmış sayfanın kaydı.
+        """
+        self._ensure_loaded()
+        pid = hash_url(url)
+        rec = self._pages.get(pid)
+        if rec is None and pid in self._page_by_fetched:
+            rec = self._pages.get(self._page_by_fetched[pid])
+        return rec
+
+    def find_page_by_hash(self, content_hash: str) -> Optional[PageRecord]:
+        self._ensure_loaded()
+        pid = self._page_by_hash.get(content_hash)
+        return self._pages.get(pid) if pid else None
+
+    def _index_page(self, rec: PageRecord, old_hash: str = ""):
+        self._pages[rec.page_id] = rec
+        if old_hash and self._page_by_hash.get(old_hash) == rec.page_id:
+            del self._page_by_hash[old_hash]
+        if rec.content_hash:
+            self._page_by_hash.setdefault(rec.content_hash, rec.page_id)
+        if rec.fetched_url:
+            self._page_by_fetched[hash_url(rec.fetched_url)] = rec.page_id
 
     def job_dir(self, job: CrawlJob) -> str:
         """
@@ -41,33 +245,32 @@ class FilesystemStore:
         return os.path.join(self.base_dir, job.job_id)
 
     def ensure_dirs(self, job: CrawlJob):
-        base = self.job_dir(job)
-        for sub in ["pages/text", "files_text"]:
-            os.makedirs(os.path.join(base, sub), exist_ok=True)
+        os.makedirs(self.job_dir(job), exist_ok=True)
 
     async def load_indexes_if_any(self, job: CrawlJob):
+        """
+        Index log'larını hazırlar; eski JSON index varsa JSONL'e taşır.
+        Kayıtların kendisi ilk erişimde (lazy) okunur.
+        """
         base = self.job_dir(job)
-        pages_index = os.path.join(base, "pages_index.json")
-        files_index = os.path.join(base, "files_index.json")
+        self._open_logs(job)
 
-        self._pages = []
-        self._files = []
-
-        if os.path.exists(pages_index):
+        for legacy, log in (
+            (os.path.join(base, "pages_index.json"), self._page_log),
+            (os.path.join(base, "files_index.json"), self._file_log),
+        ):
             try:
-                async with aiofiles.open(pages_index, "r", encoding="utf-8") as f:
-                    raw = json.loads(await f.read() or "[]")
-                self._pages = [PageRecord(**x) for x in raw]
-            except Exception:
-                self._pages = []
-
-        if os.path.exists(files_index):
-            try:
-                async with aiofiles.open(files_index, "r", encoding="utf-8") as f:
-                    raw = json.loads(await f.read() or "[]")
-                self._files = [FileRecord(**x) for x in raw]
-            except Exception:
-                self._files = []
+                n = await asyncio.to_thread(migrate_json_index, legacy, log)
+                if n is not None:
+                    print(f"[STORE] {legacy} -> {log.path} ({n} kayıt taşındı)")
+            except Exception as e:
+                print(f"[STORE] {legacy} taşınamadı: {e}")
+
+        self._pages = {}
+        self._files = {}
+        self._page_by_hash = {}
+        self._page_by_fetched = {}
+        self._loaded = False
 
     async def save_page(
         self,
@@ -79,20 +282,45 @@ class FilesystemStore:
         links: list[str],
         discovered_files: list[str],
         agent_id: str,
-        project_id: int
+        project_id: int,
+        etag: str = "",
+        last_modified: str = "",
+        content_hash: str = "",
+        minhash: str = "",
+        duplicate_of: Optional[PageRecord] = None,
+        fetched_url: str = "",
     ) -> PageRecord:
+        """
+        fetched_url: sayfanın çekildiği adres (url kanonik adresse farklı olabilir);
+        doğrulayıcılar bu adresle ilişkilendirilir (bkz. find_page_for_fetch).
+
+        duplicate_of verilirse sayfa o sayfanın yakın kopyası olarak, kendi
+        metni yazılmadan orijinalin blob'una referansla kaydedilir. Orijinalin
+        blob'u yoksa (ör. hâlâ eski .txt'de duruyorsa) sayfa normal saklanır.
+        """
         self.ensure_dirs(job)
-        base = self.job_dir(job)
         if job.documents_only:
             return None
 
         pid = hash_url(url)
-        txt_path = os.path.join(base, "pages", "text", f"{pid}.txt")
+        dup_id = duplicate_of.page_id if duplicate_of is not None else ""
 
-        new_hash = hash_text(text)
+        # Parse aşaması hash'i zaten hesapladıysa tekrar hesaplanmaz
+        new_hash = content_hash or hash_text(text)
         new_len = len(text or "")
 
-        existing = next((p for p in self._pages if p.page_id == pid), None)
+        async def put_text(old_path: str = "") -> str:
+            nonlocal dup_id
+            if duplicate_of is not None:
+                # Yakın kopyanın kendi metni orijinalin hash'i altına asla yazılmaz
+                path = await self._link_text(job, "page", pid, duplicate_of.content_hash, old_path)
+                if path is not None:
+                    return path
+                print(f"[NEARDUP] {duplicate_of.page_id} blob'u yok, {url} normal saklanıyor")
+                dup_id = ""
+            return await self._put_text(job, "page", pid, new_hash, text, old_path)
+
+        existing = self.get_page(pid)
 
         if existing:
             old_hash = (getattr(existing, "content_hash", "") or "").strip()
@@ -105,31 +333,44 @@ class FilesystemStore:
                 existing.content_type = content_type
                 existing.discovered_links = links
                 existing.discovered_files = discovered_files
+                existing.minhash = minhash
+                _set_validators(existing, etag, last_modified, fetched_url)
+                self._index_page(existing)
+                self._persist_page(job, existing)
                 print(f"[DOC][PAGE][BACKFILL_HASH] depth={depth} url={url}")
                 return existing
 
 
             if old_hash == new_hash:
+                changed = _set_validators(existing, etag, last_modified, fetched_url)
+                if minhash and existing.minhash != minhash:
+                    existing.minhash = minhash
+                    changed = True
+                if changed:
+                    self._index_page(existing)
+                    self._persist_page(job, existing)
                 print(f"[DOC][PAGE][SKIP_SAME] depth={depth} url={url}")
                 return existing
 
 
-            async with aiofiles.open(txt_path, "w", encoding="utf-8") as f:
-                await f.write(text or "")
-
+            existing.text_path = await put_text(existing.text_path)
+            existing.minhash = minhash
+            existing.duplicate_of = dup_id
             existing.content_hash = new_hash
             existing.text_len = new_len
             existing.depth = depth
             existing.content_type = content_type
             existing.discovered_links = links
             existing.discovered_files = discovered_files
+            _set_validators(existing, etag, last_modified, fetched_url)
+            self._index_page(existing, old_hash)
+            self._persist_page(job, existing)
 
             print(f"[DOC][PAGE][UPDATED] depth={depth} chars={new_len} url={url}")
             return existing
 
 
-        async with aiofiles.open(txt_path, "w", encoding="utf-8") as f:
-            await f.write(text or "")
+        txt_path = await put_text()
 
         rec = PageRecord(
             page_id=pid,
@@ -144,68 +385,97 @@ class FilesystemStore:
             content_hash=new_hash,
             text_len=new_len,
             agent_id=agent_id,
-            project_id=project_id
+            project_id=project_id,
+            etag=etag,
+            last_modified=last_modified,
+            fetched_url=fetched_url if fetched_url != url else "",
+            minhash=minhash,
+            duplicate_of=dup_id,
         )
 
-        self._pages.append(rec)
+        self._index_page(rec)
+        self._persist_page(job, rec)
         print(f"[DOC][PAGE] depth={depth} chars={new_len} url={url}")
         return rec
 
-    def _file_txt_path(self, job: CrawlJob, url: str) -> str:
-        base = self.job_dir(job)
-        fid = hash_url(url)
-        return os.path.join(base, "files_text", f"{fid}.txt")
-
     async def save_file_text(self, job: CrawlJob, url: str, depth: int, text: str,
-                             content_type: str, size_bytes: int, agent_id: str, project_id: int) -> FileRecord:
+                             content_type: str, size_bytes: int, agent_id: str, project_id: int,
+                             etag: str = "", last_modified: str = "") -> FileRecord:
         self.ensure_dirs(job)
         fid = hash_url(url)
-        txt_path = self._file_txt_path(job, url)
         new_hash = hash_text(text)  # Yazının hash'ini al
 
         # 1. Listede var mı bak
-        existing = next((x for x in self._files if x.file_id == fid), None)
+        existing = self.get_file(fid)
 
         if existing:
             # 2. Hash kontrolü yap (Değişmiş mi?)
             old_hash = getattr(existing, "content_hash", "")
             if old_hash == new_hash:
                 # İçerik aynıysa sadece metadata güncelle ve dön
-                existing.depth = depth
+                changed = _set_validators(existing, etag, last_modified)
+                if existing.depth != depth:
+                    existing.depth = depth
+                    changed = True
+                if changed:
+                    self._persist_file(job, existing)
                 return existing
 
-            # 3. İçerik değişmişse dosyayı güncelle
-            async with aiofiles.open(txt_path, "w", encoding="utf-8") as f:
-                await f.write(text or "")
-
+            # 3. İçerik değişmişse blob'u güncelle
+            existing.file_path = await self._put_text(job, "file", fid, new_hash, text, existing.file_path)
             existing.content_hash = new_hash
             existing.size_bytes = len((text or "").encode("utf-8"))
             existing.depth = depth
+            _set_validators(existing, etag, last_modified)
+            self._persist_file(job, existing)
             return existing
 
         # 4. Hiç yoksa yeni kayıt oluştur (Yeni dosya)
-        async with aiofiles.open(txt_path, "w", encoding="utf-8") as f:
-            await f.write(text or "")
+        txt_path = await self._put_text(job, "file", fid, new_hash, text)
 
         rec = FileRecord(
             file_id=fid, job_id=job.job_id, url=url, domain=get_domain(url),
             depth=depth, file_path=txt_path, content_type=content_type,
             size_bytes=len((text or "").encode("utf-8")),
             content_hash=new_hash,
-            agent_id=agent_id, project_id=project_id
+            agent_id=agent_id, project_id=project_id,
+            etag=etag, last_modified=last_modified
         )
-        self._files.append(rec)
+        self._files[fid] = rec
+        self._persist_file(job, rec)
         print(f"--- SUCCESS: File saved and added to index: {url} ---")  # Bunu ekle
         return rec
 
     async def write_indexes(self, job: CrawlJob):
+        """
+        Kayıtlar zaten değiştikçe log'a yazıldı; burada sadece süren compaction
+        beklenir, gerekiyorsa son bir compaction yapılır ve log'lar kapatılır.
+        """
         base = self.job_dir(job)
-        os.makedirs(base, exist_ok=True)
+        self._open_logs(job)
+        self._ensure_loaded()
 
-        async with aiofiles.open(os.path.join(base, "pages_index.json"), "w", encoding="utf-8") as f:
-            await f.write(json.dumps([p.__dict__ for p in self._pages], ensure_ascii=False, indent=2))
+        if self._compactions:
+            await asyncio.gather(*self._compactions.values(), return_exceptions=True)
 
-        async with aiofiles.open(os.path.join(base, "files_index.json"), "w", encoding="utf-8") as f:
-            await f.write(json.dumps([x.__dict__ for x in self._files], ensure_ascii=False, indent=2))
-
-        print(f"[STORE] {len(self._pages)} page, {len(self._files)} file index yazıldı → {base}")
\ No newline at end of file
+        for log, records in ((self._page_log, self._pages), (self._file_log, self._files)):
+            try:
+                if log.needs_compaction(len(records)):
+                    snapshot = [dict(r.__dict__) for r in records.values()]
+                    await asyncio.to_thread(log.compact, snapshot)
+            except Exception as e:
+                print(f"[STORE] {log.path} compaction failed: {e}")
+            log.close()
+
+        print(f"[STORE] {len(self._pages)} page, {len(self._files)} file index kaydı → {base}")
+        if self._blobs is not None:
+            print(f"[STORE] blobs: {self._blobs.stats}")
+            if self._blobs.layout == "segments":
+                try:
+                    res = await asyncio.to_thread(self._blobs.compact_segments)
+                    if res["segments"]:
+                        print(f"[STORE] segment compaction: {res}")
+                except Exception as e:
+                    print(f"[STORE] segment compaction failed: {e}")
+            self._blobs.close()
+            self._blobs = None
@@ -0,0 +1,197 @@
+import json
+import os
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class IndexLog:
+    """
+    Append-only JSONL index dosyası.
+
+    Her satır bir kaydın son halidir; aynı anahtar için sonraki satır öncekini
+    geçersiz kılar. Process yazarken ölürse en fazla son (yarım) satır kaybolur,
+    load() yarım satırı atlar.
+
+    compact() sadece canlı kayıtları yeni bir dosyaya yazar ve atomik olarak
+    (os.replace) eskisinin yerine koyar. Compaction bir thread'de koşarken
+    gelen append'ler hem eski dosyaya yazılır hem de tamponlanıp yeni dosyanın
+    sonuna eklenir.
+    """
+
+    def __init__(self, path: str, key: str, fsync: bool = False):
+        self.path = path
+        self.key = key
+        self.fsync = fsync
+
+        self._fh = None
+        self._lock = threading.Lock()
+        self._compacting = False
+        self._during_compact: List[str] = []
+
+        # compaction kararı için: dosyadaki satır sayısı
+        self.lines = 0
+        # scan()'in okuduğu son byte offset'i
+        self.scanned_to = 0
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def load(self) -> Iterator[dict]:
+        """Dosyayı satır satır okur; her anahtarın son halini döner."""
+        latest: Dict[str, dict] = {}
+        self.lines = 0
+        if not os.path.exists(self.path):
+            return iter(())
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    # crash sırasında yarım kalmış satır
+                    continue
+                self.lines += 1
+                k = rec.get(self.key)
+                if k is not None:
+                    latest[k] = rec
+        return iter(latest.values())
+
+    def scan(self, start: int = 0) -> Iterator[Tuple[int, dict]]:
+        """
+        Kayıtları bellekte tutmadan (offset, kayıt) olarak döner.
+
+        İlk geçişte sadece anahtar -> son satırın byte offset'i çıkarılır, ikinci
+        geçişte her anahtarın son satırı dosya sırasıyla verilir. start: bu
+        offset'ten önceki satırlar atlanır (kaldığı yerden devam için).
+        Tarama sırasında eklenen satırlar dahil edilmez; taranan son offset
+        self.scanned_to'dadır.
+        """
+        self.scanned_to = start
+        if not os.path.exists(self.path):
+            return
+        end = os.path.getsize(self.path)
+        last: Dict[str, int] = {}
+        for offset, rec in self._lines(0, end):
+            k = rec.get(self.key)
+            if k is not None:
+                last[k] = offset
+        self.scanned_to = max(start, end)
+        for offset, rec in self._lines(start, end):
+            if last.get(rec.get(self.key)) == offset:
+                yield offset, rec
+
+    def _lines(self, start: int, end: int) -> Iterator[Tuple[int, dict]]:
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            offset = start
+            for line in f:
+                pos = offset
+                offset += len(line)
+                if offset > end:
+                    # dosya okunurken eklenen (belki henüz yarım) satırlar
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    yield pos, json.loads(line)
+                except ValueError:
+                    continue
+
+    def _open(self):
+        if self._fh is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            torn = False
+            if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+                with open(self.path, "rb") as f:
+                    f.seek(-1, os.SEEK_END)
+                    torn = f.read(1) != b"\n"
+            self._fh = open(self.path, "a", encoding="utf-8")
+            if torn:
+                # yarım kalmış satırı kapat ki yeni kayıt ona yapışmasın
+                self._fh.write("\n")
+
+    def append(self, record: dict):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._open()
+            self._fh.write(line)
+            self._fh.flush()
+            if self.fsync:
+                os.fsync(self._fh.fileno())
+            self.lines += 1
+            if self._compacting:
+                self._during_compact.append(line)
+
+    def needs_compaction(self, live: int, min_lines: int = 1000) -> bool:
+        return self.lines > max(min_lines, 2 * live)
+
+    def begin_compaction(self) -> bool:
+        """
+        Canlı kayıtların anlık görüntüsü alınırken çağrılır; bu andan sonraki
+        append'ler yeni dosyaya da taşınır. Zaten compaction varsa False döner.
+        """
+        with self._lock:
+            if self._compacting:
+                return False
+            self._compacting = True
+            self._during_compact = []
+            return True
+
+    def compact(self, records: Iterable[dict], begun: bool = False):
+        """records: canlı kayıtların anlık görüntüsü (begin_compaction() ile aynı anda alınmış)."""
+        if not begun and not self.begin_compaction():
+            return
+
+        tmp = self.path + ".compact"
+        written = 0
+        try:
+            with open(tmp, "w", encoding="utf-8") as out:
+                for rec in records:
+                    out.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                    written += 1
+
+                with self._lock:
+                    for line in self._during_compact:
+                        out.write(line)
+                    written += len(self._during_compact)
+                    out.flush()
+                    os.fsync(out.fileno())
+
+                    if self._fh is not None:
+                        self._fh.close()
+                        self._fh = None
+                    os.replace(tmp, self.path)
+                    self.lines = written
+        finally:
+            with self._lock:
+                self._compacting = False
+                self._during_compact = []
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def close(self):
+        with self._lock:
+            if self._fh is not None:
+                self._fh.flush()
+                os.fsync(self._fh.fileno())
+                self._fh.close()
+                self._fh = None
+
+
+def migrate_json_index(json_path: str, log: IndexLog) -> Optional[int]:
+    """
+    Eski pages_index.json / files_index.json dosyasını JSONL log'a taşır.
+    Log zaten varsa dokunmaz. Taşınan kayıt sayısını döner.
+    """
+    if not os.path.exists(json_path) or log.exists():
+        return None
+
+    with open(json_path, "r", encoding="utf-8") as f:
+        raw = json.loads(f.read() or "[]")
+
+    log.compact(raw)
+    os.replace(json_path, json_path + ".migrated")
+    return len(raw)
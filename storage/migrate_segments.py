@@ -0,0 +1,147 @@
+"""
+Mevcut site klasörlerini segment layout'una taşır.
+
+    python -m storage.migrate_segments [--data-dir data] [--site KEY ...] [--dry-run]
+
+Her site klasöründe pages/files index kayıtları okunur:
+  - eski düz .txt metinler blob olarak segmente yazılır, .txt dosyaları silinir;
+  - files layout'undaki blob'lar (data/blobs/ab/cd/<hash>.gz|.zst) segmente
+    taşınır;
+  - index log'ları yeni segment:// yollarıyla yeniden yazılır.
+
+Taşınan blob dosyaları, başka sitelerin kayıtları hâlâ onlara bakıyor olabileceği
+için sadece tüm siteler taşındığında (--site verilmediğinde) silinir.
+Worker'lar çalışırken koşturulmamalıdır (index log'ları yeniden yazılır).
+"""
+import argparse
+import os
+import sys
+
+from utils import hash_text
+from .blob_store import BlobStore, read_text
+from .filesystem_store import FILES_INDEX, PAGES_INDEX, blob_owner, iter_index_records, iter_site_dirs
+from .index_log import IndexLog
+from .segment_store import SEGMENT_SCHEME
+
+KINDS = (
+    # (index türü, index dosyası, id alanı, metin yolu alanı, blob owner türü)
+    ("pages", PAGES_INDEX, "page_id", "text_path", "page"),
+    ("files", FILES_INDEX, "file_id", "file_path", "file"),
+)
+LEGACY_DIRS = (os.path.join("pages", "text"), "files_text")
+
+
+def _is_blob_file(blobs: BlobStore, path: str) -> bool:
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(path))))
+    return root == os.path.abspath(blobs.root) and (
+        path.endswith(".gz") or path.endswith(".zst")
+    )
+
+
+def migrate_site(blobs: BlobStore, site_dir: str, moved_files: set, dry_run: bool = False) -> dict:
+    site_key = os.path.basename(site_dir)
+    stats = {"records": 0, "txt": 0, "blob_files": 0, "already": 0, "missing": 0}
+    legacy_txt = []
+
+    for kind, index_name, key, path_field, owner_kind in KINDS:
+        records = list(iter_index_records(site_dir, kind))
+        if not records:
+            continue
+        for rec in records:
+            stats["records"] += 1
+            path = rec.get(path_field) or ""
+            if path.startswith(SEGMENT_SCHEME):
+                stats["already"] += 1
+                continue
+            if not os.path.exists(path):
+                stats["missing"] += 1
+                continue
+            if dry_run:
+                stats["blob_files" if _is_blob_file(blobs, path) else "txt"] += 1
+                continue
+
+            if _is_blob_file(blobs, path):
+                content_hash = os.path.basename(path).split(".", 1)[0]
+                new_path = blobs.move_to_segment(content_hash)
+                if new_path is None:
+                    stats["missing"] += 1
+                    continue
+                moved_files.add(path)
+                stats["blob_files"] += 1
+            else:
+                text = read_text(path)
+                content_hash = rec.get("content_hash") or hash_text(text)
+                rec["content_hash"] = content_hash
+                new_path = blobs.put(blob_owner(site_key, owner_kind, rec[key]), content_hash, text)
+                legacy_txt.append(path)
+                stats["txt"] += 1
+            rec[path_field] = new_path
+
+        if not dry_run:
+            log = IndexLog(os.path.join(site_dir, index_name), key)
+            log.compact(records)
+            legacy = os.path.join(site_dir, f"{kind}_index.json")
+            if os.path.exists(legacy):
+                os.replace(legacy, legacy + ".migrated")
+
+    if not dry_run:
+        for p in legacy_txt:
+            try:
+                os.remove(p)
+            except OSError:
+                pass
+        for sub in LEGACY_DIRS:
+            d = os.path.join(site_dir, sub)
+            try:
+                if os.path.isdir(d) and not os.listdir(d):
+                    os.rmdir(d)
+            except OSError:
+                pass
+        try:
+            pages = os.path.join(site_dir, "pages")
+            if os.path.isdir(pages) and not os.listdir(pages):
+                os.rmdir(pages)
+        except OSError:
+            pass
+    return stats
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="site klasörlerini segment layout'una taşı")
+    ap.add_argument("--data-dir", default="data")
+    ap.add_argument("--site", action="append", default=[], help="sadece bu site klasör(ler)i")
+    ap.add_argument("--dry-run", action="store_true", help="sadece sayım yap, yazma")
+    args = ap.parse_args(argv)
+
+    blobs = BlobStore(os.path.join(args.data_dir, "blobs"), layout="segments")
+    sites = [os.path.join(args.data_dir, s) for s in args.site] or list(iter_site_dirs(args.data_dir))
+    moved_files: set = set()
+    failed = 0
+    for site_dir in sites:
+        try:
+            stats = migrate_site(blobs, site_dir, moved_files, args.dry_run)
+            print(f"[MIGRATE] {site_dir}: {stats}")
+        except Exception as e:
+            failed += 1
+            print(f"[MIGRATE] {site_dir} taşınamadı: {e}")
+
+    if moved_files:
+        if args.site or failed:
+            print(f"[MIGRATE] {len(moved_files)} eski blob dosyası diğer siteler taşınana kadar bırakıldı")
+        else:
+            for p in moved_files:
+                try:
+                    os.remove(p)
+                    # Boşalan ab/cd klasörleri
+                    os.removedirs(os.path.dirname(p))
+                except OSError:
+                    pass
+            print(f"[MIGRATE] {len(moved_files)} eski blob dosyası silindi")
+
+    print(f"[MIGRATE] blobs: {blobs.usage()}")
+    blobs.close()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+from typing import Dict, Iterator, Optional, Tuple
+
+# Kayıt başlığı: magic, codec, hash uzunluğu, payload uzunluğu; ardından hash ve payload
+MAGIC = b"SEG1"
+_header = struct.Struct(">4sBBI")
+CODEC_IDS = {"gzip": 1, "zstd": 2}
+CODEC_NAMES = {v: k for k, v in CODEC_IDS.items()}
+
+SEGMENT_SCHEME = "segment://"
+# Aktif segment bu boyutu geçince yenisine geçilir
+SEGMENT_BYTES = int(os.getenv("BLOB_SEGMENT_MB", "256")) * 1024 * 1024
+
+
+def segment_ref(root: str, content_hash: str) -> str:
+    """Kayıtlarda saklanan mantıksal adres; compaction'da değişmez (yer offset index'ten bulunur)."""
+    return f"{SEGMENT_SCHEME}{root}/{content_hash}"
+
+
+def parse_ref(path: str) -> Tuple[str, str]:
+    root, _, content_hash = path[len(SEGMENT_SCHEME):].rpartition("/")
+    return root, content_hash
+
+
+def segment_path(root: str, seg_id: int) -> str:
+    return os.path.join(root, "segments", f"{seg_id:08d}.seg")
+
+
+def encode_entry(content_hash: str, codec: str, payload: bytes) -> bytes:
+    h = content_hash.encode("ascii")
+    return _header.pack(MAGIC, CODEC_IDS[codec], len(h), len(payload)) + h + payload
+
+
+def decode_entry(buf) -> Tuple[str, str, memoryview]:
+    """buf: bir kaydın tamamı (bytes ya da memoryview) -> (hash, codec, payload)."""
+    magic, codec_id, hlen, plen = _header.unpack_from(buf, 0)
+    if magic != MAGIC:
+        raise ValueError("bozuk segment kaydı")
+    start = _header.size + hlen
+    view = memoryview(buf)
+    return bytes(view[_header.size:start]).decode("ascii"), CODEC_NAMES[codec_id], view[start:start + plen]
+
+
+def append_entry(root: str, seg_id: int, entry: bytes) -> int:
+    """Kaydı segmentin sonuna ekler, offset'i döner. Çağıran yazma kilidini (IMMEDIATE txn) tutmalı."""
+    path = segment_path(root, seg_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "ab") as f:
+        offset = f.tell()
+        f.write(entry)
+    return offset
+
+
+def scan_segment(path: str) -> Iterator[Tuple[int, int, str]]:
+    """Segmentteki kayıtları (offset, uzunluk, hash) olarak döner; sondaki yarım kaydı atlar."""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        offset = 0
+        while offset + _header.size <= size:
+            f.seek(offset)
+            magic, _codec, hlen, plen = _header.unpack(f.read(_header.size))
+            if magic != MAGIC:
+                break
+            length = _header.size + hlen + plen
+            if offset + length > size:
+                break
+            yield offset, length, f.read(hlen).decode("ascii")
+            offset += length
+
+
+class SegmentReader:
+    """
+    Bir blob kökündeki segment'leri mmap ile okur.
+
+    Offset index (refs.sqlite blobs tablosu) her okumada sorgulanır; böylece
+    başka bir process compaction yapıp kaydı taşıdıysa yeni yeri bulunur.
+    Segment id'leri tekrar kullanılmaz, açık mmap'ler id ile cache'lenir.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._db = sqlite3.connect(
+            os.path.join(root, "refs.sqlite"), timeout=30.0, isolation_level=None, check_same_thread=False
+        )
+        self._lock = threading.Lock()
+        self._maps: Dict[int, mmap.mmap] = {}
+
+    def _map(self, seg_id: int, end: int) -> mmap.mmap:
+        mm = self._maps.get(seg_id)
+        if mm is None or len(mm) < end:
+            # Aktif segment büyümüş olabilir: yeniden map'le (eski map'te hâlâ
+            # okunan memoryview olabilir, onu GC kapatır)
+            with open(segment_path(self.root, seg_id), "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[seg_id] = mm
+        return mm
+
+    def locate(self, content_hash: str) -> Optional[Tuple[int, int, int]]:
+        with self._lock:
+            return self._db.execute(
+                "SELECT segment, offset, length FROM blobs WHERE hash = ? AND segment IS NOT NULL",
+                (content_hash,),
+            ).fetchone()
+
+    def read(self, content_hash: str) -> Tuple[str, memoryview]:
+        """(codec, payload) döner; payload segment mmap'ine bakan bir memoryview'dır (kopya yok)."""
+        for attempt in (0, 1):
+            loc = self.locate(content_hash)
+            if loc is None:
+                raise FileNotFoundError(f"segment blob bulunamadı: {content_hash}")
+            seg_id, offset, length = loc
+            with self._lock:
+                try:
+                    mm = self._map(seg_id, offset + length)
+                    break
+                except FileNotFoundError:
+                    # Arada compaction kaydı taşıyıp segmenti silmiş olabilir
+                    self._maps.pop(seg_id, None)
+                    if attempt:
+                        raise
+        _h, codec, payload = decode_entry(memoryview(mm)[offset:offset + length])
+        return codec, payload
+
+    def close(self):
+        with self._lock:
+            self._maps.clear()
+            self._db.close()
+
+
+_readers: Dict[str, SegmentReader] = {}
+_readers_lock = threading.Lock()
+
+
+def reader_for(root: str) -> SegmentReader:
+    with _readers_lock:
+        r = _readers.get(root)
+        if r is None:
+            r = _readers[root] = SegmentReader(root)
+        return r
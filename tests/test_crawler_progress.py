@@ -0,0 +1,51 @@
+"""
+Resume edilen job'da job_progress sayaçları geri gitmemeli: önceki satır taban
+alınır, bu çalıştırmanın sayaçları üstüne eklenir.
+"""
+import asyncio
+import json
+
+import pytest
+
+
+class _Pg:
+    """job_progress satırını bellekte tutan sahte store; Crawler'ın kullandığı kadarı."""
+
+    def __init__(self, row):
+        self.row = row
+        self.saved = None
+
+    async def get_job_progress(self, job_id):
+        return self.row
+
+    async def save_job_progress(self, job_id, **kw):
+        self.saved = kw
+
+
+@pytest.mark.parametrize("as_text", [False, True])
+def test_progress_continues_from_existing_row(monkeypatch, tmp_path, as_text):
+    pytest.importorskip("aiohttp")
+    pytest.importorskip("asyncpg")
+    from crawler.crawler_core import Crawler
+    from models import CrawlJob
+
+    monkeypatch.chdir(tmp_path)
+    stats = {"page_fetched": 40, "file_extracted": 3, "page_bytes": 1000, "file_bytes": 500}
+    pg = _Pg({"stats": json.dumps(stats) if as_text else stats})
+    job = CrawlJob(job_id="resume-progress", start_urls=["https://example.com/"], root_domain="example.com")
+
+    async def run():
+        crawler = Crawler(job, pg=pg)
+        try:
+            await crawler._load_progress_base()
+            crawler.stats["page_fetched"] += 2
+            crawler.stats["page_bytes"] += 10
+            await crawler._save_progress()
+        finally:
+            crawler.extraction.shutdown(wait=False)
+
+    asyncio.run(run())
+    assert pg.saved["pages_fetched"] == 42
+    assert pg.saved["files_extracted"] == 3
+    assert pg.saved["bytes_fetched"] == 1510
+    assert json.loads(pg.saved["stats"])["page_fetched"] == 42
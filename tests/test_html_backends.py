@@ -0,0 +1,80 @@
+"""
+HTML parse backend'lerinin parity'si: bs4, lxml ve selectolax aynı sayfadan
+aynı metni, linkleri ve canonical'ı çıkarmalı (bkz. crawler/html_backends.py).
+
+Metin kelime dizisi olarak karşılaştırılır (backend'ler metin düğümlerini
+farklı bölebilir); linkler ve canonical birebir aynı olmalı.
+"""
+import pytest
+
+from crawler.html_backends import BACKENDS
+
+CASES = {
+    # <template> içeriği render edilmez: ne metni ne linki sayılır
+    "template_body": (
+        '<html><body><p>a</p><template><p>tpl text</p><a href="/t">t</a></template>'
+        '<a href="/x">x</a></body></html>',
+        ("a x", ["/x"], None),
+    ),
+    "template_head": (
+        '<html><head><template><a href="/th">th</a></template></head><body>z</body></html>',
+        ("z", [], None),
+    ),
+    # <head> içindeki <noscript>'te head'de izin verilmeyen etiketler (lexbor bunları body'ye taşır)
+    "noscript_head": (
+        '<html><head><noscript><p>ns text</p><a href="/ns">n</a></noscript></head>'
+        '<body><p>b</p><a href="/b">b</a></body></html>',
+        ("b b", ["/b"], None),
+    ),
+    "noscript_body": (
+        '<html><body><noscript><a href="/nb">n</a> nb text</noscript><p>b</p></body></html>',
+        ("b", [], None),
+    ),
+    # noscript içindeki canonical, noscript'in geri kalanı gibi yok sayılır
+    "canonical_in_head_noscript": (
+        '<html><head><noscript><link rel="canonical" href="/ns-c"></noscript>'
+        '<link rel="canonical" href="/c"></head><body>z</body></html>',
+        ("z", [], "/c"),
+    ),
+    "canonical_only_in_noscript": (
+        '<html><head><noscript><link rel="canonical" href="/ns-c"></noscript></head><body>z</body></html>',
+        ("z", [], None),
+    ),
+    "canonical_head": (
+        '<html><head><link rel="alternate canonical" href="/c"><title>T</title></head>'
+        '<body><script>var s = "<a href=/js>";</script><style>p{}</style>z</body></html>',
+        ("T z", [], "/c"),
+    ),
+}
+
+
+def _backend(name):
+    try:
+        return BACKENDS[name]()
+    except ImportError:
+        pytest.skip(f"{name} kurulu değil")
+
+
+@pytest.mark.parametrize("name", sorted(BACKENDS))
+@pytest.mark.parametrize("case", sorted(CASES))
+def test_backend_matches_expected(name, case):
+    html, (words, hrefs, canonical) = CASES[case]
+    text, got_hrefs, got_canonical = _backend(name).parse(html)
+    assert text.split() == words.split()
+    assert got_hrefs == hrefs
+    assert got_canonical == canonical
+
+
+@pytest.mark.parametrize("case", sorted(CASES))
+def test_backends_agree(case):
+    html = CASES[case][0]
+    outs = {}
+    for name, cls in BACKENDS.items():
+        try:
+            text, hrefs, canonical = cls().parse(html)
+        except ImportError:
+            continue
+        outs[name] = (text.split(), hrefs, canonical)
+    ref = next(iter(outs.values()))
+    for name, out in outs.items():
+        assert out == ref, name
@@ -0,0 +1,126 @@
+"""
+JS render yedeği, benchmarks/fixtures/js_pages altındaki yerel statik fixture'larla.
+
+Browser açılamazsa (Chromium kurulu değil) renderer kapanmalı, açılış her
+sayfada tekrar denenmemeli ve sayfa statik parse sonucuyla kaydedilmeli.
+"""
+import asyncio
+import os
+
+import pytest
+
+from benchmarks.js_render import FIXTURES, _serve
+from crawler.js_renderer import JSRenderer, is_js_shell
+from crawler.page_parser import parse_page
+
+pytest.importorskip("playwright")
+
+SHELLS = sorted(n for n in os.listdir(FIXTURES) if n.startswith("shell_"))
+
+
+def _read(name: str) -> bytes:
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        return f.read()
+
+
+@pytest.fixture
+def server():
+    srv = _serve()
+    yield f"http://127.0.0.1:{srv.server_address[1]}/"
+    srv.shutdown()
+
+
+@pytest.fixture
+def no_browser(monkeypatch, tmp_path):
+    # Boş tarayıcı klasörü: Playwright gerçekten "Executable doesn't exist" ile düşer
+    monkeypatch.setenv("PLAYWRIGHT_BROWSERS_PATH", str(tmp_path))
+
+
+def test_launch_failure_disables_renderer(server, no_browser):
+    async def run():
+        renderer = JSRenderer(contexts=1)
+        try:
+            out = [await renderer.render(server + name) for name in SHELLS]
+        finally:
+            await renderer.stop()
+        return renderer, out
+
+    renderer, out = asyncio.run(run())
+    assert out == [None] * len(SHELLS)
+    assert renderer.disabled
+    # Açılış sadece bir kez denenir
+    assert renderer.stats["launch_failed"] == 1
+    assert renderer.stats["failed"] == 0
+
+
+def test_render_adds_text_to_shell_fixture(server):
+    name = "shell_react_root.html"
+
+    async def run():
+        renderer = JSRenderer(contexts=1, settle_s=2.0)
+        try:
+            return renderer, await renderer.render(server + name)
+        finally:
+            await renderer.stop()
+
+    renderer, html = asyncio.run(run())
+    if renderer.disabled:
+        pytest.skip("Chromium kurulu değil (playwright install chromium)")
+    before = parse_page(server + name, _read(name), "text/html; charset=utf-8")[0]
+    after = parse_page(server + name, html.encode(), "text/html; charset=utf-8")[0]
+    assert len(after) > len(before)
+
+
+class _Fetcher:
+    """Fixture'ları diskten veren fetch_stream; Crawler'ın kullandığı kadarı."""
+
+    user_agent = "test"
+    budget = None
+    stats = {}
+
+    def __init__(self, base: str):
+        from crawler.politeness import HostScheduler
+
+        self.base = base
+        self.scheduler = HostScheduler()
+
+    async def fetch_stream(self, url, **kw):
+        from crawler.http_fetcher import FetchResult
+
+        data = _read(url[len(self.base):])
+        return FetchResult(url=url, final_url=url, status=200, content_type="text/html; charset=utf-8",
+                           data=data, size=len(data))
+
+
+def test_crawler_keeps_static_text_when_browser_missing(server, no_browser, monkeypatch, tmp_path):
+    pytest.importorskip("aiohttp")
+    pytest.importorskip("asyncpg")
+    from crawler.crawler_core import Crawler
+    from models import CrawlJob, UrlContext
+    from utils import hash_url
+
+    monkeypatch.chdir(tmp_path)
+    job = CrawlJob(
+        job_id="render-fallback", start_urls=[server + SHELLS[0]], root_domain="127.0.0.1",
+        js_render="auto", parse_workers=0, download_files=False, documents_only=False,
+    )
+
+    async def run():
+        crawler = Crawler(job, fetcher=_Fetcher(server), pg=object())
+        try:
+            for name in SHELLS:
+                await crawler._process_page(1, UrlContext(server + name, 0))
+        finally:
+            await crawler.renderer.stop()
+            crawler.extraction.shutdown(wait=False)
+        return crawler
+
+    crawler = asyncio.run(run())
+    assert crawler.renderer.stats["launch_failed"] == 1
+    assert crawler.stats["page_fetched"] == len(SHELLS)
+    for name in SHELLS:
+        data = _read(name)
+        text = parse_page(server + name, data, "text/html; charset=utf-8")[0]
+        assert is_js_shell(data, text)
+        page = crawler.store.get_page(hash_url(server + name))
+        assert page is not None and page.text_len == len(text)
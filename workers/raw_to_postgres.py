@@ -1,30 +1,357 @@
+"""
+Site klasörlerindeki sayfa/dosya metinlerini raw_documents'a toplu yükler.
+
+    python -m workers.raw_to_postgres [SITE_DIR ...] [--data-dir data]
+        [--kinds pages,files] [--concurrency 16] [--sites 2] [--batch-rows 500] [--restart]
+
+SITE_DIR verilmezse --data-dir altındaki tüm siteler yüklenir.
+
+- pages/files index log'ları bellekte tutulmadan taranır (IndexLog.scan);
+- metinler (blob, segment:// ya da eski .txt) en fazla --concurrency kadar
+  eşzamanlı okunur;
+- satırlar RawDocumentWriter ile COPY + tek merge olarak batch'ler halinde
+  yazılır, içeriği değişmeyenler SKIPPED sayılır;
+- her site klasörüne checkpoint yazılır (raw_to_postgres.checkpoint.json):
+  sırası gelen ilk onaylanmamış kaydın index offset'i. Tekrar çalıştırınca
+  oradan devam edilir; index compact edildiyse (dosya değiştiyse) baştan
+  alınır. FAILED olan ilk kayıttan sonra o türün checkpoint'i ilerlemez.
+
+Hata (FAILED) varsa çıkış kodu 1.
+"""
+import argparse
+import asyncio
 import json
-import aiofiles
+import os
+import sys
+import time
+from collections import defaultdict, deque
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
 from db.postgres_store import PostgresStore
+from db.raw_document_writer import RawDocumentWriter
+from storage.blob_store import read_text
+from storage.filesystem_store import FILES_INDEX, PAGES_INDEX, iter_site_dirs
+from storage.index_log import IndexLog
+from utils import hash_text
+
+CHECKPOINT_FILE = "raw_to_postgres.checkpoint.json"
+# Checkpoint en fazla bu aralıkla diske yazılır
+CHECKPOINT_EVERY_S = 5.0
+# Index kayıtları thread'de bu büyüklükte dilimlerle okunur
+SCAN_CHUNK = 500
+
+KINDS = {
+    # tür: (index dosyası, id alanı, metin yolu alanı, source_type)
+    "pages": (PAGES_INDEX, "page_id", "text_path", "page"),
+    "files": (FILES_INDEX, "file_id", "file_path", "file"),
+}
+
+
+def _load_checkpoint(site_dir: str) -> dict:
+    try:
+        with open(os.path.join(site_dir, CHECKPOINT_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_checkpoint(site_dir: str, cp: dict):
+    path = os.path.join(site_dir, CHECKPOINT_FILE)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(cp, f)
+    os.replace(tmp, path)
+
+
+def _open_index(site_dir: str, kind: str, saved: Optional[dict]):
+    """
+    (index kimliği, başlangıç offset'i, (offset, kayıt) akışı, bitiş fonksiyonu) ya da None.
+    Kimlik checkpoint'le uyuşmazsa (log compact edilmiş / JSON'dan taşınmış) baştan başlanır.
+    """
+    index_name, key, _, _ = KINDS[kind]
+    saved = saved or {}
+    log = IndexLog(os.path.join(site_dir, index_name), key)
+    if log.exists():
+        st = os.stat(log.path)
+        ident = {"index": "jsonl", "inode": st.st_ino}
+        same = all(saved.get(k) == v for k, v in ident.items()) and saved.get("offset", 0) <= st.st_size
+        start = saved.get("offset", 0) if same else 0
+        return ident, start, log.scan(start), lambda: log.scanned_to
+
+    legacy = os.path.join(site_dir, f"{kind}_index.json")
+    if os.path.exists(legacy):
+        st = os.stat(legacy)
+        ident = {"index": "json", "mtime_ns": st.st_mtime_ns}
+        with open(legacy, "r", encoding="utf-8") as f:
+            records = json.loads(f.read() or "[]")
+        same = all(saved.get(k) == v for k, v in ident.items())
+        start = saved.get("offset", 0) if same else 0
+        return ident, start, ((i, r) for i, r in enumerate(records) if i >= start), lambda: len(records)
+    return None
+
+
+def _take(it: Iterator, n: int) -> list:
+    out = []
+    for item in it:
+        out.append(item)
+        if len(out) >= n:
+            break
+    return out
+
+
+def _outcome(task: Optional[asyncio.Task]) -> Optional[str]:
+    """Kaydın sonucu; henüz belli değilse None. Task sonucu ya bir sonuç ya da yazıcının future'ıdır."""
+    if task is None:
+        return "DONE"
+    if not task.done():
+        return None
+    res = task.result()
+    if isinstance(res, str):
+        return res
+    return res.result() if res.done() else None
+
+
+class _Progress:
+    """
+    Sırayla verilen kayıtların onaylanmış ön ekini izler. offset: sıradaki ilk
+    bitmemiş kayıt (ya da en son biten kayıt; tekrar yüklenirse SKIPPED olur).
+    """
+
+    def __init__(self, start: int):
+        self.offset = start
+        self.blocked = False
+        self._pending: Deque[Tuple[int, Optional[asyncio.Task]]] = deque()
+
+    def add(self, offset: int, task: Optional[asyncio.Task]):
+        self._pending.append((offset, task))
+
+    def advance(self):
+        while self._pending:
+            offset, task = self._pending[0]
+            outcome = _outcome(task)
+            if outcome is None:
+                break
+            self._pending.popleft()
+            if outcome == "FAILED":
+                self.blocked = True
+            if not self.blocked:
+                self.offset = offset
+        if self._pending and not self.blocked:
+            self.offset = self._pending[0][0]
+
+    async def wait(self, writer: RawDocumentWriter):
+        """Bekleyen okumaları bitirir, yazıcıyı flush eder ve DB sonuçlarını bekler."""
+        tasks = [t for _, t in self._pending if t is not None]
+        results = await asyncio.gather(*tasks)
+        await writer.flush()
+        futures = [r for r in results if not isinstance(r, str)]
+        if futures:
+            await asyncio.gather(*futures)
+        self.advance()
+
+
+class BulkLoader:
+    def __init__(
+        self,
+        pg: PostgresStore,
+        *,
+        kinds=("pages", "files"),
+        concurrency: int = 16,
+        batch_rows: int = 500,
+        resume: bool = True,
+    ):
+        self.pg = pg
+        self.kinds = tuple(kinds)
+        self.resume = resume
+        self.writer = RawDocumentWriter(pg, max_rows=batch_rows)
+        # Eşzamanlı metin okuma sınırı (tüm siteler için ortak)
+        self._reads = asyncio.Semaphore(concurrency)
 
-async def ingest_site(site_dir: str):
-    pg = PostgresStore()
+        # site -> sayaçlar ("records", "chars", "INSERTED", "MISSING", ...)
+        self.stats: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+
+    async def run(self, site_dirs: List[str], parallel_sites: int = 2):
+        await self.writer.start()
+        gate = asyncio.Semaphore(parallel_sites)
+
+        async def one(site_dir: str):
+            async with gate:
+                try:
+                    await self.load_site(site_dir)
+                except Exception as e:
+                    self.stats[site_dir]["FAILED"] += 1
+                    print(f"[BACKFILL] {site_dir} yüklenemedi: {e}")
+
+        try:
+            await asyncio.gather(*(one(d) for d in site_dirs))
+        finally:
+            await self.writer.close()
+
+    async def load_site(self, site_dir: str):
+        cp = _load_checkpoint(site_dir) if self.resume else {}
+        st = self.stats[site_dir]
+        t0 = time.monotonic()
+        for kind in self.kinds:
+            await self._load_kind(site_dir, kind, cp)
+        st["seconds"] = time.monotonic() - t0
+        print(f"[BACKFILL] {_summary(site_dir, st)}")
+
+    async def _load_kind(self, site_dir: str, kind: str, cp: dict):
+        src = _open_index(site_dir, kind, cp.get(kind))
+        if src is None:
+            return
+        ident, start, records, scanned_to = src
+        _, key, path_field, source_type = KINDS[kind]
+        st = self.stats[site_dir]
+        progress = _Progress(start)
+        last_save = time.monotonic()
+
+        def checkpoint(done: bool = False):
+            cp[kind] = dict(ident, offset=scanned_to() if done and not progress.blocked else progress.offset)
+            _save_checkpoint(site_dir, cp)
+
+        while True:
+            chunk = await asyncio.to_thread(_take, records, SCAN_CHUNK)
+            if not chunk:
+                break
+            for offset, rec in chunk:
+                st["records"] += 1
+                # Yakın kopyalar crawler'da da downstream'e gönderilmez
+                if rec.get("duplicate_of"):
+                    st["NEAR_DUP"] += 1
+                    progress.add(offset, None)
+                    continue
+                await self._reads.acquire()
+                progress.add(offset, asyncio.create_task(self._load_one(site_dir, source_type, rec, key, path_field)))
+
+            progress.advance()
+            if time.monotonic() - last_save >= CHECKPOINT_EVERY_S:
+                checkpoint()
+                last_save = time.monotonic()
+
+        await progress.wait(self.writer)
+        checkpoint(done=True)
+
+    async def _load_one(self, site_dir: str, source_type: str, rec: dict, key: str, path_field: str):
+        """
+        Metni okuyup yazıcıya verir; okuma slotunu bu süre boyunca tutar.
+        Yazıcının sonuç future'ını ya da MISSING / FAILED döner.
+        """
+        st = self.stats[site_dir]
+        try:
+            try:
+                text = await asyncio.to_thread(read_text, rec.get(path_field) or "")
+            except FileNotFoundError:
+                st["MISSING"] += 1
+                return "MISSING"
+            fut = await self.writer.add(
+                source_type=source_type,
+                source_id=rec[key],
+                site=rec.get("domain", ""),
+                url=rec.get("url", ""),
+                raw_text=text,
+                content_hash=rec.get("content_hash") or hash_text(text),
+                content_type=rec.get("content_type") or "",
+                text_len=len(text),
+                agent_id=rec.get("agent_id", "default_agent_id"),
+                project_id=rec.get("project_id", 1),
+            )
+            st["chars"] += len(text)
+        except Exception as e:
+            print(f"[BACKFILL] {rec.get(key)} okunamadı: {e}")
+            st["FAILED"] += 1
+            return "FAILED"
+        finally:
+            self._reads.release()
+
+        def _count(f: "asyncio.Future"):
+            if not f.cancelled():
+                st[f.result()] += 1
+
+        fut.add_done_callback(_count)
+        return fut
+
+    def total(self) -> Dict[str, float]:
+        out: Dict[str, float] = defaultdict(float)
+        for st in self.stats.values():
+            for k, v in st.items():
+                if k != "seconds":
+                    out[k] += v
+        return out
+
+
+def _summary(name: str, st: Dict[str, float]) -> str:
+    secs = max(st.get("seconds", 0.0), 1e-9)
+    outcomes = " ".join(
+        f"{k.lower()}={int(st[k])}"
+        for k in ("INSERTED", "UPDATED", "SKIPPED", "FAILED", "MISSING", "NEAR_DUP") if st.get(k)
+    )
+    return (
+        f"{name}: {int(st.get('records', 0))} kayıt ({outcomes or '-'}) | {secs:.1f} s, "
+        f"{st.get('records', 0) / secs:.0f} kayıt/s, {st.get('chars', 0) / secs / 1e6:.2f} M karakter/s"
+    )
+
+
+async def ingest_sites(
+    site_dirs: List[str],
+    *,
+    kinds=("pages", "files"),
+    concurrency: int = 16,
+    parallel_sites: int = 2,
+    batch_rows: int = 500,
+    resume: bool = True,
+) -> Dict[str, float]:
+    pg = PostgresStore(pool_size=4)
     await pg.connect()
+    loader = BulkLoader(pg, kinds=kinds, concurrency=concurrency, batch_rows=batch_rows, resume=resume)
+    t0 = time.monotonic()
+    try:
+        await loader.run(site_dirs, parallel_sites)
+    finally:
+        await pg.close()
+
+    total = loader.total()
+    total["seconds"] = time.monotonic() - t0
+    print(f"[BACKFILL] {_summary(f'toplam ({len(site_dirs)} site)', total)}")
+    print(f"[BACKFILL] writer: {loader.writer.stats}")
+    return total
+
+
+async def ingest_site(site_dir: str, **kwargs) -> Dict[str, float]:
+    return await ingest_sites([site_dir], **kwargs)
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="site klasörlerini raw_documents'a toplu yükle")
+    ap.add_argument("sites", nargs="*", help="site klasörleri (verilmezse --data-dir altındakilerin hepsi)")
+    ap.add_argument("--data-dir", default="data")
+    ap.add_argument("--kinds", default="pages,files")
+    ap.add_argument("--concurrency", type=int, default=16, help="eşzamanlı metin okuma")
+    ap.add_argument("--sites", dest="parallel_sites", type=int, default=2, help="aynı anda yüklenen site")
+    ap.add_argument("--batch-rows", type=int, default=500)
+    ap.add_argument("--restart", action="store_true", help="checkpoint'leri yok say, baştan yükle")
+    args = ap.parse_args(argv)
+
+    kinds = [k.strip() for k in args.kinds.split(",") if k.strip()]
+    unknown = [k for k in kinds if k not in KINDS]
+    if unknown:
+        ap.error(f"bilinmeyen tür: {', '.join(unknown)}")
+
+    site_dirs = args.sites or list(iter_site_dirs(args.data_dir))
+    if not site_dirs:
+        print(f"[BACKFILL] {args.data_dir} altında site bulunamadı")
+        return 0
+
+    total = asyncio.run(ingest_sites(
+        site_dirs,
+        kinds=kinds,
+        concurrency=args.concurrency,
+        parallel_sites=args.parallel_sites,
+        batch_rows=args.batch_rows,
+        resume=not args.restart,
+    ))
+    return 1 if total.get("FAILED") else 0
+
 
-    index_path = f"{site_dir}/pages_index.json"
-    async with aiofiles.open(index_path, "r", encoding="utf-8") as f:
-        pages = json.loads(await f.read())
-
-    for p in pages:
-        async with aiofiles.open(p["text_path"], "r", encoding="utf-8") as tf:
-            text = await tf.read()
-
-        await pg.insert_raw_document(
-            source_type="page",
-            url=p["url"],
-            domain=p["domain"],
-            content=text,
-            content_hash=p["content_hash"],
-            content_length=p["text_len"],
-            job_id=p["job_id"],
-            site_key=p["domain"],
-            agent_id = p["agent_id"],
-            project_id = p["project_id"]
-        )
-
-    await pg.close()
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,44 @@
 import asyncio
 import json
+import os
+import random
+import signal
+from contextlib import asynccontextmanager
 from dataclasses import fields
+from typing import Dict, Set
 
+from db.job_listener import JobListener
 from db.postgres_store import PostgresStore
 from crawler.crawler_core import Crawler
+from crawler.extraction_executor import ExtractionExecutor
+from crawler.fetch_budget import FairShareBudget
+from crawler.http_fetcher import HttpFetcher
 from models import CrawlJob
+from storage.filesystem_store import FilesystemStore
+
+# Aynı anda koşan job sayısı ve job'lar arası toplam fetch eşzamanlılığı
+MAX_JOBS = int(os.getenv("WORKER_MAX_JOBS", "4"))
+FETCH_BUDGET = int(os.getenv("WORKER_FETCH_BUDGET", "64"))
+# Tek tenant'ın aynı anda en fazla kaç job'u koşabilir (0 -> sınırsız)
+MAX_JOBS_PER_TENANT = int(os.getenv("WORKER_MAX_JOBS_PER_TENANT", "0"))
+# Doküman çıkarım / HTML parse process sayıları (boş -> CPU sayısına göre).
+# launcher birden çok daemon başlatırken bunları çekirdek payına göre ayarlar;
+# WORKER_PARSE_PROCS=0 -> HTML parse daemon'un kendi event loop'unda yapılır.
+EXTRACT_PROCS = os.getenv("WORKER_EXTRACT_PROCS")
+PARSE_PROCS = os.getenv("WORKER_PARSE_PROCS")
+# PG pool boyutu; launcher filonun bağlantı bütçesini daemon'lara böler (boş -> 4 x max_jobs)
+DB_POOL_SIZE = os.getenv("WORKER_DB_POOL_SIZE")
+# LISTEN açıkken polling sadece kaçan bildirimlere karşı emniyet; bağlantı yoksa kısa aralık
+POLL_INTERVAL_S = float(os.getenv("WORKER_POLL_INTERVAL_S", "30"))
+FALLBACK_POLL_INTERVAL_S = 2.0
+# Bildirim tüm daemon'lara gider; boşta olan önce davransın diye yük oranında gecikme + jitter
+WAKE_JITTER_S = 0.2
+# updated_at'i bu kadar dakikadır tazelenmeyen RUNNING job'un daemon'u ölmüş sayılır
+STALE_JOB_MINUTES = int(os.getenv("WORKER_STALE_JOB_MINUTES", "10"))
+# Koşan (ya da site klasörünü bekleyen) her job'un updated_at'i bu aralıkla tazelenir
+HEARTBEAT_INTERVAL_S = float(os.getenv("WORKER_HEARTBEAT_INTERVAL_S", "60"))
+# Site klasörü başka bir daemon'daki job'daysa kilidin yeniden denenme aralığı
+SITE_LOCK_POLL_S = 5.0
 
 
 def _filter_cfg_for_crawljob(cfg: dict) -> dict:
@@ -12,56 +46,225 @@ def _filter_cfg_for_crawljob(cfg: dict) -> dict:
     return {k: v for k, v in (cfg or {}).items() if k in allowed}
 
 
-async def daemon_loop():
-    store = PostgresStore()
-    await store.connect()
-    await store.mark_stale_jobs_as_failed(timeout_minutes=10)
+def _job_from_row(row) -> CrawlJob:
+    cfg_raw = row["config"]
+    if isinstance(cfg_raw, str):
+        cfg = json.loads(cfg_raw or "{}")
+    else:
+        cfg = dict(cfg_raw or {})
 
+    cfg = _filter_cfg_for_crawljob(cfg)
 
-    print("[WORKER] daemon started")
+    return CrawlJob(
+        job_id=row["job_id"],
+        start_urls=[row["start_url"]],
+        root_domain=row["root_domain"],
+        **cfg,
+    )
 
-    try:
-        while True:
-            row = await store.pick_job()
-            if not row:
-                await asyncio.sleep(2)
-                continue
 
-            job_id = row["job_id"]
-            start_url = row["start_url"]
-            root_domain = row["root_domain"]
-            cfg_raw = row["config"]
+class WorkerDaemon:
+    """
+    Tek process'te en fazla max_jobs job'u aynı anda çalıştırır.
+
+    PG pool'u, HTTP fetcher'ı (bağlantı havuzu + DNS cache + host zamanlayıcısı),
+    global fetch bütçesi ve çıkarım/parse process pool'ları job'lar arasında
+    ortaktır. Fetch bütçesi tenant'lar arasında adil paylaşılır; job seçimi de
+    (pick_job) en az çalışan job'u olan tenant'a öncelik verir.
 
-            if isinstance(cfg_raw, str):
-                cfg = json.loads(cfg_raw or "{}")
-            else:
-                cfg = dict(cfg_raw or {})
+    Host zamanlayıcısının limitleri (eşzamanlılık, hız, Retry-After duraklaması)
+    process başınadır: launcher N daemon başlattığında aynı host'a farklı
+    daemon'lardaki job'lar en fazla N katı yük bindirebilir. Aynı incremental
+    site klasörünün job'ları ise filoda tek seferde tek daemon'da koşar (_site_lock).
+    """
 
-            cfg = _filter_cfg_for_crawljob(cfg)
+    def __init__(
+        self,
+        max_jobs: int = MAX_JOBS,
+        fetch_budget: int = FETCH_BUDGET,
+        max_jobs_per_tenant: int = MAX_JOBS_PER_TENANT,
+    ):
+        self.max_jobs = max(1, max_jobs)
+        self.max_jobs_per_tenant = max_jobs_per_tenant or None
 
-            job = CrawlJob(
-                job_id=job_id,
-                start_urls=[start_url],
-                root_domain=root_domain,
-                **cfg,
-            )
+        # Her job'un writer'ı, frontier'ı ve status yazımları aynı pool'dan bağlantı alır
+        self.store = PostgresStore(pool_size=int(DB_POOL_SIZE) if DB_POOL_SIZE else max(10, 4 * self.max_jobs))
+        self.budget = FairShareBudget(fetch_budget)
+        self.fetcher = HttpFetcher(budget=self.budget, limit=max(100, fetch_budget))
+        self.extraction = ExtractionExecutor(int(EXTRACT_PROCS) if EXTRACT_PROCS else None)
+        parse_procs = int(PARSE_PROCS) if PARSE_PROCS else None
+        self.parser = None if parse_procs == 0 else ExtractionExecutor(
+            parse_procs, task_timeout_s=30.0, max_tasks_per_child=500
+        )
 
-            print(f"[WORKER] picked job {job.job_id}")
+        self.listener = JobListener(self.store.dsn)
 
+        self._running: Set[asyncio.Task] = set()
+        # Aynı site klasörüne (incremental) yazan iki job aynı anda koşmasın (bkz. _site_lock)
+        self._dir_locks: Dict[str, asyncio.Lock] = {}
+        self._fs = FilesystemStore()
+
+    async def _heartbeat(self, job_id: str):
+        """
+        Job'un updated_at'ini tazeler. Filoda daemon'lar birbirinden bağımsız
+        yeniden başlar; açılan daemon'un kurtarması (requeue / stale) canlı bir
+        kardeşin job'una dokunmasın diye frontier türünden ve klasör kilidini
+        beklemekten bağımsız olarak her job için yazılır.
+        """
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL_S)
             try:
-                crawler = Crawler(job)
-                await crawler.run()
-                await store.set_job_status(job.job_id, "DONE")
-                print(f"[WORKER] job {job.job_id} DONE")
+                await self.store.touch_job(job_id)
             except Exception as e:
-                await store.set_job_status(job.job_id, "FAILED", error=str(e))
-                print(f"[WORKER] job {job.job_id} FAILED: {e}")
+                print(f"[WORKER] job {job_id} heartbeat yazılamadı: {e}")
+
+    @asynccontextmanager
+    async def _site_lock(self, job: CrawlJob):
+        """
+        Aynı site klasörüne yazan iki job aynı anda koşmasın: index log'unun
+        append/compaction'ı tek yazar varsayar. Önce process içi kilit, sonra
+        filo genelinde site_locks kaydı alınır. Bekleyen job'un heartbeat'i
+        sürdüğü için stale sayılmaz.
+        """
+        site_dir = self._fs.job_dir(job)
+        lock = self._dir_locks.setdefault(site_dir, asyncio.Lock())
+        if lock.locked():
+            print(f"[WORKER] job {job.job_id}: aynı site klasörünü kullanan job bitene kadar bekliyor")
+        async with lock:
+            if not job.incremental:
+                # job_id bazlı klasör: başka job yazmaz
+                yield
+                return
 
-    finally:
+            key = os.path.basename(site_dir)
+            waiting = False
+            while not await self.store.acquire_site_lock(key, job.job_id, STALE_JOB_MINUTES):
+                if not waiting:
+                    waiting = True
+                    print(f"[WORKER] job {job.job_id}: {key} başka bir daemon'daki job'da, bitene kadar bekliyor")
+                await asyncio.sleep(SITE_LOCK_POLL_S)
+            try:
+                yield
+            finally:
+                try:
+                    await self.store.release_site_lock(key, job.job_id)
+                except Exception as e:
+                    # Kilit job RUNNING'den çıkınca zaten devralınabilir
+                    print(f"[WORKER] job {job.job_id}: site kilidi bırakılamadı: {e}")
+
+    async def _run_job(self, row):
+        try:
+            job = _job_from_row(row)
+        except Exception as e:
+            await self.store.set_job_status(row["job_id"], "FAILED", error=f"bad config: {e}")
+            print(f"[WORKER] job {row['job_id']} FAILED: bad config: {e}")
+            return
+
+        print(f"[WORKER] picked job {job.job_id} (tenant {job.agent_id}:{job.project_id})")
+
+        if self.parser is None:
+            # Daemon'a parse pool'u verilmedi: job kendi pool'unu da kurmasın
+            job.parse_workers = 0
+
+        heartbeat = asyncio.create_task(self._heartbeat(job.job_id))
         try:
-            await store.close()
-        except Exception:
-            pass
+            async with self._site_lock(job):
+                crawler = Crawler(
+                    job,
+                    extraction=self.extraction,
+                    fetcher=self.fetcher,
+                    parser=self.parser if job.parse_workers != 0 else None,
+                    pg=self.store,
+                )
+                await crawler.run()
+            await self.store.set_job_status(job.job_id, "DONE")
+            print(f"[WORKER] job {job.job_id} DONE")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await self.store.set_job_status(job.job_id, "FAILED", error=str(e))
+            print(f"[WORKER] job {job.job_id} FAILED: {e}")
+        finally:
+            heartbeat.cancel()
+
+    async def _wait_for_work(self):
+        interval = POLL_INTERVAL_S if self.listener.listening else FALLBACK_POLL_INTERVAL_S
+        waiters = [asyncio.create_task(self.listener.wait(interval))]
+        if self._running:
+            waiters.append(asyncio.create_task(
+                asyncio.wait(set(self._running), return_when=asyncio.FIRST_COMPLETED)
+            ))
+        try:
+            done, _ = await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for w in waiters:
+                w.cancel()
+
+        if waiters[0] in done and not waiters[0].cancelled() and waiters[0].result():
+            # Thundering herd'e karşı: tüm daemon'lar uyanır ama boşta olan önce dener;
+            # kaybedenlerin pick_job'u SKIP LOCKED sayesinde ucuzca None döner
+            load = len(self._running) / self.max_jobs
+            await asyncio.sleep(WAKE_JITTER_S * load + random.uniform(0, WAKE_JITTER_S / 4))
+
+    async def run(self):
+        await self.store.connect()
+        # Sadece heartbeat'i STALE_JOB_MINUTES'tir kesilmiş (daemon'u ölmüş) job'lar
+        resumed = await self.store.requeue_resumable_jobs(timeout_minutes=STALE_JOB_MINUTES)
+        if resumed:
+            print(f"[WORKER] {resumed} yarım kalmış job kuyruğa geri alındı")
+        await self.store.mark_stale_jobs_as_failed(timeout_minutes=STALE_JOB_MINUTES)
+        await self.listener.start()
+
+        print(f"[WORKER] daemon started (max_jobs={self.max_jobs}, fetch_budget={self.budget.total})")
+
+        try:
+            while True:
+                if len(self._running) < self.max_jobs:
+                    row = await self.store.pick_job(self.max_jobs_per_tenant)
+                    if row:
+                        task = asyncio.create_task(self._run_job(row))
+                        self._running.add(task)
+                        task.add_done_callback(self._running.discard)
+                        # Boş slot varsa hemen bir sonraki job'a bak
+                        continue
+
+                if len(self._running) >= self.max_jobs:
+                    # Slotlar dolu: bir job bitene kadar bekle (bildirimler event'te birikir)
+                    await asyncio.wait(set(self._running), return_when=asyncio.FIRST_COMPLETED)
+                    continue
+
+                # Kuyruk boş: NOTIFY, bir job'un bitmesi ya da polling aralığı
+                await self._wait_for_work()
+
+        finally:
+            for t in list(self._running):
+                t.cancel()
+            await asyncio.gather(*self._running, return_exceptions=True)
+            await self.listener.close()
+            await self.fetcher.close()
+            self.extraction.shutdown(wait=False)
+            if self.parser is not None:
+                self.parser.shutdown(wait=False)
+            try:
+                await self.store.close()
+            except Exception:
+                pass
+
+
+async def daemon_loop():
+    # SIGTERM (launcher / systemd) Control-C gibi ele alınır: koşan job'lar iptal
+    # edilir, "Interrupted" olarak işaretlenir ve sonraki açılışta kaldığı yerden devam eder
+    main = asyncio.current_task()
+    loop = asyncio.get_running_loop()
+    try:
+        loop.add_signal_handler(signal.SIGTERM, main.cancel)
+    except (NotImplementedError, RuntimeError):
+        pass
+
+    try:
+        await WorkerDaemon().run()
+    except asyncio.CancelledError:
+        print("[WORKER] shutdown")
 
 
 if __name__ == "__main__":